@@ -7,15 +7,15 @@ import flask_admin
 from .extensions import db, mail, babel, init_limiter, init_auth
 from flask_bootstrap import Bootstrap4
 import os
-from app.models import User, Product, Role, Feedback, PriceHistory, UserNotification, Log
+from app.models import User, Product, Role, Feedback, PriceHistory, UserNotification, Log, Listing
 from app.admin_views import UserAdminView, ProductAdminView, TestingView, AdminMessageView, ParserStatusView, SecuredModelView, FeedbackAdminView
 import click
 from datetime import datetime, timedelta
 import logging
 from logging.handlers import RotatingFileHandler
-from .logging_config import SQLAlchemyLogHandler, NoDbLogDuplicatesFilter
+from .logging_config import BufferedDbLogHandler, NoDbLogDuplicatesFilter
+from .utils.analytics import init_analytics
 from werkzeug.middleware.proxy_fix import ProxyFix
-import posthog
 from urllib.parse import urlparse
 
 from app.utils import bp as utils_bp
@@ -105,7 +105,7 @@ def register_context_processors(app):
 
     @app.shell_context_processor
     def make_shell_context():
-        return dict(db=db, User=User, Product=Product, Role=Role, Feedback=Feedback, PriceHistory=PriceHistory, UserNotification=UserNotification)
+        return dict(db=db, User=User, Product=Product, Role=Role, Feedback=Feedback, PriceHistory=PriceHistory, UserNotification=UserNotification, Listing=Listing)
 
 def create_app(config_name=None):
     app = Flask(__name__)
@@ -115,8 +115,7 @@ def create_app(config_name=None):
     cfg = config.get(config_name) or config['default']
     app.config.from_object(cfg)
     cfg.init_app(app)
-    posthog.api_key = app.config.get('POSTHOG_API_KEY')
-    posthog.host = app.config.get('POSTHOG_HOST')
+    init_analytics(app)
 
     @app.template_filter('urlparse')
     def urlparse_filter(url):
@@ -187,6 +186,8 @@ def create_app(config_name=None):
     register_error_handlers(app)
 
     from app import tasks
+    # Registers the listeners that invalidate cached users on commit.
+    from app.utils import user_cache
 
     return app
 
@@ -16,7 +16,9 @@ from app.utils.scrapers import extract_product_data, DOMAIN_PARSERS
 from wtforms import (StringField, SubmitField, TextAreaField, SelectField, SelectMultipleField, widgets,
                      PasswordField, BooleanField, DecimalField, IntegerField)
 from wtforms.validators import DataRequired, Email, URL, Optional, Length
-from sqlalchemy import func
+from sqlalchemy import func, text, tuple_
+from app.utils.helpers import keyset_cursor, parse_keyset_cursor
+from app.utils.partitions import estimated_row_count
 from flask_admin.contrib import sqla
 from datetime import datetime, timedelta
 from flask_babel import _
@@ -234,6 +236,13 @@ class AdminLogView(SecuredModelView):
 
 
 class LogAdminView(SecuredModelView):
+    """
+    Browses the (partitioned, very large) logs table without OFFSET scans or COUNT(*).
+
+    In the default newest-first order pages are keyset-paginated on (timestamp, id) with a
+    `before` cursor; sorting on another column falls back to Flask-Admin's page numbers.
+    The row count shown is the planner's estimate, and only when no search or filter is active.
+    """
     can_create = False
     can_edit = False
     can_delete = True
@@ -242,11 +251,39 @@ class LogAdminView(SecuredModelView):
     column_filters = ('level', 'module', 'timestamp')
     column_default_sort = ('timestamp', True)
     page_size = 50
+    simple_list_pager = True
+    list_template = 'admin/logs.html'
+
+    def get_list(self, page, sort_column, sort_desc, search, filters, execute=True, page_size=None):
+        count = None if search or filters else estimated_row_count(Log.__tablename__)
+        if sort_column is not None:
+            _, query = super().get_list(page, sort_column, sort_desc, search, filters, execute, page_size)
+            return count, query
+
+        _, query = super().get_list(0, None, False, search, filters, execute=False, page_size=page_size)
+        query = query.limit(None).offset(None).order_by(None)
+        cursor = parse_keyset_cursor(request.args.get('before'))
+        if cursor:
+            query = query.filter(tuple_(Log.timestamp, Log.id) < cursor)
+        query = query.order_by(Log.timestamp.desc(), Log.id.desc()).limit(page_size or self.page_size)
+        return count, query.all() if execute else query
+
+    def render(self, template, **kwargs):
+        if template == self.list_template:
+            data = kwargs.get('data') or []
+            keyset = request.args.get('sort') is None
+            page_size = kwargs.get('page_size') or self.page_size
+            kwargs['keyset_pager'] = keyset
+            kwargs['is_first_page'] = not request.args.get('before')
+            kwargs['next_cursor'] = (keyset_cursor(data[-1].timestamp, data[-1].id)
+                                     if keyset and len(data) == page_size else None)
+        return super().render(template, **kwargs)
 
     @action('delete_all', 'Delete All Logs', 'Are you sure you want to delete all logs?')
     def delete_all(self, ids):
         try:
-            Log.query.delete()
+            # TRUNCATE empties every partition at once instead of deleting (and locking) row by row.
+            db.session.execute(text(f'TRUNCATE TABLE "{Log.__tablename__}"'))
             db.session.commit()
             flash('All logs have been deleted.', 'success')
         except Exception as e:
@@ -20,7 +20,7 @@ from sqlalchemy.exc import (
 from werkzeug.routing import BuildError
 
 from app.extensions import db, mail, limiter
-import posthog
+from app.utils import analytics
 from app.models import User, Role
 from markupsafe import Markup
 from app.auth.forms import (LoginForm,
@@ -91,18 +91,16 @@ def login():
                 return redirect(url_for('auth.login'))
             login_user(user, remember=form.remember.data)
             try:
-                posthog.capture(
+                analytics.capture(
                     distinct_id=str(user.id),
                     event='user_logged_in'
                 )
-                current_app.logger.info("PostHog event 'user_logged_in' captured")
                 from datetime import datetime, timedelta
                 if user.created_at < datetime.utcnow() - timedelta(days=7):
-                    posthog.capture(
+                    analytics.capture(
                         distinct_id=str(user.id),
                         event='user_active_after_7_days'
                     )
-                    current_app.logger.info("PostHog event 'user_active_after_7_days' captured")
             except Exception as e:
                 current_app.logger.error(f"PostHog error: {str(e)}")
             next_page = request.args.get('next')
@@ -153,7 +151,7 @@ def register():
             token = user.generate_confirmation_token()
             send_verification_email(user, token)
             current_app.logger.info(f"New user registered: {user.email}")
-            posthog.capture(
+            analytics.capture(
                 distinct_id=str(user.id),
                 event='user_registered',
                 properties={'email': user.email}
@@ -251,7 +249,7 @@ def confirm(token):
     if user_to_confirm.confirm(token):
         try:
             send_welcome_email(current_user)
-            posthog.capture(user_to_confirm.id, 'account_confirmed')
+            analytics.capture(user_to_confirm.id, 'account_confirmed')
             flash(_('You have confirmed your account. A welcome email has been sent. Thanks!'), 'success')
         except Exception as e:
             current_app.logger.error(f"Failed to send welcome email to {user_to_confirm.email}: {e}")
@@ -289,7 +287,7 @@ def change_password():
     if form.validate_on_submit():
         if current_user.verify_password(form.old_password.data):
             current_user.password = form.password.data
-            db.session.add(current_user)
+            db.session.add(current_user.model)
             db.session.commit()
             flash(_('Your password has been updated.'))
             return redirect(url_for('profile.index'))
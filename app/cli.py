@@ -1,7 +1,7 @@
 import click
 from flask import current_app
 from app.extensions import db
-from app.models import User, Role, Permission
+from app.models import User, Role, Permission, Product, PriceHistoryDaily
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
@@ -82,4 +82,43 @@ def register_commands(app):
         click.echo("Registered users:")
         for user in users:
             click.echo(
-                f"{user.id}: {user.email} ({user.username}) - {'Admin' if user.is_administrator else 'User'} - Created: {user.created_at}")
\ No newline at end of file
+                f"{user.id}: {user.email} ({user.username}) - {'Admin' if user.is_administrator else 'User'} - Created: {user.created_at}")
+
+    @app.cli.command("backfill-listings")
+    @click.option("--batch-size", default=500, show_default=True)
+    def backfill_listings_command(batch_size):
+        """Attach every product that has no shared listing yet to the listing for its URL."""
+        total = 0
+        last_id = 0
+        while True:
+            products = (Product.query
+                        .filter(Product.listing_id.is_(None), Product.id > last_id)
+                        .order_by(Product.id)
+                        .limit(batch_size)
+                        .all())
+            if not products:
+                break
+            for product in products:
+                product.ensure_listing()
+                # Flush so later products with the same canonical URL find this listing.
+                db.session.flush()
+            db.session.commit()
+            total += len(products)
+            last_id = products[-1].id
+            click.echo(f"Attached {total} products to listings...")
+
+        click.echo(f"Done. {total} products backfilled.")
+
+    @app.cli.command("backfill-price-rollups")
+    def backfill_price_rollups_command():
+        """Fill in price_history_daily days missing from it from the raw price history, one partition at a time."""
+        from app.utils.partitions import default_partition_name, existing_partitions
+
+        partitions = [name for month, name in sorted(existing_partitions('price_history').items())]
+        partitions.append(default_partition_name('price_history'))
+        for name in partitions:
+            PriceHistoryDaily.rollup_from(name)
+            db.session.commit()
+            click.echo(f"Rolled up {name}")
+
+        click.echo(f"Done. {len(partitions)} partitions rolled up.")
@@ -5,25 +5,99 @@ from flask import request, has_request_context
 from app.extensions import db
 from app.models import Log
 import os
+import random
+from datetime import datetime
+from sqlalchemy import create_engine, insert
+from app.utils.batching import BackgroundBatcher
 
 
-class SQLAlchemyLogHandler(logging.Handler):
+class BufferedDbLogHandler(logging.Handler):
+    """
+    Writes log records to the `logs` table without touching the request's or task's session.
+
+    emit() only formats the record into a row and appends it to a bounded in-process buffer;
+    a background thread inserts the buffer in batches (one multi-row INSERT each) over its own
+    single-connection engine. When the buffer is full new records are dropped and counted.
+
+    `logger_levels` maps logger names to (level, sample_rate); the longest matching prefix of
+    a record's logger name wins. Records below WARNING are kept with probability sample_rate;
+    WARNING and above are never sampled out.
+    """
+
+    def __init__(self, database_uri, level=logging.INFO, logger_levels=None, capacity=10000,
+                 batch_size=500, flush_interval=2.0):
+        super().__init__(level)
+        self.database_uri = database_uri
+        self.logger_levels = {name: (logging.getLevelName(lvl) if isinstance(lvl, str) else lvl, float(rate))
+                              for name, (lvl, rate) in (logger_levels or {}).items()}
+        self._rules = {}
+        self._engine = None
+        self._batcher = BackgroundBatcher(self._write, capacity=capacity, batch_size=batch_size,
+                                          flush_interval=flush_interval, name='db-log-writer',
+                                          on_failure=self._dropped, on_start=self._reset)
+
+    @property
+    def stats(self):
+        return self._batcher.stats
+
+    def _rule_for(self, name):
+        rule = self._rules.get(name)
+        if rule is None:
+            rule = (self.level, 1.0)
+            prefix = name
+            while prefix:
+                if prefix in self.logger_levels:
+                    rule = self.logger_levels[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._rules[name] = rule
+        return rule
+
     def emit(self, record):
-        ip_addr = request.remote_addr if has_request_context() else 'no-request'
-
-        log_entry = Log(
-            level=record.levelname,
-            message=self.format(record),
-            module=record.module,
-            func_name=record.funcName,
-            ip_address=ip_addr
-        )
+        level, sample_rate = self._rule_for(record.name)
+        if record.levelno < level:
+            return
+        if record.levelno < logging.WARNING and sample_rate < 1.0 and random.random() >= sample_rate:
+            self._batcher.count('sampled_out')
+            return
         try:
-            db.session.add(log_entry)
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            print(f"CRITICAL: Failed to log to database: {e}")
+            row = {
+                'timestamp': datetime.utcfromtimestamp(record.created),
+                'level': record.levelname,
+                'message': self.format(record),
+                'module': record.module[:100],
+                'func_name': (record.funcName or '')[:100],
+                'ip_address': request.remote_addr if has_request_context() else 'no-request',
+            }
+        except Exception:
+            self.handleError(record)
+            return
+
+        self._batcher.put(row)
+
+    def flush(self):
+        """Writes everything buffered so far from the calling thread (logging.shutdown calls this at exit)."""
+        self._batcher.flush()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+    def _reset(self):
+        # Pooled connections do not survive a fork either.
+        self._engine = None
+
+    def _write(self, rows):
+        if self._engine is None:
+            self._engine = create_engine(self.database_uri, pool_size=1, max_overflow=0,
+                                         pool_pre_ping=True, pool_recycle=280)
+        with self._engine.begin() as connection:
+            connection.execute(insert(Log.__table__), rows)
+
+    @staticmethod
+    def _dropped(rows, error):
+        # Not logged: this handler may be the one that would receive it.
+        print(f"CRITICAL: Failed to write {len(rows)} log records to database: {error}")
 
 
 class NoDbLogDuplicatesFilter(logging.Filter):
@@ -77,8 +151,14 @@ def configure_logging(app):
 
     file_handler.addFilter(NoDbLogDuplicatesFilter())
 
-    db_handler = SQLAlchemyLogHandler()
-    db_handler.setLevel(logging.INFO)
+    db_handler = BufferedDbLogHandler(
+        app.config['SQLALCHEMY_DATABASE_URI'],
+        level=app.config.get('DB_LOG_LEVEL', 'INFO'),
+        logger_levels=app.config.get('DB_LOG_LOGGERS'),
+        capacity=app.config.get('DB_LOG_BUFFER_SIZE', 10000),
+        batch_size=app.config.get('DB_LOG_BATCH_SIZE', 500),
+        flush_interval=app.config.get('DB_LOG_FLUSH_INTERVAL', 2.0),
+    )
     db_handler.setFormatter(formatter)
 
     console_handler = logging.StreamHandler()
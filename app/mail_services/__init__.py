@@ -2,38 +2,161 @@ from flask_mail import Message
 from flask import render_template, current_app
 from flask_babel import force_locale, _
 from app.extensions import mail
-from threading import Thread
+from app.utils.cache_utils import CacheManager
+from .render_cache import render_cached
+import json
 import smtplib
 import socket
+import time
 
-def send_async_email(app, msg):
-    """Asynchronous sending of email in a separate thread."""
-    with app.app_context():
-        try:
-            mail.send(msg)
-            app.logger.info(f"Email successfully sent to {msg.recipients} with subject '{msg.subject}'")
-        except smtplib.SMTPServerDisconnected as e:
-            app.logger.error(f"Mail server disconnected while sending email to {msg.recipients}. Error: {str(e)}")
-        except smtplib.SMTPConnectError as e:
-            app.logger.error(f"Could not connect to mail server for sending email to {msg.recipients}. Error: {str(e)}")
-        except smtplib.SMTPAuthenticationError as e:
-            app.logger.error(
-                f"Mail server authentication failed for sending email to {msg.recipients}. Error: {str(e)}")
-        except smtplib.SMTPRecipientsRefused as e:
-            app.logger.error(f"All recipient addresses refused for email to {msg.recipients}. Error: {str(e)}")
-        except smtplib.SMTPSenderRefused as e:
-            app.logger.error(f"Sender address {msg.sender} refused for email to {msg.recipients}. Error: {str(e)}")
-        except smtplib.SMTPDataError as e:
-            app.logger.error(
-                f"Mail server replied with an unexpected error code (data error) for email to {msg.recipients}. Error: {str(e)}")
-        except smtplib.SMTPException as e:
-            app.logger.error(f"SMTP error when sending email to {msg.recipients}. Error: {str(e)}")
-        except socket.gaierror as e:
-            app.logger.error(
-                f"DNS resolution failed (gaierror) when sending email to {msg.recipients}. Error: {str(e)}")
-        except Exception as e:
-            app.logger.error(f"An unexpected error occurred when sending email to {msg.recipients}. Error: {str(e)}",
-                             exc_info=True)
+MAIL_QUEUE_KEY = "mail:queue"
+MAIL_DRAIN_PENDING_KEY = "mail:drain_pending"
+MAIL_THROTTLE_STREAK_KEY = "mail:throttle_streak"
+
+# Replies meaning "slow down / try later" (e.g. 421 too many connections, 451/452 rate limited).
+SMTP_THROTTLE_CODES = (421, 450, 451, 452, 454)
+
+
+class MailThrottled(smtplib.SMTPResponseException):
+    """The mail server asked us to slow down before this message was sent; retry it after `retry_after` seconds."""
+
+    def __init__(self, code, msg, retry_after):
+        super().__init__(code, msg)
+        self.retry_after = retry_after
+
+
+def send_messages(messages):
+    """
+    Sends many messages over as few SMTP connections (and TLS handshakes) as possible.
+
+    One connection from mail.connect() is reused for every message. A dropped connection is
+    reopened and the message tried once more. A throttling reply stops the batch without
+    waiting: the message and every one after it come back with a MailThrottled error whose
+    retry_after starts at MAIL_THROTTLE_BACKOFF and doubles for every throttled batch in a
+    row, up to MAIL_THROTTLE_MAX_BACKOFF seconds. Callers put those messages back on their
+    queue and schedule the next attempt.
+
+    Returns:
+        list[tuple[Message, Exception | None]]: Each message with its error, None if it was sent.
+    """
+    app = current_app._get_current_object()
+
+    results = []
+    started = time.monotonic()
+    connection, reconnected = None, False
+    index = 0
+    try:
+        while index < len(messages):
+            msg = messages[index]
+            if connection is None:
+                try:
+                    connection = mail.connect()
+                    connection.__enter__()
+                except (smtplib.SMTPException, OSError) as e:
+                    app.logger.error(f"Could not connect to mail server: {str(e)}")
+                    results.extend((pending, e) for pending in messages[index:])
+                    connection = None
+                    break
+            try:
+                connection.send(msg)
+                results.append((msg, None))
+                index, reconnected = index + 1, False
+            except smtplib.SMTPServerDisconnected as e:
+                _close_connection(connection)
+                connection = None
+                if reconnected:
+                    app.logger.error(f"Mail server disconnected twice while sending to {msg.recipients}: {str(e)}")
+                    results.append((msg, e))
+                    index, reconnected = index + 1, False
+                else:
+                    app.logger.warning("Mail server disconnected, reconnecting")
+                    reconnected = True
+            except smtplib.SMTPResponseException as e:
+                if e.smtp_code not in SMTP_THROTTLE_CODES:
+                    app.logger.error(f"SMTP error when sending email to {msg.recipients}. Error: {str(e)}")
+                    results.append((msg, e))
+                    index += 1
+                    continue
+                throttled = MailThrottled(e.smtp_code, e.smtp_error, _throttle_delay(app))
+                app.logger.warning(f"Mail server throttling ({e.smtp_code}), {len(messages) - index} emails "
+                                   f"left for another attempt in {throttled.retry_after}s")
+                results.extend((pending, throttled) for pending in messages[index:])
+                break
+            except (smtplib.SMTPException, socket.gaierror) as e:
+                app.logger.error(f"SMTP error when sending email to {msg.recipients}. Error: {str(e)}")
+                results.append((msg, e))
+                index += 1
+    finally:
+        _close_connection(connection)
+
+    sent = sum(1 for _msg, error in results if error is None)
+    if sent and not isinstance(results[-1][1], MailThrottled):
+        _reset_throttle_delay()
+    elapsed = time.monotonic() - started
+    app.logger.info(f"Mail batch: {sent}/{len(messages)} sent in {elapsed:.2f}s "
+                    f"({sent / elapsed if elapsed else 0:.1f} msg/s)")
+    return results
+
+def _throttle_delay(app):
+    backoff = app.config.get('MAIL_THROTTLE_BACKOFF', 5)
+    max_backoff = app.config.get('MAIL_THROTTLE_MAX_BACKOFF', 120)
+    client = CacheManager.get_client()
+    if client is None:
+        return backoff
+    try:
+        streak = client.incr(MAIL_THROTTLE_STREAK_KEY)
+        client.expire(MAIL_THROTTLE_STREAK_KEY, max_backoff * 2)
+    except Exception as e:
+        app.logger.warning(f"Could not track mail throttling in Redis: {e}")
+        return backoff
+    return min(max_backoff, backoff * 2 ** (streak - 1))
+
+def _reset_throttle_delay():
+    client = CacheManager.get_client()
+    if client is None:
+        return
+    try:
+        client.delete(MAIL_THROTTLE_STREAK_KEY)
+    except Exception:
+        pass
+
+def _close_connection(connection):
+    if connection is None:
+        return
+    try:
+        connection.__exit__(None, None, None)
+    except (smtplib.SMTPException, OSError):
+        pass
+
+def queue_email(msg):
+    """
+    Hands a rendered message to the mail worker (see app.tasks.drain_email_queue), which
+    sends queued mail in batches over a persistent SMTP connection. Sends it right away
+    if Redis is unavailable.
+    """
+    client = CacheManager.get_client()
+    if client is None:
+        mail.send(msg)
+        return
+    client.rpush(MAIL_QUEUE_KEY, json.dumps(serialize_message(msg)))
+    schedule_email_drain(client)
+
+def schedule_email_drain(client, countdown=0):
+    """Queues a mail worker run (in `countdown` seconds) unless one is already pending."""
+    from app.tasks import drain_email_queue
+
+    ttl = current_app.config.get('NOTIFICATION_DRAIN_PENDING_TTL', 300) + countdown
+    if client.set(MAIL_DRAIN_PENDING_KEY, 1, nx=True, ex=ttl):
+        drain_email_queue.apply_async(countdown=countdown)
+
+def serialize_message(msg, attempts=0):
+    return {'subject': msg.subject, 'sender': msg.sender, 'recipients': msg.recipients,
+            'body': msg.body, 'html': msg.html, 'attempts': attempts}
+
+def deserialize_message(data):
+    msg = Message(subject=data['subject'], sender=data['sender'], recipients=data['recipients'],
+                  body=data['body'], html=data['html'])
+    return msg, data.get('attempts', 0)
 
 def send_verification_email(user, token):
     """Sends email to verify account."""
@@ -86,31 +209,47 @@ def send_admin_feedback_notification(feedback_item):
         user_id=feedback_item.user.id if feedback_item.user else None
     )
 
-def send_email(to, subject, template, **kwargs):
-    try:
-        app = current_app._get_current_object()
-        sender = app.config.get('MAIL_DEFAULT_SENDER')
-        if not sender:
-            app.logger.error("MAIL_DEFAULT_SENDER is not configured.")
-            raise ValueError("MAIL_DEFAULT_SENDER is not configured.")
+def build_email(to, subject, template, **kwargs):
+    """Renders `template` (.txt and .html) into a Message for `to`."""
+    app = current_app._get_current_object()
+    sender = app.config.get('MAIL_DEFAULT_SENDER')
+    if not sender:
+        app.logger.error("MAIL_DEFAULT_SENDER is not configured.")
+        raise ValueError("MAIL_DEFAULT_SENDER is not configured.")
 
-        msg = Message(
-            subject=subject,
-            sender=sender,
-            recipients=[to]
-        )
-        kwargs['base_url'] = app.config.get('BASE_URL', '')
+    msg = Message(
+        subject=subject,
+        sender=sender,
+        recipients=[to]
+    )
+    kwargs['base_url'] = app.config.get('BASE_URL', '')
 
-        app.logger.debug(f"Attempting to send email to {to} with subject '{subject}' using sender '{sender}'")
-        app.logger.debug(
-            f"SMTP settings: server={app.config.get('MAIL_SERVER')}, port={app.config.get('MAIL_PORT')}, use_tls={app.config.get('MAIL_USE_TLS')}, username={app.config.get('MAIL_USERNAME')}")
+    msg.body = render_template(template + '.txt', **kwargs)
+    msg.html = render_template(template + '.html', **kwargs)
+    return msg
 
-        msg.body = render_template(template + '.txt', **kwargs)
-        msg.html = render_template(template + '.html', **kwargs)
+def build_cached_email(to, subject, template, locale, **kwargs):
+    """
+    Like build_email, but renders from the per-(template, locale) shell cache (see
+    app.mail_services.render_cache): only `kwargs` vary per message, so they must be
+    the message's per-recipient values.
+    """
+    app = current_app._get_current_object()
+    msg = Message(subject=subject, sender=app.config.get('MAIL_DEFAULT_SENDER'), recipients=[to])
+    static = {'base_url': app.config.get('BASE_URL', ''), 'locale': locale}
+    msg.body = render_cached(template + '.txt', locale, static, **kwargs)
+    msg.html = render_cached(template + '.html', locale, static, **kwargs)
+    return msg
 
-        mail.send(msg)
-        app.logger.info(f"Email sent successfully to {to} with subject '{subject}'")
+def send_email(to, subject, template, **kwargs):
+    """Renders an email and queues it for the mail worker. Returns False if it could not be queued."""
+    app = current_app._get_current_object()
+    try:
+        msg = build_email(to, subject, template, **kwargs)
+        app.logger.debug(f"Queueing email to {to} with subject '{subject}' using sender '{msg.sender}'")
+        queue_email(msg)
+        app.logger.info(f"Email to {to} with subject '{subject}' queued")
         return True
     except Exception as e:
         app.logger.error(f"Failed to send email to {to}, subject '{subject}'. Error: {str(e)}", exc_info=True)
-        return False
\ No newline at end of file
+        return False
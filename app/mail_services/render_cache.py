@@ -0,0 +1,100 @@
+"""
+Render cache for emails sent in bulk (price alerts).
+
+An email template is rendered once per (template, locale) into a "shell" in which every
+per-message value (user, product, prices, links) is left as a placeholder token. Sending
+a message then only substitutes the real values into the cached shell, skipping Jinja and
+force_locale entirely. Values are escaped for .html templates exactly as Jinja would.
+"""
+import re
+import threading
+from collections import OrderedDict
+from markupsafe import escape
+from flask import current_app, render_template
+from flask_babel import force_locale
+
+TOKEN = re.compile(r"@@sp:([\w.]+?)(?:\|round(\d+))?@@")
+
+# LRU of rendered shells, at most EMAIL_RENDER_CACHE_SIZE of them.
+_shells = OrderedDict()
+_shells_lock = threading.Lock()
+
+
+class Placeholder:
+    """Stands in for a per-message value while a shell is rendered; attributes and round() chain."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def __str__(self):
+        return f"@@sp:{self._path}@@"
+
+    def __html__(self):
+        return str(self)
+
+    def __round__(self, ndigits=None):
+        return RoundedPlaceholder(self._path, ndigits or 0)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return Placeholder(f"{self._path}.{name}")
+
+
+class RoundedPlaceholder(Placeholder):
+    def __init__(self, path, ndigits):
+        super().__init__(path)
+        self._ndigits = ndigits
+
+    def __str__(self):
+        return f"@@sp:{self._path}|round{self._ndigits}@@"
+
+
+def _resolve(context, path):
+    name, *attributes = path.split('.')
+    value = context[name]
+    for attribute in attributes:
+        value = getattr(value, attribute)
+    return value
+
+
+def render_cached(template_name, locale, static=None, **context):
+    """
+    Renders `template_name` like render_template would under force_locale(locale).
+
+    `static` holds values that are the same for every message (base URL, locale, ...) and are
+    baked into the shell; `context` holds the per-message values. A per-message value that
+    is None is baked in as None too (templates branch on it), with its own shell.
+    """
+    static = static or {}
+    missing = tuple(sorted(name for name, value in context.items() if value is None))
+    key = (template_name, locale, tuple(sorted(static.items())), tuple(sorted(context)), missing)
+
+    with _shells_lock:
+        shell = _shells.get(key)
+        if shell is not None:
+            _shells.move_to_end(key)
+    if shell is None:
+        placeholders = {name: None if value is None else Placeholder(name) for name, value in context.items()}
+        with force_locale(locale):
+            shell = render_template(template_name, **static, **placeholders)
+        size = current_app.config.get('EMAIL_RENDER_CACHE_SIZE', 512)
+        with _shells_lock:
+            _shells[key] = shell
+            while len(_shells) > size:
+                _shells.popitem(last=False)
+
+    html = template_name.endswith(('.html', '.htm', '.xml'))
+
+    def substitute(match):
+        value = _resolve(context, match.group(1))
+        if match.group(2) is not None:
+            value = round(value, int(match.group(2)))
+        return str(escape(value)) if html else str(value)
+
+    return TOKEN.sub(substitute, shell)
+
+
+def clear_render_cache():
+    with _shells_lock:
+        _shells.clear()
@@ -1,10 +1,10 @@
 from app.extensions import db, login_manager
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import current_app
 from flask_login import UserMixin, AnonymousUserMixin
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadTimeSignature, BadSignature, BadPayload
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import orm, Enum as SaEnum
+from sqlalchemy import orm, and_, or_, text, Enum as SaEnum
 from flask_babel import _
 import enum
 import uuid
@@ -15,6 +15,7 @@ class Product(db.Model):
     __table_args__ = (
         db.Index('ix_product_user_id', 'user_id'),
         db.Index('ix_product_last_checked', 'last_checked'),
+        db.Index('ix_product_next_check_at_id', 'next_check_at', 'id'),
         db.UniqueConstraint('user_id', 'url', name='uq_user_product_url'),
     )
 
@@ -30,13 +31,40 @@ class Product(db.Model):
     notification_methods = db.Column(db.ARRAY(db.String(20)), nullable=False)
     target_price_notified = db.Column(db.Boolean, default=False)
     check_frequency = db.Column(db.Integer, nullable=False)
+    # Adaptive mode stretches or shortens check_frequency from price behavior, within these bounds (hours).
+    adaptive_frequency = db.Column(db.Boolean, default=False, nullable=False)
+    min_check_frequency = db.Column(db.Integer, nullable=True)
+    max_check_frequency = db.Column(db.Integer, nullable=True)
     current_price = db.Column(db.Numeric(10, 2))
     last_checked = db.Column(db.DateTime)
+    next_check_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # When the dispatcher last queued a check; until last_checked passes it, next_check_at is its lease.
+    dispatched_at = db.Column(db.DateTime, nullable=True)
     is_comparison_only = db.Column(db.Boolean, default=False, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     user = db.relationship('User', back_populates='products')
+    listing_id = db.Column(db.Integer, db.ForeignKey('listings.id'), nullable=True, index=True)
+    listing = db.relationship('Listing', back_populates='products')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def schedule_next_check(self, checked_at=None, interval_hours=None):
+        """Sets when the dispatcher should next pick this product up (by default check_frequency later)."""
+        hours = interval_hours if interval_hours is not None else self.check_frequency
+        self.next_check_at = (checked_at or datetime.utcnow()) + timedelta(hours=hours)
+
+    @property
+    def scheduled_check_at(self):
+        """The next check for display: None while a dispatched check is still waiting to run."""
+        if self.dispatched_at is not None and (self.last_checked is None or self.dispatched_at > self.last_checked):
+            return None
+        return self.next_check_at
+
+    def ensure_listing(self):
+        """Attaches the product to the shared listing for its URL, creating the listing if needed."""
+        if self.listing is None:
+            self.listing = Listing.get_or_create(self.url, name=self.name)
+        return self.listing
+
     def generate_identifier(self):
         import re
         import hashlib
@@ -70,6 +98,51 @@ class Product(db.Model):
     def __repr__(self):
         return f'<Product {self.name}>'
 
+class Listing(db.Model):
+    """
+    A marketplace item identified by its canonical URL. Every Product that tracks the same
+    item points at one Listing, so the item is scraped once per cycle no matter how many
+    users track it, and its price history is stored once.
+    """
+    __tablename__ = 'listings'
+
+    id = db.Column(db.Integer, primary_key=True)
+    canonical_url = db.Column(db.String(500), unique=True, nullable=False)
+    url = db.Column(db.String(500), nullable=False)
+    domain = db.Column(db.String(100), index=True)
+    name = db.Column(db.String(255))
+    current_price = db.Column(db.Numeric(10, 2))
+    last_checked = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    products = db.relationship('Product', back_populates='listing')
+    price_history = db.relationship('PriceHistory', back_populates='listing', lazy='dynamic',
+                                    cascade="all, delete-orphan")
+
+    @staticmethod
+    def get_or_create(url, name=None):
+        from app.utils.scrapers import canonicalize_url, normalize_domain
+        from urllib.parse import urlparse
+        from sqlalchemy.exc import IntegrityError
+
+        canonical_url = canonicalize_url(url)
+        listing = Listing.query.filter_by(canonical_url=canonical_url).first()
+        if listing:
+            return listing
+
+        listing = Listing(canonical_url=canonical_url, url=url, name=name,
+                          domain=normalize_domain(urlparse(url).netloc))
+        try:
+            with db.session.begin_nested():
+                db.session.add(listing)
+        except IntegrityError:
+            # Another worker created the same listing concurrently.
+            listing = Listing.query.filter_by(canonical_url=canonical_url).one()
+        return listing
+
+    def __repr__(self):
+        return f'<Listing {self.canonical_url}>'
+
+
 class Permission:
     ADMIN = 16
     CREATE_PRODUCT = 32
@@ -165,6 +238,9 @@ class User(UserMixin, db.Model):
     telegram_linking_token = db.Column(db.String(36), unique=True, default=lambda: str(uuid.uuid4()))
     telegram_state = db.Column(db.String(50), nullable=True)
     temp_data = db.Column(db.JSON, nullable=True)
+    # Digest mode: alerts are buffered for alert_digest_window minutes and sent as one message per channel.
+    alert_digest_enabled = db.Column(db.Boolean, default=False, nullable=False)
+    alert_digest_window = db.Column(db.Integer, nullable=True)
 
     def __repr__(self):
         return f'<User {self.email}>'
@@ -407,14 +483,132 @@ class Feedback(db.Model):
 
 
 class PriceHistory(db.Model):
+    # Range-partitioned by month on timestamp (see app/utils/partitions.py), so the primary
+    # key has to include the partition key.
     __tablename__ = 'price_history'
-    id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Records are written per listing; product_id is only set on records that predate listings.
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True, index=True)
+    listing_id = db.Column(db.Integer, db.ForeignKey('listings.id'), nullable=True, index=True)
+    timestamp = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow, index=True)
     price = db.Column(db.Numeric(10, 2), nullable=False)
+    # In change-only mode a record covers a run of identical prices: it is written when the
+    # price changes and last_confirmed_at moves forward on every check that sees the same price.
+    last_confirmed_at = db.Column(db.DateTime, nullable=True)
     # currency = db.Column(db.String(3))
     product = db.relationship('Product', back_populates='price_history')
+    listing = db.relationship('Listing', back_populates='price_history')
 
+    @staticmethod
+    def timeline(records):
+        """
+        Expands records into (timestamp, price) points for charts: each record's start and,
+        for a run of unchanged prices, the last time that price was confirmed.
+        """
+        points = []
+        for record in records:
+            points.append((record.timestamp, record.price))
+            if record.last_confirmed_at and record.last_confirmed_at > record.timestamp:
+                points.append((record.last_confirmed_at, record.price))
+        return points
+
+    @classmethod
+    def for_product(cls, product):
+        """
+        Query for a product's history: its own legacy records plus the records of its
+        listing since the product started being tracked.
+        """
+        if not product.listing_id:
+            return cls.query.filter(cls.product_id == product.id)
+        listing_records = cls.listing_id == product.listing_id
+        if product.created_at:
+            # A change-only record that started earlier but was still current when tracking began counts too.
+            listing_records = and_(listing_records, or_(cls.timestamp >= product.created_at,
+                                                        cls.last_confirmed_at >= product.created_at))
+        return cls.query.filter(or_(cls.product_id == product.id, listing_records))
+
+
+class PriceHistoryDaily(db.Model):
+    """
+    One day of a price series: open/close/min/max and the number of observations.
+    Maintained incrementally by every price check (record_prices), filled in from raw history
+    by rollup_from, and kept after the raw price_history partitions have been dropped.
+    Rows belong to a listing, or to a product for history recorded before listings.
+    """
+    __tablename__ = 'price_history_daily'
+    __table_args__ = (
+        db.UniqueConstraint('listing_id', 'day', name='uq_price_history_daily_listing_day'),
+        db.UniqueConstraint('product_id', 'day', name='uq_price_history_daily_product_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    listing_id = db.Column(db.Integer, db.ForeignKey('listings.id', ondelete='CASCADE'), nullable=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    open_price = db.Column(db.Numeric(10, 2), nullable=False)
+    close_price = db.Column(db.Numeric(10, 2), nullable=False)
+    min_price = db.Column(db.Numeric(10, 2), nullable=False)
+    max_price = db.Column(db.Numeric(10, 2), nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def for_product(cls, product):
+        """Query for a product's daily rows: its listing's days plus any days of its own legacy history."""
+        if not product.listing_id:
+            return cls.query.filter(cls.product_id == product.id)
+        listing_days = cls.listing_id == product.listing_id
+        if product.created_at:
+            listing_days = and_(listing_days, cls.day >= product.created_at.date())
+        return cls.query.filter(or_(cls.product_id == product.id, listing_days))
+
+    @staticmethod
+    def record_prices(observations):
+        """
+        Folds observed prices into their listing's daily rows with one executemany upsert.
+        Each observation is a {'listing_id', 'day', 'price'} dict; observations must be in
+        time order, since the last one of a day becomes its close.
+        """
+        if not observations:
+            return
+        db.session.execute(text("""
+            INSERT INTO price_history_daily
+                (listing_id, day, open_price, close_price, min_price, max_price, samples)
+            VALUES (:listing_id, :day, :price, :price, :price, :price, 1)
+            ON CONFLICT (listing_id, day) DO UPDATE SET
+                close_price = EXCLUDED.close_price,
+                min_price = LEAST(price_history_daily.min_price, EXCLUDED.min_price),
+                max_price = GREATEST(price_history_daily.max_price, EXCLUDED.max_price),
+                samples = price_history_daily.samples + 1
+        """), observations)
+
+    @staticmethod
+    def rollup_from(source_table='price_history'):
+        """
+        Fills in the daily rows missing for the days covered by `source_table` (price_history
+        or one of its partitions). A raw record covers every day from its timestamp through
+        last_confirmed_at, so days inside an unchanged run and the price carried into a day
+        count towards it. Days that already have a row are left alone: record_prices keeps
+        those up to date on every check and they are more accurate than a rebuild.
+        """
+        for owner, has_owner in (('listing_id', 'listing_id IS NOT NULL'), ('product_id', 'listing_id IS NULL')):
+            db.session.execute(text(f"""
+                INSERT INTO price_history_daily
+                    (listing_id, product_id, day, open_price, close_price, min_price, max_price, samples)
+                SELECT listing_id, product_id, day,
+                       (array_agg(price ORDER BY timestamp))[1],
+                       (array_agg(price ORDER BY timestamp DESC))[1],
+                       min(price), max(price), count(*)
+                FROM (
+                    SELECT listing_id, product_id, timestamp, price,
+                           generate_series(timestamp::date,
+                                           greatest(coalesce(last_confirmed_at, timestamp), timestamp)::date,
+                                           interval '1 day')::date AS day
+                    FROM "{source_table}"
+                    WHERE {has_owner}
+                ) covered
+                GROUP BY listing_id, product_id, day
+                ON CONFLICT ({owner}, day) DO NOTHING
+            """))
 
 
 class UserNotification(db.Model):
@@ -447,9 +641,11 @@ class UserNotification(db.Model):
         return {'icon': 'fas fa-bell', 'color_class': 'notification-default', 'action_text': _('Details')}
 
 class Log(db.Model):
+    # Range-partitioned by month on timestamp like price_history; old months are dropped
+    # whole by maintain_log_partitions.
     __tablename__ = 'logs'
-    id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    timestamp = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow, index=True)
     level = db.Column(db.String(50), index=True)
     message = db.Column(db.Text)
     module = db.Column(db.String(100))
@@ -475,10 +671,6 @@ class AdminLog(db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    import time
-    current_app.logger.info(f"Loading user {user_id}")
-    start = time.time()
-    user = User.query.get(int(user_id))
-    current_app.logger.info(f"User {user_id} loaded in {time.time() - start} seconds")
-    return user
+    from app.utils.user_cache import load_cached_user
+    return load_cached_user(user_id)
 
@@ -3,8 +3,11 @@ from flask_babel import force_locale, _
 from app.extensions import db
 from app.models import UserNotification, Product, User
 from datetime import datetime
+from sqlalchemy import insert
 
-def create_account_notification(user_id, type, short_message, message=None, product_id=None, data=None, locale='en'):
+def create_account_notification(user_id, type, short_message, message=None, product_id=None, data=None, locale='en',
+                                commit=True):
+    """Adds an account notification; with commit=False the caller commits it together with others."""
     app = current_app._get_current_object()
     try:
         with force_locale(locale):
@@ -18,7 +21,8 @@ def create_account_notification(user_id, type, short_message, message=None, prod
                 created_at=datetime.utcnow()
             )
             db.session.add(notification)
-            db.session.commit()
+            if commit:
+                db.session.commit()
             app.logger.info(f"Account notification '{type}' created for user {user_id}")
             return notification
     except Exception as e:
@@ -26,7 +30,8 @@ def create_account_notification(user_id, type, short_message, message=None, prod
         app.logger.error(f"Error creating account notification for user {user_id}: {str(e)}", exc_info=True)
         return None
 
-def create_price_alert_account_notification(user, product, old_price, new_price, alert_type="target_reached"):
+def price_alert_notification_fields(user, product, old_price, new_price, alert_type="target_reached"):
+    """The UserNotification column values of a price alert, in the user's language."""
     locale = user.language if user.language else 'en'
     with force_locale(locale):
         product_link = f"<a href='{product.url}' target='_blank'>{product.name}</a>"
@@ -60,15 +65,37 @@ def create_price_alert_account_notification(user, product, old_price, new_price,
 
         full_message = f"{short_message} {message_body}<br>{_('Product:')} {product_link}"
 
-        return create_account_notification(
-            user_id=user.id,
-            type=alert_type,
-            short_message=short_message,
-            message=full_message,
-            product_id=product.id,
-            data=data,
-            locale=locale
-        )
+    return {
+        'user_id': user.id,
+        'type': alert_type,
+        'short_message': short_message,
+        'message': full_message,
+        'product_id': product.id,
+        'data': data,
+    }
+
+def create_price_alert_account_notification(user, product, old_price, new_price, alert_type="target_reached",
+                                            commit=True):
+    fields = price_alert_notification_fields(user, product, old_price, new_price, alert_type)
+    return create_account_notification(
+        locale=user.language if user.language else 'en',
+        commit=commit,
+        **fields
+    )
+
+def create_price_alert_account_notifications(alerts):
+    """
+    Writes the account notifications of many (user, product, old_price, new_price, alert_type)
+    alerts with one bulk INSERT. The caller commits.
+    """
+    rows = []
+    now = datetime.utcnow()
+    for user, product, old_price, new_price, alert_type in alerts:
+        rows.append(dict(price_alert_notification_fields(user, product, old_price, new_price, alert_type),
+                         is_read=False, created_at=now))
+    if rows:
+        db.session.execute(insert(UserNotification), rows)
+    return len(rows)
 
 def create_system_account_notification(user_id, message_details):
     user = User.query.get(user_id)
@@ -1,6 +1,7 @@
 from flask import current_app, url_for
 from flask_babel import force_locale, _
-from app.mail_services import send_email
+from functools import lru_cache
+from app.mail_services import build_cached_email, build_email, queue_email
 
 def get_tracking_url(product_id=None):
     """Generate the URL for the tracked products page, optionally highlighting a specific product."""
@@ -17,16 +18,32 @@ def get_tracking_url(product_id=None):
             return f"{base_url}?highlight={product_id}"
         return base_url
 
-def send_price_alert_email(user, product, old_price, new_price, alert_type="target_reached"):
-    """Send a price alert email to the user."""
+ALERT_TEMPLATES = {
+    'target_reached': 'email/notifications/target_price_reached',
+    'price_drop': 'email/notifications/price_drop',
+    'price_increase': 'email/notifications/price_increase',
+}
+
+@lru_cache(maxsize=None)
+def alert_subject_format(alert_type, locale):
+    """The translated subject of an alert type, with a %(name)s placeholder for the product name."""
+    with force_locale(locale):
+        if alert_type == "target_reached":
+            return _('🎯 Price Alert! "%(name)s" reached your target price!')
+        elif alert_type == "price_drop":
+            return _('📉 Price Drop for "%(name)s"!')
+        return _('📈 Price Increase for "%(name)s"!')
+
+def build_price_alert_email(user, product, old_price, new_price, alert_type="target_reached"):
+    """Renders a price alert email for the user in their language; None if it should not be sent."""
     app = current_app._get_current_object()
     if not user.email or not user.enable_email_notifications:
         app.logger.info(f"Email notifications disabled or no email for user {user.id}. Skipping price alert.")
-        return False
+        return None
 
     if old_price is None:
         app.logger.error(f"Cannot send price alert - old_price is None for product {product.id}")
-        return False
+        return None
 
     locale = user.language if user and user.language else app.config.get('BABEL_DEFAULT_LOCALE', 'en')
 
@@ -39,20 +56,15 @@ def send_price_alert_email(user, product, old_price, new_price, alert_type="targ
         'tracking_dashboard_url': get_tracking_url(product.id),
     }
 
-    try:
-        with force_locale(locale):
-            if alert_type == "target_reached":
-                subject = _('🎯 Price Alert! "%(name)s" reached your target price!', name=product.name)
-                template_name = 'email/notifications/target_price_reached'
-            elif alert_type == "price_drop":
-                subject = _('📉 Price Drop for "%(name)s"!', name=product.name)
-                template_name = 'email/notifications/price_drop'
-            else:
-                subject = _('📈 Price Increase for "%(name)s"!', name=product.name)
-                template_name = 'email/notifications/price_increase'
-                template_data['target_price'] = float(product.target_price) if product.target_price else None
+    if alert_type == "price_increase":
+        template_data['target_price'] = float(product.target_price) if product.target_price else None
+    subject = alert_subject_format(alert_type, locale) % {'name': product.name}
+    template_name = ALERT_TEMPLATES.get(alert_type, ALERT_TEMPLATES['price_increase'])
 
-        send_email(
+    if app.config.get('EMAIL_RENDER_CACHE', True):
+        return build_cached_email(user.email, subject, template_name, locale, **template_data)
+    with force_locale(locale):
+        return build_email(
             to=user.email,
             subject=subject,
             template=template_name,
@@ -60,8 +72,34 @@ def send_price_alert_email(user, product, old_price, new_price, alert_type="targ
             **template_data
         )
 
+def send_price_alert_email(user, product, old_price, new_price, alert_type="target_reached"):
+    """Send a price alert email to the user."""
+    app = current_app._get_current_object()
+    try:
+        msg = build_price_alert_email(user, product, old_price, new_price, alert_type)
+        if msg is None:
+            return False
+        queue_email(msg)
         app.logger.info(f"Price alert email for user {user.id} queued successfully.")
         return True
     except Exception as e:
         app.logger.error(f"Failed to queue price alert email for user {user.id}: {str(e)}", exc_info=True)
-        return False
\ No newline at end of file
+        return False
+
+def build_digest_email(user, alerts):
+    """
+    Renders one email listing many alerts for the user.
+    `alerts` are dicts with 'product', 'alert_type', 'old_price' and 'new_price'.
+    """
+    locale = user.language if user.language else current_app.config.get('BABEL_DEFAULT_LOCALE', 'en')
+    with force_locale(locale):
+        subject = _('📬 %(count)s price alerts for your tracked products', count=len(alerts))
+        return build_email(
+            to=user.email,
+            subject=subject,
+            template='email/notifications/digest',
+            locale=locale,
+            user=user,
+            alerts=alerts,
+            tracking_dashboard_url=get_tracking_url(),
+        )
@@ -0,0 +1,267 @@
+"""
+Alert fan-out through per-channel Redis queues.
+
+Price checks only publish small alert events; the `notifications` Celery queue drains them
+per channel in batches, so slow SMTP or Telegram never holds up a scrape worker. Every event
+carries an idempotency key, and a delivered key is remembered for a while so a retried
+drain (or a re-published event) is not sent twice.
+"""
+import json
+import time
+from decimal import Decimal
+from flask import current_app
+from app.utils.cache_utils import CacheManager
+from .account_notifier import create_price_alert_account_notification
+from app.mail_services import send_messages
+from .email_notifier import build_price_alert_email, send_price_alert_email
+from .telegram_notifier import format_telegram_price_alert, send_telegram_messages, send_telegram_price_alert
+
+CHANNELS = ('account', 'email', 'telegram')
+QUEUE_KEY = "notifications:queue:{channel}"
+SENT_KEY = "notifications:sent:{key}"
+DRAIN_PENDING_KEY = "notifications:drain_pending:{channel}"
+DIGEST_KEY = "notifications:digest:{user_id}"
+DIGEST_DUE_KEY = "notifications:digest_due"
+
+
+def notification_channels(product, user, alert_type, old_price):
+    """Returns the channels an alert should go out on, given the user's settings and the product's methods."""
+    if alert_type == 'target_reached' and not user.enable_target_price_reached_notifications:
+        current_app.logger.info(f"Target price notifications disabled for user {user.id}")
+        return []
+    elif alert_type == 'price_drop' and not user.enable_price_drop_notifications:
+        current_app.logger.info(f"Price drop notifications disabled for user {user.id}")
+        return []
+    elif alert_type == 'price_increase':
+        current_app.logger.info(f"Price increase notifications disabled for user {user.id}")
+        return []
+
+    notification_methods = product.notification_methods or ['account']
+    channels = []
+    if 'account' in notification_methods:
+        channels.append('account')
+    if 'email' in notification_methods and user.enable_email_notifications:
+        if old_price is None:
+            current_app.logger.warning(f"Cannot send email for product {product.id} - old_price is None")
+        else:
+            channels.append('email')
+    if 'telegram' in notification_methods and user.telegram_chat_id:
+        channels.append('telegram')
+    return channels
+
+
+def deliver(channel, user, product, alert_type, old_price, new_price, commit=True):
+    """Sends one alert on one channel. Account notifications are only flushed when commit=False."""
+    if channel == 'account':
+        return create_price_alert_account_notification(user, product, old_price, new_price, alert_type,
+                                                       commit=commit)
+    if channel == 'email':
+        return send_price_alert_email(user, product, old_price, new_price, alert_type)
+    if channel == 'telegram':
+        return send_telegram_price_alert(user, product, old_price, new_price, alert_type)
+    raise ValueError(f"Unknown notification channel '{channel}'")
+
+
+def build_alert_events(product, user, alert_type, old_price, new_price, checked_at):
+    """
+    Builds one event per channel for an alert. The idempotency key identifies the price
+    check that raised it, so the same check can never notify a user twice on a channel.
+    """
+    events = []
+    for channel in notification_channels(product, user, alert_type, old_price):
+        events.append({
+            'key': f"{channel}:{product.id}:{alert_type}:{checked_at.isoformat()}",
+            'channel': channel,
+            'user_id': user.id,
+            'product_id': product.id,
+            'alert_type': alert_type,
+            'old_price': str(old_price) if old_price is not None else None,
+            'new_price': str(new_price),
+            'attempts': 0,
+        })
+    return events
+
+
+def event_prices(event):
+    """The (old_price, new_price) of an event as Decimals."""
+    old_price = Decimal(event['old_price']) if event.get('old_price') is not None else None
+    return old_price, Decimal(event['new_price'])
+
+
+def publish_events(events):
+    """
+    Appends events to their channel queues and makes sure a drain is scheduled for each channel.
+    Returns False (publishing nothing) when Redis is unavailable, so the caller can fall back.
+    """
+    if not events:
+        return True
+    client = CacheManager.get_client()
+    if client is None:
+        return False
+
+    channels = sorted({event['channel'] for event in events})
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.rpush(QUEUE_KEY.format(channel=event['channel']), json.dumps(event))
+            pipe.execute()
+    except Exception as e:
+        current_app.logger.error(f"Failed to publish {len(events)} notification events: {e}")
+        return False
+
+    for channel in channels:
+        schedule_drain(channel, client)
+    return True
+
+
+def schedule_drain(channel, client=None, countdown=0):
+    """Queues a drain task for the channel (in `countdown` seconds) unless one is already pending."""
+    from app.tasks import drain_notifications
+
+    client = client or CacheManager.get_client()
+    ttl = current_app.config.get('NOTIFICATION_DRAIN_PENDING_TTL', 300) + countdown
+    if client is None or client.set(DRAIN_PENDING_KEY.format(channel=channel), 1, nx=True, ex=ttl):
+        drain_notifications.apply_async(args=[channel], countdown=countdown)
+
+
+def pop_events(channel, count, client=None):
+    """Takes up to `count` events off a channel queue, oldest first."""
+    client = client or CacheManager.get_client()
+    raw = client.lpop(QUEUE_KEY.format(channel=channel), count) or []
+    return [json.loads(item) for item in raw]
+
+
+def requeue_event(event, client=None, count_attempt=True):
+    """
+    Puts an event back at the end of its queue; False once it is out of attempts.
+    Deferrals (rate limits) pass count_attempt=False, since they are not failed deliveries.
+    """
+    client = client or CacheManager.get_client()
+    if count_attempt:
+        event['attempts'] = event.get('attempts', 0) + 1
+        if event['attempts'] > current_app.config.get('NOTIFICATION_MAX_ATTEMPTS', 3):
+            return False
+    client.rpush(QUEUE_KEY.format(channel=event['channel']), json.dumps(event))
+    return True
+
+
+def claim_event(event, client=None):
+    """Marks an event as being delivered; False if it has already been delivered (or is in flight)."""
+    client = client or CacheManager.get_client()
+    ttl = current_app.config.get('NOTIFICATION_IDEMPOTENCY_TTL', 86400)
+    return bool(client.set(SENT_KEY.format(key=event['key']), 1, nx=True, ex=ttl))
+
+
+def release_event(event, client=None):
+    """Forgets a claim after a failed delivery so a retry can send the event."""
+    client = client or CacheManager.get_client()
+    client.delete(SENT_KEY.format(key=event['key']))
+
+
+def finish_drain(channel, client=None):
+    """
+    Clears the channel's pending-drain marker. Returns True if events arrived while the
+    drain was running, in which case the caller should schedule another drain.
+    """
+    client = client or CacheManager.get_client()
+    client.delete(DRAIN_PENDING_KEY.format(channel=channel))
+    return client.llen(QUEUE_KEY.format(channel=channel)) > 0
+
+
+def buffer_digest_alerts(alerts):
+    """
+    Buffers (product, user, old_price, new_price, alert_types, checked_at) alerts of users in
+    digest mode. A user's first buffered alert starts their digest window (alert_digest_window
+    minutes, ALERT_DIGEST_WINDOW_MINUTES by default). Returns False when Redis is unavailable.
+    """
+    client = CacheManager.get_client()
+    if client is None:
+        return False
+
+    default_window = current_app.config.get('ALERT_DIGEST_WINDOW_MINUTES', 60)
+    now = time.time()
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for product, user, old_price, new_price, alert_types, checked_at in alerts:
+                for alert_type in alert_types:
+                    pipe.rpush(DIGEST_KEY.format(user_id=user.id), json.dumps({
+                        'product_id': product.id,
+                        'alert_type': alert_type,
+                        'old_price': str(old_price) if old_price is not None else None,
+                        'new_price': str(new_price),
+                        'checked_at': checked_at.isoformat(),
+                    }))
+                due_at = now + (user.alert_digest_window or default_window) * 60
+                pipe.zadd(DIGEST_DUE_KEY, {user.id: due_at}, nx=True)
+            pipe.execute()
+    except Exception as e:
+        current_app.logger.error(f"Failed to buffer {len(alerts)} digest alerts: {e}")
+        return False
+    return True
+
+
+def take_due_digests(limit, client=None):
+    """
+    Takes the buffered alerts of up to `limit` users whose digest window has ended.
+    Each user's buffer is read and removed in one transaction, so concurrent flushes never
+    send the same digest twice. Returns {user_id: [alert, ...]}.
+    """
+    client = client or CacheManager.get_client()
+    due = client.zrangebyscore(DIGEST_DUE_KEY, '-inf', time.time(), start=0, num=limit)
+    digests = {}
+    for user_id in due:
+        key = DIGEST_KEY.format(user_id=user_id)
+        with client.pipeline(transaction=True) as pipe:
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            pipe.zrem(DIGEST_DUE_KEY, user_id)
+            raw, _deleted, removed = pipe.execute()
+        if removed and raw:
+            digests[int(user_id)] = [json.loads(item) for item in raw]
+    return digests
+
+
+def deliver_telegram_batch(events, users, products):
+    """
+    Sends the Telegram alerts of a batch concurrently over the pooled client.
+    Digest events bring their own text. Returns [(event, result)] with results as from
+    TelegramClient.send; events whose alert type has no Telegram message get
+    {'ok': True, 'skipped': True}.
+    """
+    messages, sendable, results = [], [], []
+    for event in events:
+        user = users[event['user_id']]
+        if event.get('text'):
+            text = event['text']
+        else:
+            old_price, new_price = event_prices(event)
+            text = format_telegram_price_alert(products[event['product_id']], old_price, new_price,
+                                               event['alert_type'])
+        if text and user.telegram_chat_id:
+            messages.append((user.telegram_chat_id, text, 'MarkdownV2'))
+            sendable.append(event)
+        else:
+            results.append((event, {'ok': True, 'skipped': True}))
+    if messages:
+        results.extend(zip(sendable, send_telegram_messages(messages)))
+    return results
+
+
+def deliver_email_batch(events, users, products):
+    """
+    Renders the email alerts of a batch and sends them over one SMTP connection.
+    Returns [(event, error)] with error None for sent (or intentionally skipped) emails.
+    """
+    messages, sendable, results = [], [], []
+    for event in events:
+        user, product = users[event['user_id']], products[event['product_id']]
+        old_price, new_price = event_prices(event)
+        msg = build_price_alert_email(user, product, old_price, new_price, event['alert_type'])
+        if msg is None:
+            results.append((event, None))
+        else:
+            messages.append(msg)
+            sendable.append(event)
+    if messages:
+        results.extend((event, error) for event, (msg, error) in zip(sendable, send_messages(messages)))
+    return results
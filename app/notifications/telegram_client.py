@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+import weakref
+import aiohttp
+from flask import current_app, has_app_context
+from app.utils.scrapers import get_redis_connection
+from app.utils.throttling import take_token
+
+logger = logging.getLogger("telegram")
+
+# Set for `retry_after` seconds when Telegram answers 429, so every worker pauses together.
+PAUSE_KEY = "telegram:paused"
+
+
+class TelegramClient:
+    """
+    Sends Bot API messages over one pooled aiohttp session per worker event loop.
+
+    Sends are paced by shared Redis token buckets, `global_rate` messages/s for the bot and
+    `chat_rate` messages/s per chat, as Telegram requires. A 429 pauses all workers for the
+    `retry_after` Telegram asks for. Nothing is retried here: every send returns a result
+    saying whether (and when) it may be retried, and the caller decides.
+    """
+
+    def __init__(self, token, api_base_url='https://api.telegram.org', global_rate=30.0, chat_rate=1.0,
+                 max_wait=5.0, pool_size=20, timeout=10):
+        self.url = f"{api_base_url}/bot{token}/sendMessage"
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.max_wait = max_wait
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+
+    async def send(self, chat_id, text, parse_mode=None, reply_markup=None) -> dict:
+        """
+        Sends one message. Returns {'ok': True}, or {'ok': False, 'error': ..., 'retry_after': seconds}
+        where retry_after is None for errors that retrying will not fix (e.g. the user blocked the bot).
+        """
+        r = await get_redis_connection()
+        paused_ms = await r.pttl(PAUSE_KEY)
+        if paused_ms and paused_ms > 0:
+            return {'ok': False, 'error': 'paused', 'retry_after': paused_ms / 1000}
+
+        # Per-chat first: a message to a throttled chat must not use up capacity other chats could use.
+        wait = await take_token(r, f"telegram:chat:{chat_id}", self.chat_rate, 1, self.max_wait)
+        if not wait:
+            wait = await take_token(r, "telegram:global", self.global_rate, int(self.global_rate), self.max_wait)
+        if wait:
+            return {'ok': False, 'error': 'rate_limited', 'retry_after': wait}
+
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        if reply_markup:
+            payload['reply_markup'] = json.dumps(reply_markup)
+
+        try:
+            session = self._get_session()
+            async with session.post(self.url, json=payload) as response:
+                body = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            return {'ok': False, 'error': f"network_error: {e}", 'retry_after': 5}
+
+        if response.status == 200 and body.get('ok'):
+            return {'ok': True}
+
+        description = body.get('description')
+        if response.status == 429:
+            retry_after = (body.get('parameters') or {}).get('retry_after', 1)
+            await r.set(PAUSE_KEY, 1, px=int(retry_after * 1000))
+            logger.warning(f"Telegram flood limit hit, pausing sends for {retry_after}s")
+            # Reported like a send refused during the pause, so the message is not charged an attempt.
+            return {'ok': False, 'error': 'paused', 'details': description, 'retry_after': retry_after}
+        if response.status >= 500:
+            return {'ok': False, 'error': description, 'retry_after': 5}
+        return {'ok': False, 'error': description, 'retry_after': None}
+
+    async def send_many(self, messages) -> list:
+        """
+        Sends (chat_id, text, parse_mode) messages concurrently over the pool.
+        Returns their results in the same order.
+        """
+        return await asyncio.gather(*(self.send(chat_id, text, parse_mode) for chat_id, text, parse_mode in messages))
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_telegram_client() -> TelegramClient:
+    """Returns the Telegram client bound to the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        config = current_app.config if has_app_context() else {}
+        client = TelegramClient(
+            config.get('TELEGRAM_BOT_TOKEN'),
+            api_base_url=config.get('TELEGRAM_API_BASE_URL', 'https://api.telegram.org'),
+            global_rate=float(config.get('TELEGRAM_GLOBAL_RATE', 30)),
+            chat_rate=float(config.get('TELEGRAM_CHAT_RATE', 1)),
+            max_wait=float(config.get('TELEGRAM_RATE_LIMIT_MAX_WAIT', 5)),
+            pool_size=int(config.get('TELEGRAM_POOL_SIZE', 20)),
+        )
+        _clients[loop] = client
+    return client
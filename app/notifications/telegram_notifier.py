@@ -1,55 +1,54 @@
-import requests
 from flask import current_app
-import json
+from app.utils.scrapers import run_async_in_sync
+from .telegram_client import get_telegram_client
 
 
 def send_telegram_message(chat_id: str, message: str, parse_mode: str = None, reply_markup=None):
     """
-    Send a message to a Telegram chat.
+    Send a message to a Telegram chat through the pooled, rate-limited Telegram client.
     Args:
         chat_id (str): The Telegram chat ID.
         message (str): The message to send.
         parse_mode (str, optional): Parse mode for the message (e.g., 'MarkdownV2').
         reply_markup (dict, optional): Inline keyboard or other reply markup.
+    Returns:
+        bool: True if Telegram accepted the message.
     """
-    current_app.logger.info(f"Attempting to send message to chat_id: {chat_id}")
-    token = current_app.config.get('TELEGRAM_BOT_TOKEN')
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': message
-    }
-    if parse_mode:
-        payload['parse_mode'] = parse_mode
-    if reply_markup:
-        payload['reply_markup'] = json.dumps(reply_markup)
+    async def send():
+        return await get_telegram_client().send(chat_id, message, parse_mode, reply_markup)
 
     try:
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            current_app.logger.info(f"SUCCESS: Telegram message sent to chat_id {chat_id}")
-        else:
-            error_code = response.json().get('error_code')
-            error_description = response.json().get('description')
-            current_app.logger.error(
-                f"FAILURE: Telegram API returned an error for chat_id {chat_id}. Code: {error_code}, Description: '{error_description}'")
+        result = run_async_in_sync(send())
     except Exception as e:
         current_app.logger.error(f"Error sending Telegram message to chat_id {chat_id}: {str(e)}")
+        return False
 
+    if not result['ok']:
+        current_app.logger.error(
+            f"FAILURE: Telegram message to chat_id {chat_id} not sent: {result['error']}"
+            + (f" (retry after {result['retry_after']}s)" if result['retry_after'] else ""))
+    return result['ok']
+
+
+def send_telegram_messages(messages):
+    """
+    Sends (chat_id, text, parse_mode) messages concurrently over the pooled client.
+    Returns one result per message, see TelegramClient.send.
+    """
+    async def send():
+        return await get_telegram_client().send_many(messages)
+
+    return run_async_in_sync(send())
 
-def send_telegram_price_alert(user, product, old_price, new_price, alert_type="target_reached"):
-    app = current_app._get_current_object()
-    if not user.telegram_chat_id:
-        app.logger.info(f"No Telegram Chat ID for user {user.id}. Skipping price alert.")
-        return False
 
+def format_telegram_price_alert(product, old_price, new_price, alert_type="target_reached"):
+    """The MarkdownV2 text of a price alert, or an empty string for alert types not sent to Telegram."""
     product_name_safe = escape_markdown_v2(product.name)
-    message_text = ""
 
     if alert_type == "target_reached":
         price = escape_markdown_v2(f"{new_price}$")
         target = escape_markdown_v2(f"{product.target_price}$")
-        message_text = (
+        return (
             f"🎯 *Target Price Reached\\!*\n\n"
             f"Product: *{product_name_safe}*\n"
             f"New Price: *{price}* \\(Target: {target}\\)\n\n"
@@ -58,13 +57,45 @@ def send_telegram_price_alert(user, product, old_price, new_price, alert_type="t
     elif alert_type == "price_drop":
         price = escape_markdown_v2(f"{new_price}$")
         old = escape_markdown_v2(f"{old_price}$")
-        message_text = (
+        return (
             f"📉 *Price Drop\\!*\n\n"
             f"Product: *{product_name_safe}*\n"
             f"New Price: *{price}* \\(was {old}\\)\n\n"
             f"[View Product]({product.url})"
         )
+    return ""
+
+
+def format_telegram_digest(alerts, max_length=4000):
+    """
+    The MarkdownV2 text of an alert digest: one line per alert, cut off (with a count of the
+    rest) before Telegram's 4096 character limit.
+    `alerts` are dicts with 'product', 'alert_type', 'old_price' and 'new_price'.
+    """
+    icons = {'target_reached': '🎯', 'price_drop': '📉', 'price_increase': '📈'}
+    header = f"📬 *Price Alerts* \\({len(alerts)}\\)\n\n"
+    lines = []
+    length = len(header)
+    for index, alert in enumerate(alerts):
+        product = alert['product']
+        old = escape_markdown_v2(f"{alert['old_price']}$") if alert['old_price'] is not None else "?"
+        line = (f"{icons.get(alert['alert_type'], '•')} [{escape_markdown_v2(product.name)}]({product.url}): "
+                f"{old} → *{escape_markdown_v2(str(alert['new_price']) + '$')}*")
+        if length + len(line) + 40 > max_length:
+            lines.append(escape_markdown_v2(f"…and {len(alerts) - index} more"))
+            break
+        lines.append(line)
+        length += len(line) + 1
+    return header + "\n".join(lines)
+
+
+def send_telegram_price_alert(user, product, old_price, new_price, alert_type="target_reached"):
+    app = current_app._get_current_object()
+    if not user.telegram_chat_id:
+        app.logger.info(f"No Telegram Chat ID for user {user.id}. Skipping price alert.")
+        return False
 
+    message_text = format_telegram_price_alert(product, old_price, new_price, alert_type)
     if message_text:
         return send_telegram_message(user.telegram_chat_id, message_text, parse_mode='MarkdownV2')
     return False
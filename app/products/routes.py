@@ -5,11 +5,14 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, current_app, jsonify, request, Response, session
 from flask_login import login_required, current_user
 from flask_babel import _
-from app.models import Product, PriceHistory
+from app.models import Product, PriceHistory, PriceHistoryDaily
 from datetime import datetime, timedelta
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
 from sqlalchemy.exc import DataError
 from app.products.services import clean_price
-import posthog
+from app.utils.helpers import keyset_cursor, lttb, parse_keyset_cursor
+from app.utils import analytics
 
 from app.extensions import db
 from app.models import Product
@@ -111,8 +114,8 @@ def index():
                 if product is None:
                     return redirect(url_for('products.index'))
 
-                posthog.capture(str(current_user.id), 'product_added',
-                                {'product_id': product.id, 'product_name': product.name})
+                analytics.capture(str(current_user.id), 'product_added',
+                                  {'product_id': product.id, 'product_name': product.name})
 
                 if product.url.startswith('mock://'):
                     check_price_for_product.delay(product.id)
@@ -154,15 +157,50 @@ def product_history(product_id):
         flash('You do not have permission to view this product.', 'error')
         return redirect(url_for('profile.index'))
 
-    history_records = PriceHistory.query.filter_by(product_id=product.id).order_by(PriceHistory.timestamp.asc()).all()
-
-    # Prepare chart data for visualization
+    history_query = PriceHistory.for_product(product)
+    first_seen, initial_price, min_price, max_price, record_count = history_query.with_entities(
+        func.min(PriceHistory.timestamp),
+        array_agg(aggregate_order_by(PriceHistory.price, PriceHistory.timestamp.asc()))[1],
+        func.min(PriceHistory.price),
+        func.max(PriceHistory.price),
+        func.count(PriceHistory.id),
+    ).one()
+    rollup_after = timedelta(days=current_app.config.get('PRICE_CHART_ROLLUP_AFTER_DAYS', 28))
+
+    points = None
+    if first_seen and datetime.utcnow() - first_seen > rollup_after:
+        # Long-lived product: raw rows may already be past retention, so the metrics and chart
+        # come from the daily rollups. Until backfill-price-rollups has run there are none,
+        # and the raw rows are used as before.
+        daily_query = PriceHistoryDaily.for_product(product)
+        daily_points = [(datetime.combine(day, datetime.min.time()), price) for day, price in
+                        daily_query.with_entities(PriceHistoryDaily.day, PriceHistoryDaily.close_price)
+                        .order_by(PriceHistoryDaily.day.asc())]
+        if daily_points:
+            initial_price, min_price, max_price = daily_query.with_entities(
+                array_agg(aggregate_order_by(PriceHistoryDaily.open_price, PriceHistoryDaily.day.asc()))[1],
+                func.min(PriceHistoryDaily.min_price),
+                func.max(PriceHistoryDaily.max_price),
+            ).one()
+            points = daily_points
+            label_format = '%d.%m.%Y'
+    if points is None:
+        points = PriceHistory.timeline(
+            history_query.with_entities(PriceHistory.timestamp, PriceHistory.price, PriceHistory.last_confirmed_at)
+            .order_by(PriceHistory.timestamp.asc()).all())
+        label_format = '%d.%m.%Y %H:%M'
+
+    sampled = lttb([((timestamp - datetime(1970, 1, 1)).total_seconds(), float(price), timestamp)
+                    for timestamp, price in points],
+                   current_app.config.get('PRICE_CHART_MAX_POINTS', 300))
     chart_data = {
-        "labels": [h.timestamp.strftime('%d.%m.%Y %H:%M') for h in history_records],
-        "prices": [float(h.price) for h in history_records]
+        "labels": [timestamp.strftime(label_format) for x, price, timestamp in sampled],
+        "prices": [price for x, price, timestamp in sampled]
     }
+    if initial_price is None:
+        initial_price = product.target_price
+    change_count = max(record_count - 1, 0)
 
-    initial_price = history_records[0].price if history_records else product.target_price
     price_difference = product.current_price - initial_price if product.current_price and initial_price else 0
     price_difference_percent = (price_difference / initial_price * 100) if initial_price else 0
 
@@ -172,9 +210,9 @@ def product_history(product_id):
         "initial_price": initial_price,
         "price_difference": price_difference,
         "price_difference_percent": f"{price_difference_percent:.1f}",
-        "min_price": min([h.price for h in history_records]) if history_records else None,
-        "max_price": max([h.price for h in history_records]) if history_records else None,
-        "change_count": len(history_records) - 1,
+        "min_price": min_price,
+        "max_price": max_price,
+        "change_count": change_count,
         "last_checked": product.last_checked,
     }
 
@@ -182,18 +220,27 @@ def product_history(product_id):
     check_info = {
         "interval": product.check_frequency,
         "last_checked": product.last_checked,
-        "next_check": (
-                    product.last_checked + timedelta(hours=product.check_frequency)) if product.last_checked else None
+        "next_check": product.scheduled_check_at
     }
 
-    # Prepare history table data
+    # Prepare history table data: newest first, one keyset page at a time
+    page_size = current_app.config.get('PRICE_HISTORY_PAGE_SIZE', 50)
+    table_query = history_query.with_entities(
+        PriceHistory.id, PriceHistory.timestamp, PriceHistory.price, PriceHistory.last_confirmed_at)
+    cursor = parse_keyset_cursor(request.args.get('before'))
+    if cursor:
+        table_query = table_query.filter(tuple_(PriceHistory.timestamp, PriceHistory.id) < cursor)
+    # One extra row tells whether there is an older page and gives the last row's change.
+    page = table_query.order_by(PriceHistory.timestamp.desc(), PriceHistory.id.desc()).limit(page_size + 1).all()
+
     history_for_table = []
-    for i, record in enumerate(history_records):
-        diff = None
-        if i > 0:
-            diff = record.price - history_records[i - 1].price
+    for i, record in enumerate(page[:page_size]):
+        diff = record.price - page[i + 1].price if i + 1 < len(page) else None
         history_for_table.append({'record': record, 'diff': diff})
-    history_for_table.reverse()
+    next_cursor = None
+    if len(page) > page_size:
+        last = page[page_size - 1]
+        next_cursor = keyset_cursor(last.timestamp, last.id)
 
     return render_template('products/product_history.html',
                            title=f"History for {product.name}",
@@ -201,7 +248,10 @@ def product_history(product_id):
                            metrics=metrics,
                            check_info=check_info,
                            chart_data=chart_data,
-                           history_table=history_for_table)
+                           history_table=history_for_table,
+                           next_cursor=next_cursor,
+                           is_first_page=cursor is None)
+
 
 @bp.route('/add-product-confirmed', methods=['POST'])
 @login_required
@@ -218,7 +268,7 @@ def add_product_confirmed():
 
     if enable_email:
         current_user.enable_email_notifications = True
-        db.session.add(current_user)
+        db.session.add(current_user.model)
         db.session.commit()
         flash(_('Email notifications have been enabled for your account.'), 'info')
     else:
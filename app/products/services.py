@@ -12,7 +12,7 @@ import aiohttp
 from app.utils.cache_utils import SearchResultsCache
 from decimal import Decimal, InvalidOperation
 from flask_babel import _
-from app.models import Product, PriceHistory
+from app.models import Product, PriceHistory, PriceHistoryDaily
 from app.utils.scrapers import extract_product_name
 from flask import current_app, flash, redirect, url_for
 from sqlalchemy.exc import IntegrityError, DataError
@@ -67,13 +67,8 @@ def add_product(form_data):
             )
         db.session.flush()
 
-        # Record the initial price history
-        initial_history = PriceHistory(
-            product_id=product.id,
-            price=product.current_price,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(initial_history)
+        # Attach the shared listing and record the initial price history
+        record_initial_price(product)
 
         db.session.commit()
         current_app.logger.info(f"Product added successfully: {product.id}")
@@ -82,6 +77,37 @@ def add_product(form_data):
         current_app.logger.error(f"Failed to add product: {str(e)}", exc_info=True)
         raise e
 
+def record_initial_price(product):
+    """
+    Attaches a freshly added product to the shared listing for its URL and, if the price
+    is already known, stores it as the listing's latest price and history record and
+    schedules the next check one interval ahead (otherwise the product is due right away).
+
+    Args:
+        product (Product): The product being added; must already be flushed.
+    """
+    listing = product.ensure_listing()
+    db.session.flush()
+    if product.current_price is None:
+        return
+
+    now = datetime.utcnow()
+    product.schedule_next_check(now)
+    latest_record = listing.price_history.order_by(PriceHistory.timestamp.desc()).first()
+    if (current_app.config.get('PRICE_HISTORY_CHANGE_ONLY', True)
+            and latest_record is not None and latest_record.price == product.current_price):
+        latest_record.last_confirmed_at = now
+    else:
+        db.session.add(PriceHistory(
+            listing_id=listing.id,
+            price=product.current_price,
+            timestamp=now
+        ))
+    listing.current_price = product.current_price
+    listing.last_checked = now
+    db.session.flush()
+    PriceHistoryDaily.record_prices([{'listing_id': listing.id, 'day': now.date(), 'price': product.current_price}])
+
 def update_product_price(product_id, new_price):
     """
     Updates the price of a product in the database.
@@ -251,13 +277,8 @@ def add_product_service(product_data: dict, user):
         db.session.add(new_product)
         db.session.flush()
 
-        # Record initial price history
-        initial_history = PriceHistory(
-            product_id=new_product.id,
-            price=new_product.current_price,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(initial_history)
+        # Attach the shared listing and record initial price history
+        record_initial_price(new_product)
 
         # Trigger notification if target price is reached
         if new_product.current_price is not None and new_product.current_price <= new_product.target_price:
@@ -312,6 +333,11 @@ def add_product_service_for_tg(product_data, user):
         )
 
         db.session.add(product)
+        db.session.flush()
+
+        # Attach the shared listing and record initial price history
+        record_initial_price(product)
+
         db.session.commit()
         return product, None
 
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, SelectField, BooleanField, DecimalField, SelectMultipleField, HiddenField
+from wtforms import StringField, SubmitField, SelectField, BooleanField, DecimalField, SelectMultipleField, HiddenField, IntegerField
 from wtforms.validators import DataRequired, Length, Email, Regexp, ValidationError, Optional, NumberRange
 from wtforms.widgets import CheckboxInput, ListWidget
 from app.products.forms import AtLeastOneChecked
@@ -34,6 +34,9 @@ class NotificationSettingsForm(FlaskForm):
     enable_price_drop_notifications = BooleanField(_l('Enable Price Drop Notifications'))
     enable_target_price_reached_notifications = BooleanField(_l('Enable Target Price Reached Notifications'))
     enable_email_notifications = BooleanField(_l('Enable Email Notifications'))
+    alert_digest_enabled = BooleanField(_l('Combine alerts into a digest'))
+    alert_digest_window = IntegerField(_l('Digest interval (minutes)'),
+                                       validators=[Optional(), NumberRange(min=5, max=1440)])
     submit_notifications = SubmitField(_l('Save Notification Settings'))
 
 class TelegramSetupForm(FlaskForm):
@@ -110,5 +113,22 @@ class EditProductForm(FlaskForm):
         ('48', _l('Every 2 days')),
         ('168', _l('Once a week'))
     ], validators=[DataRequired()], coerce=int)
+    adaptive_frequency = BooleanField(
+        _l('Adjust check frequency automatically'),
+        description=_l(
+            "Checks more often when the price is moving or close to your target, and less often when it has not changed for weeks.")
+    )
+    min_check_frequency = IntegerField(
+        _l('Never check more often than every (hours)'),
+        validators=[Optional(), NumberRange(min=1, max=720)]
+    )
+    max_check_frequency = IntegerField(
+        _l('Never check less often than every (hours)'),
+        validators=[Optional(), NumberRange(min=1, max=720)]
+    )
+
+    submit = SubmitField(_l('Update Product'))
 
-    submit = SubmitField(_l('Update Product'))
\ No newline at end of file
+    def validate_max_check_frequency(self, field):
+        if field.data and self.min_check_frequency.data and field.data < self.min_check_frequency.data:
+            raise ValidationError(_l('The upper bound must not be smaller than the lower bound.'))
\ No newline at end of file
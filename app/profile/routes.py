@@ -6,7 +6,7 @@ from app.extensions import limiter
 from app.models import UserNotification
 from app import db
 import random
-import posthog
+from app.utils import analytics
 from datetime import datetime, timedelta
 from app.models import User, Permission, Feedback, FeedbackCategory, Product, PriceHistory
 from app.profile.forms import (
@@ -78,7 +78,7 @@ def delete_tracked_product(product_id):
 
     try:
         if delete_product(product_id):
-            posthog.capture(
+            analytics.capture(
                 distinct_id=current_user.id,
                 event='product_removed',
                 properties={'product_id': product_id}
@@ -104,7 +104,7 @@ def settings():
         if username_form.username.data != current_user.username:
             current_user.username = username_form.username.data
             try:
-                db.session.add(current_user)
+                db.session.add(current_user.model)
                 db.session.commit()
                 flash(_('Your username has been updated!'), 'success')
             except IntegrityError:
@@ -122,9 +122,11 @@ def settings():
         current_user.enable_price_drop_notifications = notification_form.enable_price_drop_notifications.data
         current_user.enable_target_price_reached_notifications = notification_form.enable_target_price_reached_notifications.data
         current_user.enable_email_notifications = notification_form.enable_email_notifications.data
+        current_user.alert_digest_enabled = notification_form.alert_digest_enabled.data
+        current_user.alert_digest_window = notification_form.alert_digest_window.data
 
         try:
-            db.session.add(current_user)
+            db.session.add(current_user.model)
             db.session.commit()
             flash(_('Notification settings saved!'), 'success')
         except Exception as e:
@@ -140,7 +142,7 @@ def settings():
             if current_user.is_authenticated:
                 current_user.language = new_lang
                 try:
-                    db.session.add(current_user)
+                    db.session.add(current_user.model)
                     db.session.commit()
                     flash(_('Interface language updated and saved to your profile!'), 'success')
                 except Exception as e:
@@ -158,6 +160,8 @@ def settings():
         notification_form.enable_price_drop_notifications.data = current_user.enable_price_drop_notifications
         notification_form.enable_target_price_reached_notifications.data = current_user.enable_target_price_reached_notifications
         notification_form.enable_email_notifications.data = current_user.enable_email_notifications
+        notification_form.alert_digest_enabled.data = current_user.alert_digest_enabled
+        notification_form.alert_digest_window.data = current_user.alert_digest_window
         language_form.language.data = session.get('lang', current_user.language or current_app.config.get('BABEL_DEFAULT_LOCALE', 'en'))
 
 
@@ -216,7 +220,12 @@ def edit_product(product_id):
         product.name = form.product_name.data
         product.target_price = form.target_price.data
         product.notification_methods = form.notification_methods.data
-        product.check_frequency = form.check_frequency.data
+        product.adaptive_frequency = form.adaptive_frequency.data
+        product.min_check_frequency = form.min_check_frequency.data
+        product.max_check_frequency = form.max_check_frequency.data
+        if product.check_frequency != form.check_frequency.data:
+            product.check_frequency = form.check_frequency.data
+            product.schedule_next_check(product.last_checked)
         try:
             db.session.add(product)
             db.session.commit()
@@ -317,7 +326,7 @@ def mark_all_notifications_read():
 def toggle_email_notifications():
     try:
         current_user.enable_email_notifications = True
-        db.session.add(current_user)
+        db.session.add(current_user.model)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Email notifications enabled.'})
     except Exception as e:
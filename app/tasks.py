@@ -1,23 +1,34 @@
 from decimal import Decimal
 from datetime import datetime, timedelta
-from app.notifications.telegram_notifier import send_telegram_price_alert, send_telegram_message, create_inline_keyboard, escape_markdown_v2
+from app.notifications.telegram_notifier import format_telegram_digest, send_telegram_message, create_inline_keyboard, escape_markdown_v2
 from flask import current_app, url_for
+import json
+import math
+import smtplib
 import random
 import decimal
 from sqlalchemy.exc import IntegrityError
 from celery import shared_task
-from app.models import db, Product, User, PriceHistory
-from app.notifications.account_notifier import create_price_alert_account_notification, create_system_account_notification
-from app.notifications.email_notifier import send_price_alert_email
-from app.mail_services import send_email
-from app.utils.scrapers import extract_product_data, MockParser, run_async_in_sync
-from sqlalchemy import func, text
-from app.notifications.telegram_notifier import send_telegram_price_alert, send_telegram_message
+from app.models import db, Product, User, PriceHistory, PriceHistoryDaily, Listing
+from app.notifications.account_notifier import create_price_alert_account_notifications, create_system_account_notification
+from app.notifications.email_notifier import build_digest_email
+from app.notifications.pipeline import (CHANNELS, QUEUE_KEY, buffer_digest_alerts, build_alert_events, claim_event, deliver,
+                                        deliver_email_batch, deliver_telegram_batch, event_prices, finish_drain,
+                                        notification_channels, pop_events, publish_events, release_event,
+                                        requeue_event, schedule_drain, take_due_digests)
+from app.mail_services import (MAIL_DRAIN_PENDING_KEY, MAIL_QUEUE_KEY, MailThrottled, deserialize_message, queue_email,
+                               schedule_email_drain, send_email, send_messages, serialize_message)
+from app.utils.scrapers import extract_product_data, parse_urls, MockParser, run_async_in_sync
+from app.utils.partitions import add_months, drop_partition, ensure_monthly_partitions, month_start, partitions_before
+from app.utils.scheduling import adaptive_check_interval, get_budget_factor, price_volatility, update_budget_factor
+from app.utils.cache_utils import CacheManager
+from sqlalchemy import func, text, tuple_
 from urllib.parse import urlparse
 import requests
-import posthog
+from app.utils import analytics
 from flask_babel import _, force_locale
-from sqlalchemy import or_
+from sqlalchemy import insert, update
+from sqlalchemy.orm import joinedload
 
 # Task to check and update the price of a specific product.
 @shared_task(bind=True, max_retries=3, default_retry_delay=300)
@@ -35,113 +46,61 @@ def check_price_for_product(self, product_id, mock_scenario=None, mock_target_pr
         locale = product.user.language if product.user and product.user.language else locale
         original_target_price = product.target_price
         original_current_price = product.current_price
+        is_mock = bool(mock_scenario)
 
         try:
-            raw_data = None
-            is_mock = bool(mock_scenario)
-            if is_mock:
-                current_app.logger.info(f"Using MOCK data for product {product_id} with scenario: {mock_scenario}")
-                mock_product = Product(
-                    id=product.id,
-                    name=product.name,
-                    url=product.url,
-                    target_price=Decimal(str(mock_target_price)),
-                    current_price=Decimal(str(mock_current_price)),
-                    notification_methods=product.notification_methods,
-                    user=product.user
-                )
-                mock_url = f"mock://{mock_scenario}/{product_id}"
-                raw_data, _ = run_async_in_sync(MockParser(mock_url).parse())
-            else:
+            if not is_mock:
                 current_app.logger.info(f"Running REAL price check for product {product_id}")
-                raw_data = extract_product_data(product.url)
+                listing = product.ensure_listing()
+                writes = PriceCheckWrites()
+                apply_listing_price_result(listing, listing.products, extract_product_data(listing.url), writes,
+                                           latest_record=latest_listing_records([listing.id]).get(listing.id),
+                                           price_series=listing_price_series([listing.id]).get(listing.id))
+                writes.commit()
+                writes.publish_alerts()
+                return
+
+            current_app.logger.info(f"Using MOCK data for product {product_id} with scenario: {mock_scenario}")
+            mock_product = Product(
+                id=product.id,
+                name=product.name,
+                url=product.url,
+                target_price=Decimal(str(mock_target_price)),
+                current_price=Decimal(str(mock_current_price)),
+                notification_methods=product.notification_methods,
+                user=product.user
+            )
+            mock_url = f"mock://{mock_scenario}/{product_id}"
+            raw_data, _ = run_async_in_sync(MockParser(mock_url).parse())
 
             if isinstance(raw_data, tuple) and len(raw_data) == 2:
-                data, has_error = raw_data
+                data, _ = raw_data
             elif isinstance(raw_data, dict):
                 data = raw_data
-                has_error = not data.get('success', False)
             else:
                 current_app.logger.error(f"Unexpected data format from parser for product {product_id}: {raw_data}")
                 return
 
-            if is_mock:
-                has_error = False
-
-            if has_error:
-                current_app.logger.error(
-                    f"Error parsing product {product_id}: {data.get('error')}, details: {data.get('details')}")
-                return
-
-            new_price_raw = data.get('price')
-            if new_price_raw is None:
-                current_app.logger.error(f"No price found for product {product_id} in parsed data: {data}")
-                return
-
-            new_price = None
-            try:
-                cleaned_price_str = str(new_price_raw).replace('$', '').replace(',', '').strip()
-                if cleaned_price_str:
-                    new_price = Decimal(cleaned_price_str)
-                else:
-                    raise decimal.InvalidOperation("Price string is empty after cleaning.")
-
-            except (ValueError, decimal.InvalidOperation) as e:
-                current_app.logger.error(
-                    f"Could not convert raw price '{new_price_raw}' to Decimal for product {product_id}. Error: {e}")
+            new_price = parse_checked_price(data, f"product {product_id}")
+            if new_price is None:
                 return
 
-
-            old_price = mock_product.current_price if is_mock else product.current_price
-
-            if is_mock:
-                current_app.logger.info(f"Mock price check for product {product_id}: new_price={new_price}")
-            else:
-                product.current_price = new_price
-                product.last_checked = datetime.utcnow()
-
-                price_history = PriceHistory(
-                    product_id=product.id,
-                    price=new_price,
-                    timestamp=datetime.utcnow()
-                )
-                db.session.add(price_history)
+            old_price = mock_product.current_price
+            current_app.logger.info(f"Mock price check for product {product_id}: new_price={new_price}")
 
             user = product.user
             if not user:
                 current_app.logger.error(f"User not found for product {product_id}")
                 return
 
-            alert_types = []
-            target_price = mock_product.target_price if is_mock else product.target_price
-
-            if new_price <= target_price and user.enable_target_price_reached_notifications:
-                alert_types.append('target_reached')
-                if not is_mock:
-                    product.target_price_notified = True
-            elif old_price and new_price < old_price and user.enable_price_drop_notifications:
-                drop_amount = old_price - new_price
-                if not product.price_drop_alert_threshold or drop_amount >= product.price_drop_alert_threshold:
-                    alert_types.append('price_drop')
-
-            if old_price and new_price > old_price:
-                increase_amount = new_price - old_price
-                if product.price_increase_alert_threshold and increase_amount >= product.price_increase_alert_threshold:
-                    alert_types.append('price_increase')
-
-            if old_price and new_price > target_price and product.target_price_notified:
-                product.target_price_notified = False
+            alert_types = collect_alert_types(product, user, old_price, new_price, mock_product.target_price,
+                                              mark_notified=False)
 
             for alert_type in alert_types:
                 with force_locale(locale):
-                    process_notifications(mock_product if is_mock else product, alert_type, old_price, new_price)
-                    posthog.capture(user.id, 'price_alert_triggered',
-                                    {'product_id': product.id, 'new_price': float(new_price)})
-
-            if not is_mock:
-                db.session.add(product)
-                db.session.commit()
-                current_app.logger.info(f"Price updated for product {product_id}: {new_price}")
+                    process_notifications(mock_product, alert_type, old_price, new_price)
+                    analytics.capture(user.id, 'price_alert_triggered',
+                                      {'product_id': product.id, 'new_price': float(new_price)})
 
         except Exception as exc:
             db.session.rollback()
@@ -165,6 +124,329 @@ def check_price_for_product(self, product_id, mock_scenario=None, mock_target_pr
                         f"Failed to restore original values for product {product_id}: {str(restore_exc)}", exc_info=True)
 
 
+def parse_checked_price(data, label):
+    """
+    Converts the raw price returned by a parser into a Decimal.
+    Returns None (and logs why) if the parsed data has no usable price.
+    `label` names what was checked (e.g. "product 12") in the log messages.
+    """
+    new_price_raw = data.get('price')
+    if new_price_raw is None:
+        current_app.logger.error(f"No price found for {label} in parsed data: {data}")
+        return None
+
+    try:
+        cleaned_price_str = str(new_price_raw).replace('$', '').replace(',', '').strip()
+        if not cleaned_price_str:
+            raise decimal.InvalidOperation("Price string is empty after cleaning.")
+        return Decimal(cleaned_price_str)
+    except (ValueError, decimal.InvalidOperation) as e:
+        current_app.logger.error(
+            f"Could not convert raw price '{new_price_raw}' to Decimal for {label}. Error: {e}")
+        return None
+
+
+def evaluate_alerts(product, user, old_price, new_price, target_price):
+    """
+    Decides which alerts a price change should trigger and what the product's
+    target_price_notified flag should become, without touching the product.
+    Returns:
+        tuple: (alert types ('target_reached', 'price_drop', 'price_increase'), new notified flag).
+    """
+    alert_types = []
+    notified = product.target_price_notified
+
+    if new_price <= target_price and user.enable_target_price_reached_notifications:
+        alert_types.append('target_reached')
+        notified = True
+    elif old_price and new_price < old_price and user.enable_price_drop_notifications:
+        drop_amount = old_price - new_price
+        if not product.price_drop_alert_threshold or drop_amount >= product.price_drop_alert_threshold:
+            alert_types.append('price_drop')
+
+    if old_price and new_price > old_price:
+        increase_amount = new_price - old_price
+        if product.price_increase_alert_threshold and increase_amount >= product.price_increase_alert_threshold:
+            alert_types.append('price_increase')
+
+    if old_price and new_price > target_price and notified:
+        notified = False
+
+    return alert_types, notified
+
+
+def collect_alert_types(product, user, old_price, new_price, target_price, mark_notified=True):
+    """
+    Decides which alerts a price change should trigger and keeps the product's
+    target_price_notified flag in sync with the new price.
+    Returns:
+        list: Alert types ('target_reached', 'price_drop', 'price_increase').
+    """
+    alert_types, notified = evaluate_alerts(product, user, old_price, new_price, target_price)
+    if mark_notified or not notified:
+        product.target_price_notified = notified
+    return alert_types
+
+
+class PriceCheckWrites:
+    """
+    Collects the database changes of many price checks so they can be written with
+    a few bulk statements and a single commit, and the alerts to publish afterwards.
+    """
+
+    def __init__(self):
+        self.history = []
+        self.confirmations = []
+        self.observations = []
+        self.listings = []
+        self.products = []
+        self.alerts = []
+
+    def commit(self):
+        if self.history:
+            db.session.execute(insert(PriceHistory), self.history)
+        if self.confirmations:
+            db.session.execute(update(PriceHistory), self.confirmations)
+        PriceHistoryDaily.record_prices(self.observations)
+        if self.listings:
+            db.session.execute(update(Listing), self.listings)
+        if self.products:
+            db.session.execute(update(Product), self.products)
+        db.session.commit()
+
+    def publish_alerts(self):
+        """
+        Hands the alerts to the notification pipeline (see drain_notifications); alerts of users
+        in digest mode are buffered for their next digest instead (see flush_alert_digests).
+        If Redis is unavailable they are delivered inline, so no alert is lost.
+        """
+        for product, user, old_price, new_price, alert_types, checked_at in self.alerts:
+            for alert_type in alert_types:
+                analytics.capture(user.id, 'price_alert_triggered',
+                                  {'product_id': product.id, 'new_price': float(new_price)})
+
+        alerts = [alert for alert in self.alerts if not alert[1].alert_digest_enabled]
+        digest_alerts = [alert for alert in self.alerts if alert[1].alert_digest_enabled]
+        if digest_alerts and not buffer_digest_alerts(digest_alerts):
+            alerts += digest_alerts
+
+        events = []
+        for product, user, old_price, new_price, alert_types, checked_at in alerts:
+            for alert_type in alert_types:
+                events.extend(build_alert_events(product, user, alert_type, old_price, new_price, checked_at))
+        if publish_events(events):
+            return
+
+        current_app.logger.warning(f"Notification queue unavailable, delivering {len(events)} alerts inline")
+        for product, user, old_price, new_price, alert_types, checked_at in alerts:
+            for alert_type in alert_types:
+                try:
+                    with force_locale(user.language or 'en'):
+                        process_notifications(product, alert_type, old_price, new_price)
+                except Exception as e:
+                    current_app.logger.error(
+                        f"Failed to send '{alert_type}' alert for product {product.id}: {e}", exc_info=True)
+
+
+def apply_listing_price_result(listing, products, data, writes, now=None, latest_record=None, price_series=None):
+    """
+    Records one parser result for a listing in `writes` and fans it out to every product
+    tracking it: one price history row for the listing, one update per product, and the
+    alerts each product's owner should get. Nothing is written until writes.commit().
+
+    With PRICE_HISTORY_CHANGE_ONLY, an unchanged price only moves last_confirmed_at of the
+    listing's latest record (`latest_record`, see latest_listing_records) forward.
+    `price_series` (see listing_price_series) is the recent history adaptive check
+    frequencies are derived from.
+    Returns:
+        int: Number of products updated.
+    """
+    now = now or datetime.utcnow()
+
+    if data.get('deferred'):
+        current_app.logger.info(
+            f"Check of listing {listing.id} deferred ({data.get('error')}), retry in ~{data.get('retry_after')}s")
+        reschedule_products(products, max(60, int(data.get('retry_after') or 0)), writes, now)
+        return 0
+
+    if not data.get('success', False):
+        current_app.logger.error(
+            f"Error parsing listing {listing.id}: {data.get('error')}, details: {data.get('details')}")
+        reschedule_products(products, current_app.config.get('SCRAPE_FAILURE_RETRY_DELAY', 3600), writes, now)
+        return 0
+
+    new_price = parse_checked_price(data, f"listing {listing.id}")
+    if new_price is None:
+        reschedule_products(products, current_app.config.get('SCRAPE_FAILURE_RETRY_DELAY', 3600), writes, now)
+        return 0
+
+    listing_update = {'id': listing.id, 'current_price': new_price, 'last_checked': now}
+    if data.get('name') and not listing.name:
+        listing_update['name'] = data['name']
+    writes.listings.append(listing_update)
+    if (current_app.config.get('PRICE_HISTORY_CHANGE_ONLY', True)
+            and latest_record is not None and latest_record.price == new_price):
+        writes.confirmations.append({'id': latest_record.id, 'timestamp': latest_record.timestamp,
+                                     'last_confirmed_at': now})
+    else:
+        writes.history.append({'listing_id': listing.id, 'price': new_price, 'timestamp': now})
+    writes.observations.append({'listing_id': listing.id, 'day': now.date(), 'price': new_price})
+
+    volatility = None
+    if any(product.adaptive_frequency for product in products):
+        volatility = price_volatility(list(price_series or []) + [(now, new_price)], now)
+        budget_factor = get_budget_factor()
+
+    updated = 0
+    for product in products:
+        user = product.user
+        if not user:
+            current_app.logger.error(f"User not found for product {product.id}")
+            continue
+
+        interval_hours = product.check_frequency
+        if product.adaptive_frequency and volatility is not None:
+            interval_hours = adaptive_check_interval(
+                product.check_frequency,
+                product.min_check_frequency or current_app.config.get('ADAPTIVE_MIN_CHECK_HOURS', 1),
+                product.max_check_frequency or current_app.config.get('ADAPTIVE_MAX_CHECK_HOURS', 336),
+                *volatility, price=new_price, target_price=product.target_price, budget_factor=budget_factor)
+
+        old_price = product.current_price
+        alert_types, notified = evaluate_alerts(product, user, old_price, new_price, product.target_price)
+        writes.products.append({
+            'id': product.id,
+            'current_price': new_price,
+            'last_checked': now,
+            'next_check_at': now + timedelta(hours=interval_hours),
+            'target_price_notified': notified,
+        })
+        if alert_types:
+            writes.alerts.append((product, user, old_price, new_price, alert_types, now))
+        updated += 1
+    return updated
+
+
+def latest_listing_records(listing_ids):
+    """The newest price history record (id, timestamp, price) of each listing, fetched in one query."""
+    if not listing_ids:
+        return {}
+    rows = (db.session.query(PriceHistory.listing_id, PriceHistory.id, PriceHistory.timestamp, PriceHistory.price)
+            .filter(PriceHistory.listing_id.in_(listing_ids))
+            .order_by(PriceHistory.listing_id, PriceHistory.timestamp.desc(), PriceHistory.id.desc())
+            .distinct(PriceHistory.listing_id)
+            .all())
+    return {row.listing_id: row for row in rows}
+
+
+def listing_price_series(listing_ids, limit=50):
+    """The `limit` most recent (timestamp, price) records of each listing, oldest first, fetched in one query."""
+    if not listing_ids:
+        return {}
+    ranked = (db.session.query(
+                  PriceHistory.listing_id, PriceHistory.timestamp, PriceHistory.price,
+                  func.row_number().over(partition_by=PriceHistory.listing_id,
+                                         order_by=PriceHistory.timestamp.desc()).label('rank'))
+              .filter(PriceHistory.listing_id.in_(listing_ids))
+              .subquery())
+    rows = (db.session.query(ranked.c.listing_id, ranked.c.timestamp, ranked.c.price)
+            .filter(ranked.c.rank <= limit)
+            .order_by(ranked.c.listing_id, ranked.c.timestamp)
+            .all())
+    series = {}
+    for row in rows:
+        series.setdefault(row.listing_id, []).append((row.timestamp, row.price))
+    return series
+
+
+def reschedule_products(products, delay_seconds, writes, now=None):
+    """Moves the next check of products whose listing could not be checked (ending their dispatch lease)."""
+    next_check_at = (now or datetime.utcnow()) + timedelta(seconds=delay_seconds)
+    writes.products.extend({'id': product.id, 'next_check_at': next_check_at, 'dispatched_at': None}
+                           for product in products)
+
+
+@shared_task
+def check_prices_batch(product_ids):
+    """
+    Checks prices for many products in one task.
+
+    The due products' listings, and every product on those listings together with its
+    user, are loaded with eager loading in two queries. Each distinct listing is scraped
+    once; all of them are parsed concurrently on a single event loop over one shared
+    HTTP session. The results are written with bulk INSERT/UPDATE statements and one
+    commit, then alerts are evaluated and sent per product.
+    """
+    due_products = (Product.query
+                    .options(joinedload(Product.listing))
+                    .filter(Product.id.in_(product_ids))
+                    .all())
+    if not due_products:
+        current_app.logger.warning(f"Batch price check: none of {len(product_ids)} products found")
+        return
+
+    if any(product.listing is None for product in due_products):
+        for product in due_products:
+            product.ensure_listing()
+        db.session.commit()
+
+    listings_by_url = {}
+    for product in due_products:
+        listings_by_url.setdefault(product.listing.url, product.listing)
+
+    products_by_listing = {}
+    tracking_products = (Product.query
+                         .options(joinedload(Product.user))
+                         .filter(Product.listing_id.in_([listing.id for listing in listings_by_url.values()]))
+                         .all())
+    for product in tracking_products:
+        products_by_listing.setdefault(product.listing_id, []).append(product)
+
+    concurrency = current_app.config.get('SCRAPE_CONCURRENCY', 100)
+    per_domain_limit = current_app.config.get('SCRAPE_PER_DOMAIN_CONCURRENCY', 8)
+
+    async def collect():
+        return [result async for result in parse_urls(list(listings_by_url), concurrency=concurrency,
+                                                      per_domain_limit=per_domain_limit)]
+
+    results = run_async_in_sync(collect())
+
+    stats = {'updated': 0, 'failed': 0, 'deferred': 0}
+    writes = PriceCheckWrites()
+    now = datetime.utcnow()
+    latest_records = latest_listing_records([listing.id for listing in listings_by_url.values()])
+    price_series = listing_price_series([listing_id for listing_id, products in products_by_listing.items()
+                                         if any(product.adaptive_frequency for product in products)])
+    for url, data in results:
+        listing = listings_by_url[url]
+        try:
+            updated = apply_listing_price_result(listing, products_by_listing.get(listing.id, []), data, writes, now,
+                                                 latest_record=latest_records.get(listing.id),
+                                                 price_series=price_series.get(listing.id))
+        except Exception as e:
+            updated = 0
+            current_app.logger.error(f"Error evaluating listing {listing.id} in batch: {e}", exc_info=True)
+        if updated:
+            stats['updated'] += updated
+        elif data.get('deferred'):
+            stats['deferred'] += 1
+        else:
+            stats['failed'] += 1
+
+    try:
+        writes.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error writing batch price check results: {e}", exc_info=True)
+        return
+
+    writes.publish_alerts()
+    current_app.logger.info(
+        f"Batch price check finished: {stats['updated']} products updated, {stats['failed']} listings failed, "
+        f"{stats['deferred']} deferred, {len(listings_by_url)} unique listings, "
+        f"{len(writes.history)} history rows written, {len(writes.confirmations)} extended")
+
+
 def process_notifications(product, alert_type, old_price, new_price):
     """
     Process notifications for a product based on alert type.
@@ -191,35 +473,395 @@ def process_notifications(product, alert_type, old_price, new_price):
 
     current_app.logger.info(f"Processing '{alert_type}' notifications for user {user.id}, product {product.id}")
 
-    notification_methods = product.notification_methods or ['account']
-    if 'account' in notification_methods:
-        create_price_alert_account_notification(user, product, old_price, new_price, alert_type)
-    if 'email' in notification_methods and user.enable_email_notifications:
-        if old_price is None:
-            current_app.logger.warning(f"Cannot send email for product {product.id} - old_price is None")
+    for channel in notification_channels(product, user, alert_type, old_price):
+        deliver(channel, user, product, alert_type, old_price, new_price)
+
+
+# Deliver queued alert events of one notification channel.
+@shared_task(ignore_result=True)
+def drain_notifications(channel):
+    """
+    Delivers the alert events queued for `channel` in batches of NOTIFICATION_BATCH_SIZE,
+    up to NOTIFICATION_DRAIN_MAX_BATCHES per run; a follow-up drain is scheduled if
+    events are left. Runs on the 'notifications' queue, away from the scrape workers.
+    """
+    client = CacheManager.get_client()
+    if client is None:
+        current_app.logger.error(f"Cannot drain '{channel}' notifications: Redis is unavailable")
+        return
+
+    batch_size = current_app.config.get('NOTIFICATION_BATCH_SIZE', 100)
+    stats = {'sent': 0, 'duplicate': 0, 'skipped': 0, 'deferred': 0, 'failed': 0}
+    retry_after = 0
+    try:
+        for _batch in range(current_app.config.get('NOTIFICATION_DRAIN_MAX_BATCHES', 50)):
+            events = pop_events(channel, batch_size, client)
+            if not events:
+                break
+            retry_after = deliver_notification_batch(channel, events, client, stats)
+            if retry_after:
+                # The channel is rate limited: leave the rest queued until it frees up.
+                break
+    finally:
+        if finish_drain(channel, client):
+            schedule_drain(channel, client, countdown=int(math.ceil(retry_after)))
+
+    if any(stats.values()):
+        current_app.logger.info(
+            f"Drained '{channel}' notifications: {stats['sent']} sent, {stats['duplicate']} duplicates, "
+            f"{stats['skipped']} skipped, {stats['deferred']} deferred, {stats['failed']} failed")
+
+
+def deliver_notification_batch(channel, events, client, stats):
+    """
+    Delivers one batch of events. Users and products are loaded with one query each,
+    account notifications are committed together at the end of the batch and Telegram
+    messages are sent concurrently. Returns the seconds to wait before the channel can take
+    more messages (0 if it is not rate limited).
+    """
+    users = {user.id: user for user in User.query.filter(User.id.in_({e['user_id'] for e in events}))}
+    products = {product.id: product for product in
+                Product.query.filter(Product.id.in_({e['product_id'] for e in events}))}
+
+    claimed = []
+    for event in events:
+        # Digest events carry their own text and no product.
+        if event['user_id'] not in users or (event['product_id'] is not None and event['product_id'] not in products):
+            stats['skipped'] += 1
+        elif not claim_event(event, client):
+            stats['duplicate'] += 1
+        else:
+            claimed.append(event)
+
+    if channel == 'telegram':
+        return deliver_telegram_events(claimed, users, products, client, stats)
+    if channel == 'email':
+        return deliver_email_events(claimed, users, products, client, stats)
+
+    delivered = []
+    for event in claimed:
+        user, product = users[event['user_id']], products[event['product_id']]
+        old_price, new_price = event_prices(event)
+        try:
+            with force_locale(user.language or 'en'):
+                deliver(channel, user, product, event['alert_type'], old_price, new_price, commit=False)
+            delivered.append(event)
+        except Exception as e:
+            current_app.logger.error(f"Failed to deliver notification {event['key']}: {e}", exc_info=True)
+            retry_notification_event(event, client, stats)
+
+    if channel == 'account':
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Failed to save account notifications: {e}", exc_info=True)
+            for event in delivered:
+                retry_notification_event(event, client, stats)
+            return 0
+    stats['sent'] += len(delivered)
+    return 0
+
+
+def deliver_email_events(events, users, products, client, stats):
+    try:
+        results = deliver_email_batch(events, users, products)
+    except Exception as e:
+        current_app.logger.error(f"Failed to send email notifications: {e}", exc_info=True)
+        results = [(event, e) for event in events]
+
+    retry_after = 0
+    for event, error in results:
+        if error is None:
+            stats['sent'] += 1
+        elif isinstance(error, MailThrottled):
+            stats['deferred'] += 1
+            release_event(event, client)
+            requeue_event(event, client, count_attempt=False)
+            retry_after = max(retry_after, error.retry_after)
+        elif isinstance(error, smtplib.SMTPRecipientsRefused):
+            stats['failed'] += 1
+        else:
+            retry_notification_event(event, client, stats)
+    return retry_after
+
+
+def deliver_telegram_events(events, users, products, client, stats):
+    retry_after = 0
+    try:
+        results = deliver_telegram_batch(events, users, products)
+    except Exception as e:
+        current_app.logger.error(f"Failed to send Telegram notifications: {e}", exc_info=True)
+        results = [(event, {'ok': False, 'error': str(e), 'retry_after': 5}) for event in events]
+
+    for event, result in results:
+        if result['ok']:
+            stats['skipped' if result.get('skipped') else 'sent'] += 1
+        elif result['error'] in ('rate_limited', 'paused'):
+            stats['deferred'] += 1
+            release_event(event, client)
+            requeue_event(event, client, count_attempt=False)
+            retry_after = max(retry_after, result['retry_after'])
+        elif result['retry_after'] is not None:
+            current_app.logger.warning(f"Telegram notification {event['key']} failed: {result['error']}")
+            retry_notification_event(event, client, stats)
+            retry_after = max(retry_after, result['retry_after'])
         else:
-            send_price_alert_email(user, product, old_price, new_price, alert_type)
-    if 'telegram' in notification_methods and user.telegram_chat_id:
-        send_telegram_price_alert(user, product, old_price, new_price, alert_type)
+            stats['failed'] += 1
+            current_app.logger.error(f"Telegram rejected notification {event['key']}: {result['error']}")
+    return retry_after
+
+
+def retry_notification_event(event, client, stats):
+    stats['failed'] += 1
+    release_event(event, client)
+    if not requeue_event(event, client):
+        current_app.logger.error(f"Giving up on notification {event['key']} after {event['attempts'] - 1} retries")
+
+
+# Send the digests of users whose digest window has ended.
+@shared_task(ignore_result=True)
+def flush_alert_digests():
+    """
+    Sends the alerts buffered for users in digest mode once their window has ended: one
+    email and one Telegram message per user, and the account notifications of every due
+    user with a single bulk INSERT. Handles up to ALERT_DIGEST_FLUSH_LIMIT users per run.
+    """
+    client = CacheManager.get_client()
+    if client is None:
+        current_app.logger.error("Cannot flush alert digests: Redis is unavailable")
+        return
+
+    limit = current_app.config.get('ALERT_DIGEST_FLUSH_LIMIT', 500)
+    digests = take_due_digests(limit, client)
+    if not digests:
+        return
+
+    users = {user.id: user for user in User.query.filter(User.id.in_(digests))}
+    product_ids = {alert['product_id'] for buffered in digests.values() for alert in buffered}
+    products = {product.id: product for product in Product.query.filter(Product.id.in_(product_ids))}
+
+    now = datetime.utcnow()
+    account_alerts, telegram_events, emails = [], [], 0
+    for user_id, buffered in digests.items():
+        user = users.get(user_id)
+        if user is None:
+            continue
+
+        by_channel = {channel: [] for channel in CHANNELS}
+        for alert in buffered:
+            product = products.get(alert['product_id'])
+            if product is None:
+                continue
+            old_price, new_price = event_prices(alert)
+            for channel in notification_channels(product, user, alert['alert_type'], old_price):
+                by_channel[channel].append({'product': product, 'alert_type': alert['alert_type'],
+                                            'old_price': old_price, 'new_price': new_price})
+
+        account_alerts.extend((user, alert['product'], alert['old_price'], alert['new_price'], alert['alert_type'])
+                              for alert in by_channel['account'])
+        if by_channel['email']:
+            try:
+                queue_email(build_digest_email(user, by_channel['email']))
+                emails += 1
+            except Exception as e:
+                current_app.logger.error(f"Failed to queue digest email for user {user.id}: {e}", exc_info=True)
+        if by_channel['telegram']:
+            telegram_events.append({
+                'key': f"telegram:digest:{user.id}:{now.isoformat()}",
+                'channel': 'telegram',
+                'user_id': user.id,
+                'product_id': None,
+                'text': format_telegram_digest(by_channel['telegram']),
+                'attempts': 0,
+            })
 
-# Schedule price checks for products that need updating.
+    try:
+        create_price_alert_account_notifications(account_alerts)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Failed to save digest account notifications: {e}", exc_info=True)
+
+    if not publish_events(telegram_events):
+        current_app.logger.error(f"Could not queue {len(telegram_events)} Telegram digests")
+
+    current_app.logger.info(
+        f"Flushed {len(digests)} alert digests: {len(account_alerts)} account notifications, "
+        f"{emails} emails, {len(telegram_events)} Telegram messages")
+    if len(digests) >= limit:
+        flush_alert_digests.delay()
+
+
+# Send queued emails over persistent SMTP connections.
+@shared_task(ignore_result=True)
+def drain_email_queue():
+    """
+    Sends the queued emails (see app.mail_services.queue_email) in batches of MAIL_BATCH_SIZE,
+    each over one SMTP connection. Failed messages are retried by a later run, up to
+    NOTIFICATION_MAX_ATTEMPTS times; refused recipients are not retried. When the mail
+    server throttles, the unsent messages go back to the front of the queue without using
+    an attempt and the next run is scheduled for when the server asked.
+    """
+    client = CacheManager.get_client()
+    if client is None:
+        current_app.logger.error("Cannot drain the email queue: Redis is unavailable")
+        return
+
+    batch_size = current_app.config.get('MAIL_BATCH_SIZE', 50)
+    max_attempts = current_app.config.get('NOTIFICATION_MAX_ATTEMPTS', 3)
+    retrying = 0
+    throttled_for = 0
+    try:
+        for _batch in range(current_app.config.get('NOTIFICATION_DRAIN_MAX_BATCHES', 50)):
+            raw = client.lpop(MAIL_QUEUE_KEY, batch_size)
+            if not raw:
+                break
+            queued = [deserialize_message(json.loads(item)) for item in raw]
+            results = send_messages([msg for msg, attempts in queued])
+            throttled = []
+            for (msg, error), (_msg, attempts) in zip(results, queued):
+                if error is None or isinstance(error, smtplib.SMTPRecipientsRefused):
+                    continue
+                if isinstance(error, MailThrottled):
+                    throttled.append(json.dumps(serialize_message(msg, attempts)))
+                    throttled_for = error.retry_after
+                elif attempts + 1 < max_attempts:
+                    client.rpush(MAIL_QUEUE_KEY, json.dumps(serialize_message(msg, attempts + 1)))
+                    retrying += 1
+                else:
+                    current_app.logger.error(f"Giving up on email to {msg.recipients} after {max_attempts} attempts")
+            if throttled:
+                client.lpush(MAIL_QUEUE_KEY, *reversed(throttled))
+            if retrying or throttled:
+                break
+    finally:
+        client.delete(MAIL_DRAIN_PENDING_KEY)
+        if client.llen(MAIL_QUEUE_KEY):
+            # Give a struggling mail server a minute (or as long as it asked) before retrying.
+            schedule_email_drain(client, countdown=throttled_for or (60 if retrying else 0))
+
+
+# Safety net for channels whose drain was missed (e.g. a worker restart).
+@shared_task(ignore_result=True)
+def drain_notification_queues():
+    client = CacheManager.get_client()
+    if client is None:
+        return
+    for channel in CHANNELS:
+        if client.llen(QUEUE_KEY.format(channel=channel)):
+            schedule_drain(channel, client)
+    if client.llen(MAIL_QUEUE_KEY):
+        schedule_email_drain(client)
+
+# Dispatch price checks for products whose next check is due.
 @shared_task
-def schedule_price_checks():
+def dispatch_due_price_checks():
+    """
+    Runs every minute and enqueues the products that are due, in check_prices_batch chunks.
+    With SCRAPE_HOURLY_BUDGET set, at most a sixtieth of the budget is dispatched per run.
+
+    Due products are walked in (next_check_at, id) order with keyset pagination over
+    ix_product_next_check_at_id, so only due ids are read. Each dispatched chunk is leased:
+    its next_check_at is pushed SCRAPE_DISPATCH_LEASE seconds ahead so later runs skip it
+    (dispatched_at records when), and the batch task sets the real next check once the
+    product has been checked.
+    """
     try:
-        current_app.logger.info("Scheduling price checks")
-        products = Product.query.filter(
-            or_(
-                Product.last_checked.is_(None),
-                Product.last_checked < func.now() - text("INTERVAL '1 hour' * check_frequency")
-            )
-        ).all()
+        config = current_app.config
+        batch_size = config.get('SCRAPE_BATCH_SIZE', 200)
+        max_per_run = config.get('SCRAPE_DISPATCH_MAX_PER_RUN', 5000)
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=config.get('SCRAPE_DISPATCH_LEASE', 900))
+
+        hourly_budget = config.get('SCRAPE_HOURLY_BUDGET', 0)
+        if hourly_budget:
+            due_next_hour = Product.query.filter(Product.next_check_at <= now + timedelta(hours=1)).count()
+            budget_factor = update_budget_factor(due_next_hour)
+            if budget_factor > 1:
+                current_app.logger.info(
+                    f"{due_next_hour} checks due within the hour against a budget of {hourly_budget}; "
+                    f"stretching adaptive intervals by {budget_factor:.2f}x")
+            max_per_run = min(max_per_run, -(-hourly_budget // 60))
+
+        dispatched = 0
+        last_key = None
+        while dispatched < max_per_run:
+            query = db.session.query(Product.id, Product.next_check_at).filter(Product.next_check_at <= now)
+            if last_key is not None:
+                query = query.filter(tuple_(Product.next_check_at, Product.id) > last_key)
+            rows = (query.order_by(Product.next_check_at, Product.id)
+                    .limit(min(batch_size, max_per_run - dispatched))
+                    .all())
+            if not rows:
+                break
+
+            product_ids = [row.id for row in rows]
+            last_key = (rows[-1].next_check_at, rows[-1].id)
+            db.session.query(Product).filter(Product.id.in_(product_ids)).update(
+                {Product.next_check_at: lease_until, Product.dispatched_at: now}, synchronize_session=False)
+            db.session.commit()
+
+            check_prices_batch.delay(product_ids)
+            dispatched += len(product_ids)
 
-        current_app.logger.info(f"Found {len(products)} products to check.")
-        for product in products:
-            check_price_for_product.delay(product.id)
+        if dispatched:
+            current_app.logger.info(f"Dispatched {dispatched} due products for price checks.")
 
     except Exception as e:
-        current_app.logger.error(f"Error scheduling price checks: {e}", exc_info=True)
+        db.session.rollback()
+        current_app.logger.error(f"Error dispatching price checks: {e}", exc_info=True)
+
+
+@shared_task
+def maintain_price_history_partitions():
+    """
+    Daily upkeep of the monthly price_history partitions: creates the partitions for the
+    coming PRICE_HISTORY_PARTITIONS_AHEAD months (and for any month whose rows fell into the
+    DEFAULT partition, which is logged as an error), and for every partition older than
+    PRICE_HISTORY_RAW_RETENTION_MONTHS rolls its records up into price_history_daily
+    (daily open/close/min/max) and then drops it.
+    """
+    try:
+        config = current_app.config
+        created = ensure_monthly_partitions('price_history', config.get('PRICE_HISTORY_PARTITIONS_AHEAD', 3))
+        if created:
+            current_app.logger.info(f"Created price_history partitions: {', '.join(created)}")
+
+        cutoff = add_months(month_start(datetime.utcnow()), -config.get('PRICE_HISTORY_RAW_RETENTION_MONTHS', 12))
+        for month, name in partitions_before('price_history', cutoff):
+            PriceHistoryDaily.rollup_from(name)
+            db.session.commit()
+            drop_partition('price_history', name)
+            current_app.logger.info(f"Downsampled and dropped price_history partition {name}")
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error maintaining price_history partitions: {e}", exc_info=True)
+
+
+@shared_task
+def maintain_log_partitions():
+    """
+    Daily upkeep of the monthly logs partitions: creates the partitions for the coming
+    LOG_PARTITIONS_AHEAD months (and for any month whose rows fell into the DEFAULT
+    partition, which is logged as an error) and drops every partition older than
+    LOG_RETENTION_MONTHS full months, so retention never has to DELETE individual rows.
+    """
+    try:
+        config = current_app.config
+        created = ensure_monthly_partitions('logs', config.get('LOG_PARTITIONS_AHEAD', 2))
+        if created:
+            current_app.logger.info(f"Created logs partitions: {', '.join(created)}")
+
+        cutoff = add_months(month_start(datetime.utcnow()), -config.get('LOG_RETENTION_MONTHS', 1))
+        for month, name in partitions_before('logs', cutoff):
+            drop_partition('logs', name)
+            current_app.logger.info(f"Dropped logs partition {name}")
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error maintaining logs partitions: {e}", exc_info=True)
 
 
 @shared_task
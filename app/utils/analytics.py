@@ -0,0 +1,98 @@
+"""
+Buffered, non-blocking analytics export.
+
+capture() only appends the event to a bounded in-process buffer; a background thread
+sends the buffer to PostHog's /batch/ endpoint in batches. When the buffer is full new
+events are dropped and counted, and a failed batch is dropped and counted too, so
+request and task latency never depends on PostHog being reachable.
+
+ANALYTICS_MODE selects the sink: 'posthog', 'file' (JSON lines, for local runs) or 'noop'.
+"""
+import atexit
+import json
+import logging
+from datetime import datetime, timezone
+import requests
+from flask import current_app
+from app.utils.batching import BackgroundBatcher
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsSink:
+    def __init__(self, mode='noop', api_key=None, host=None, capacity=10000, batch_size=100,
+                 flush_interval=5.0, file_path=None, timeout=5):
+        self.mode = mode
+        self.api_key = api_key
+        self.url = f"{(host or '').rstrip('/')}/batch/"
+        self.file_path = file_path
+        self.timeout = timeout
+        self._session = None
+        self._batcher = BackgroundBatcher(self._send, capacity=capacity, batch_size=batch_size,
+                                          flush_interval=flush_interval, name='analytics-flush',
+                                          on_failure=self._dropped, on_start=self._reset)
+
+    @property
+    def stats(self):
+        return self._batcher.stats
+
+    def capture(self, distinct_id, event, properties=None):
+        """Queues one event. Never blocks on I/O and never raises."""
+        if self.mode == 'noop':
+            return
+        self._batcher.put({
+            'event': event,
+            'distinct_id': str(distinct_id),
+            'properties': properties or {},
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        })
+
+    def flush(self):
+        """Sends everything buffered so far from the calling thread (used at exit)."""
+        self._batcher.flush()
+
+    def _reset(self):
+        self._session = None
+
+    def _send(self, batch):
+        if self.mode == 'file':
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(item) + '\n' for item in batch)
+            return
+        if self._session is None:
+            self._session = requests.Session()
+        response = self._session.post(self.url, json={'api_key': self.api_key, 'batch': batch},
+                                      timeout=self.timeout)
+        response.raise_for_status()
+
+    @staticmethod
+    def _dropped(batch, error):
+        logger.warning(f"Dropped {len(batch)} analytics events: {error}")
+
+
+def init_analytics(app):
+    """Creates the app's analytics sink from its ANALYTICS_* / POSTHOG_* settings."""
+    config = app.config
+    mode = config.get('ANALYTICS_MODE') or ('posthog' if config.get('POSTHOG_API_KEY') else 'noop')
+    sink = AnalyticsSink(
+        mode=mode,
+        api_key=config.get('POSTHOG_API_KEY'),
+        host=config.get('POSTHOG_HOST'),
+        capacity=config.get('ANALYTICS_BUFFER_SIZE', 10000),
+        batch_size=config.get('ANALYTICS_BATCH_SIZE', 100),
+        flush_interval=config.get('ANALYTICS_FLUSH_INTERVAL', 5.0),
+        file_path=config.get('ANALYTICS_FILE_PATH', 'logs/analytics.jsonl'),
+    )
+    app.extensions['analytics'] = sink
+    atexit.register(sink.flush)
+    return sink
+
+
+def capture(distinct_id, event, properties=None):
+    """Records an analytics event for the current app; a no-op outside an app context."""
+    try:
+        sink = current_app.extensions.get('analytics')
+    except RuntimeError:
+        return
+    if sink is not None:
+        sink.capture(distinct_id, event, properties)
@@ -0,0 +1,88 @@
+"""
+Bounded in-process buffer that a background thread drains in batches.
+
+Used by sinks that must never make the caller wait on I/O (analytics events, database log
+records): put() only appends, and a daemon thread hands the buffer to `write` in batches
+of `batch_size` every `flush_interval` seconds, or as soon as a full batch is waiting.
+"""
+import os
+import threading
+from collections import deque
+
+
+class BackgroundBatcher:
+    """
+    `write(batch)` sends one batch and raises on failure; a failed batch is dropped and
+    counted, then passed to `on_failure(batch, error)`. `on_start()` is called whenever a
+    new writer thread starts, i.e. once per process, to reset per-process resources such
+    as HTTP sessions or database engines.
+    """
+
+    def __init__(self, write, capacity=10000, batch_size=100, flush_interval=5.0, name='batcher',
+                 on_failure=None, on_start=None):
+        self.write = write
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.name = name
+        self.on_failure = on_failure
+        self.on_start = on_start
+        self.stats = {'buffered': 0, 'written': 0, 'dropped_overflow': 0, 'dropped_failed': 0}
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def put(self, item) -> bool:
+        """Buffers one item; False (and counted) if the buffer is full."""
+        with self._lock:
+            if len(self._buffer) >= self.capacity:
+                self.stats['dropped_overflow'] += 1
+                return False
+            self._buffer.append(item)
+            self.stats['buffered'] += 1
+            full_batch = len(self._buffer) >= self.batch_size
+        self._ensure_thread()
+        if full_batch:
+            self._wakeup.set()
+        return True
+
+    def count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + amount
+
+    def flush(self):
+        """Writes everything buffered so far from the calling thread."""
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return
+            try:
+                self.write(batch)
+            except Exception as e:
+                self.count('dropped_failed', len(batch))
+                if self.on_failure is not None:
+                    self.on_failure(batch, e)
+            else:
+                self.count('written', len(batch))
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, so every worker process starts its own.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            if self.on_start is not None:
+                self.on_start()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from flask import current_app, has_app_context
+from playwright.async_api import async_playwright
+from playwright_stealth import stealth_async
+
+logger = logging.getLogger("parser")
+
+
+def _process_tree_rss_mb(root_pid: int) -> float:
+    """
+    Sums the resident memory of every descendant of root_pid (the Playwright driver and
+    the Chromium processes it spawns). Reads /proc, so it returns 0 on non-Linux systems.
+    """
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, ValueError, IndexError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        total = 0
+        stack = list(children.get(root_pid, []))
+        while stack:
+            pid = stack.pop()
+            try:
+                with open(f'/proc/{pid}/statm') as f:
+                    total += int(f.read().split()[1]) * page_size
+            except (OSError, ValueError, IndexError):
+                pass
+            stack.extend(children.get(pid, []))
+        return total / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.active_pages = 0
+        self.pages_served = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    Keeps a few Chromium instances warm for the lifetime of the worker's event loop.
+
+    Every call gets its own fresh context and page (so cookies and fingerprints never leak
+    between products), but the expensive browser process is reused. A browser is retired
+    after `max_pages_per_browser` pages, when the Chromium process tree grows above
+    `max_rss_mb` (sampled at most every `rss_check_interval` seconds, as that walks /proc),
+    or when one of its pages hangs past `page_timeout` seconds.
+    """
+
+    def __init__(self, size=2, max_concurrent_pages=4, max_pages_per_browser=50, max_rss_mb=1500,
+                 page_timeout=60, rss_check_interval=30):
+        self.size = size
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.page_timeout = page_timeout
+        self.rss_check_interval = rss_check_interval
+        self._rss_checked_at = 0.0
+        self._playwright = None
+        self._browsers = []
+        self._page_slots = asyncio.Semaphore(max_concurrent_pages)
+        self._lock = asyncio.Lock()
+
+    async def run(self, fn, user_agent: str = None):
+        """
+        Opens a new page, runs `await fn(page)` under the page timeout and returns its result.
+        Raises asyncio.TimeoutError if the page hangs; the page's browser is then recycled.
+        """
+        async with self._page_slots:
+            entry = await self._acquire()
+            context = None
+            try:
+                context = await entry.browser.new_context(user_agent=user_agent)
+                context.set_default_timeout(self.page_timeout * 1000)
+                page = await context.new_page()
+                await stealth_async(page)
+                return await asyncio.wait_for(fn(page), timeout=self.page_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Browser page hung for more than {self.page_timeout}s, recycling its browser")
+                entry.retired = True
+                raise
+            finally:
+                if context is not None:
+                    try:
+                        await asyncio.wait_for(context.close(), timeout=10)
+                    except Exception:
+                        entry.retired = True
+                await self._release(entry)
+
+    async def close(self):
+        async with self._lock:
+            for entry in self._browsers:
+                await self._close_browser(entry)
+            self._browsers = []
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _acquire(self) -> _PooledBrowser:
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            for entry in [b for b in self._browsers if not b.browser.is_connected()]:
+                logger.warning("Pooled browser disconnected, dropping it")
+                self._browsers.remove(entry)
+
+            available = [b for b in self._browsers if not b.retired]
+            if len(available) < self.size:
+                browser = await self._playwright.chromium.launch(headless=True)
+                entry = _PooledBrowser(browser)
+                self._browsers.append(entry)
+                logger.info(f"Launched pooled browser ({len(available) + 1}/{self.size})")
+            else:
+                entry = min(available, key=lambda b: b.active_pages)
+            entry.active_pages += 1
+            return entry
+
+    async def _release(self, entry: _PooledBrowser):
+        async with self._lock:
+            entry.active_pages -= 1
+            entry.pages_served += 1
+            if entry.pages_served >= self.max_pages_per_browser:
+                entry.retired = True
+
+            if self.max_rss_mb and self._rss_check_due() and _process_tree_rss_mb(os.getpid()) > self.max_rss_mb:
+                busiest = max((b for b in self._browsers if not b.retired), key=lambda b: b.pages_served,
+                              default=None)
+                if busiest is not None:
+                    logger.info(f"Browser memory above {self.max_rss_mb} MB, recycling the busiest browser")
+                    busiest.retired = True
+
+            for retired in [b for b in self._browsers if b.retired and b.active_pages == 0]:
+                self._browsers.remove(retired)
+                await self._close_browser(retired)
+
+    def _rss_check_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._rss_checked_at < self.rss_check_interval:
+            return False
+        self._rss_checked_at = now
+        return True
+
+    @staticmethod
+    async def _close_browser(entry: _PooledBrowser):
+        try:
+            await asyncio.wait_for(entry.browser.close(), timeout=10)
+        except Exception as e:
+            logger.warning(f"Failed to close pooled browser cleanly: {e}")
+
+
+_pools = weakref.WeakKeyDictionary()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Returns the browser pool bound to the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        config = current_app.config if has_app_context() else {}
+        pool = BrowserPool(
+            size=int(config.get('BROWSER_POOL_SIZE', 2)),
+            max_concurrent_pages=int(config.get('BROWSER_POOL_MAX_PAGES', 4)),
+            max_pages_per_browser=int(config.get('BROWSER_MAX_PAGES_PER_BROWSER', 50)),
+            max_rss_mb=int(config.get('BROWSER_MAX_RSS_MB', 1500)),
+            page_timeout=int(config.get('BROWSER_PAGE_TIMEOUT', 60)),
+            rss_check_interval=int(config.get('BROWSER_RSS_CHECK_INTERVAL', 30)),
+        )
+        _pools[loop] = pool
+    return pool
@@ -1,4 +1,5 @@
 import re
+from datetime import datetime
 from decimal import Decimal, InvalidOperation
 
 
@@ -31,3 +32,59 @@ def clean_price(price_str: str | None) -> Decimal | None:
             return None
     return None
 
+
+
+def lttb(points: list, threshold: int) -> list:
+    """
+    Downsamples a series with Largest-Triangle-Three-Buckets, keeping its visual shape.
+
+    Args:
+        points (list[tuple]): (x, y, ...) points sorted by x; any extra fields are carried along.
+        threshold (int): Maximum number of points to return.
+
+    Returns:
+        list[tuple]: The first and last points plus, for every bucket in between,
+        the point forming the largest triangle with the previously kept point and the next
+        bucket's average.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        ax, ay = points[previous][0], points[previous][1]
+        best_area, best_index = -1.0, start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best_area, best_index = area, j
+        sampled.append(points[best_index])
+        previous = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def parse_keyset_cursor(value):
+    """Parses a `<timestamp>_<id>` page cursor; returns None for a missing or malformed one."""
+    if not value:
+        return None
+    try:
+        timestamp, record_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(record_id)
+    except ValueError:
+        return None
+
+
+def keyset_cursor(timestamp, record_id) -> str:
+    return f"{timestamp.isoformat()}_{record_id}"
@@ -0,0 +1,130 @@
+"""
+Helpers for PostgreSQL tables range-partitioned by month on a timestamp column.
+
+Partitions follow the naming convention `<table>_pYYYY_MM` and cover
+[first day of the month, first day of the next month). Each table also has a
+`<table>_default` DEFAULT partition, so an insert outside every monthly range still
+succeeds; ensure_monthly_partitions moves such rows into their own partitions.
+"""
+import re
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import text
+from app.extensions import db
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def existing_partitions(table: str):
+    """Returns {month: partition name} for the table's monthly partitions."""
+    rows = db.session.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {'table': table}).scalars().all()
+
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$")
+    partitions = {}
+    for name in rows:
+        match = pattern.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def create_monthly_partition(table: str, month: date, column: str = 'timestamp') -> str:
+    """
+    Creates the partition for `month`. Rows of that month already sitting in the DEFAULT
+    partition are moved into it first, as Postgres will not attach a range the DEFAULT
+    partition holds rows for.
+    """
+    name = partition_name(table, month)
+    next_month = add_months(month, 1)
+    db.session.execute(text(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)'))
+    db.session.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM "{default_partition_name(table)}"
+            WHERE "{column}" >= :start AND "{column}" < :end
+            RETURNING *
+        )
+        INSERT INTO "{name}" SELECT * FROM moved
+    """), {'start': month, 'end': next_month})
+    db.session.execute(text(
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+    ))
+    return name
+
+
+def default_partition_months(table: str, column: str = 'timestamp'):
+    """Returns the months that have rows in the DEFAULT partition, i.e. that had no partition of their own."""
+    return db.session.execute(text(
+        f'SELECT DISTINCT date_trunc(\'month\', "{column}")::date FROM "{default_partition_name(table)}"'
+    )).scalars().all()
+
+
+def ensure_monthly_partitions(table: str, months_ahead: int = 3, now: datetime = None):
+    """
+    Makes sure partitions exist from the current month through `months_ahead` months
+    ahead, so inserts never fall back to the DEFAULT partition. Months that did end up
+    there are logged as an error and get their own partition too.
+    Returns the names of created partitions.
+    """
+    current = month_start(now or datetime.utcnow())
+    existing = existing_partitions(table)
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+
+    stray_months = default_partition_months(table)
+    if stray_months:
+        current_app.logger.error(
+            f"{table} has rows in {default_partition_name(table)} for "
+            f"{', '.join(f'{month:%Y-%m}' for month in sorted(stray_months))}; moving them into monthly partitions"
+        )
+        months.update(stray_months)
+
+    created = [create_monthly_partition(table, month) for month in sorted(months) if month not in existing]
+    db.session.commit()
+    return created
+
+
+def partitions_before(table: str, cutoff: date):
+    """Returns [(month, partition name)] of the partitions that end on or before `cutoff`, oldest first."""
+    return sorted((month, name) for month, name in existing_partitions(table).items()
+                  if add_months(month, 1) <= cutoff)
+
+
+def drop_partition(table: str, name: str):
+    """Detaches and drops one partition; the parent table is only locked briefly."""
+    db.session.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+    db.session.execute(text(f'DROP TABLE "{name}"'))
+    db.session.commit()
+
+
+def estimated_row_count(table: str) -> int:
+    """
+    The planner's row estimate (pg_class.reltuples) for a table and its partitions, as kept
+    up to date by autovacuum/ANALYZE. Costs a catalog lookup instead of a COUNT(*) scan.
+    """
+    return db.session.execute(text("""
+        SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint
+        FROM pg_class c
+        WHERE c.oid = CAST(:table AS regclass)
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = CAST(:table AS regclass))
+    """), {'table': table}).scalar()
@@ -0,0 +1,83 @@
+from datetime import datetime
+from flask import current_app
+from app.utils.cache_utils import CacheManager
+
+BUDGET_FACTOR_KEY = "scheduling:budget_factor"
+
+
+def price_volatility(history, now: datetime = None):
+    """
+    Summarizes how much a price has been moving.
+
+    Args:
+        history (list[tuple[datetime, Decimal]]): (timestamp, price) pairs in time order.
+        now (datetime): Reference time, defaults to utcnow.
+
+    Returns:
+        tuple[float, float]: (price changes per day over the observed span,
+                              days since the price last changed).
+    """
+    now = now or datetime.utcnow()
+    if not history:
+        return 0.0, 0.0
+
+    changes = 0
+    last_change_at = history[0][0]
+    for (_, previous_price), (timestamp, price) in zip(history, history[1:]):
+        if price != previous_price:
+            changes += 1
+            last_change_at = timestamp
+
+    span_days = max((now - history[0][0]).total_seconds() / 86400, 1.0)
+    stable_days = (now - last_change_at).total_seconds() / 86400
+    return changes / span_days, stable_days
+
+
+def adaptive_check_interval(base_hours, min_hours, max_hours, changes_per_day, stable_days,
+                            price=None, target_price=None, budget_factor=1.0):
+    """
+    Picks the hours until a product's next check from its chosen frequency and its price behavior.
+
+    Volatile prices are checked up to 4x more often and prices that have been flat for weeks
+    up to 4x less often; a price within 5% (2%) of the target is checked at least 2x (4x) as
+    often as chosen. The result is stretched by the global budget factor and always kept
+    within [min_hours, max_hours].
+    """
+    hours = float(base_hours)
+    if changes_per_day >= 1:
+        hours /= 4
+    elif changes_per_day >= 0.25:
+        hours /= 2
+    elif stable_days >= 28:
+        hours *= 4
+    elif stable_days >= 14:
+        hours *= 2
+
+    if price is not None and target_price and price > target_price:
+        gap = float((price - target_price) / price)
+        if gap <= 0.02:
+            hours = min(hours, base_hours / 4)
+        elif gap <= 0.05:
+            hours = min(hours, base_hours / 2)
+
+    hours *= budget_factor
+    return max(float(min_hours), min(float(max_hours), hours))
+
+
+def get_budget_factor() -> float:
+    """How much adaptive intervals are currently stretched to stay within SCRAPE_HOURLY_BUDGET."""
+    try:
+        return max(1.0, float(CacheManager.get_sync(BUDGET_FACTOR_KEY) or 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def update_budget_factor(checks_due_next_hour: int) -> float:
+    """
+    Recomputes the budget factor from the number of checks due within the next hour and
+    shares it with the workers. Returns the new factor (1.0 when there is no budget).
+    """
+    budget = current_app.config.get('SCRAPE_HOURLY_BUDGET', 0)
+    factor = max(1.0, checks_due_next_hour / budget) if budget else 1.0
+    CacheManager.set_sync(BUDGET_FACTOR_KEY, str(round(factor, 3)), ttl=300)
+    return factor
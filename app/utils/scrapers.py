@@ -1,5 +1,6 @@
 import asyncio
 import aiohttp
+import concurrent.futures
 import hashlib
 import random
 import json
@@ -7,21 +8,25 @@ import logging
 import os
 import re
 import base64
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
-from flask import current_app
+from flask import current_app, has_app_context
 from urllib.parse import urlparse, parse_qs
 import redis.asyncio as redis
 from bs4 import BeautifulSoup
 from datetime import datetime
-from playwright.async_api import async_playwright
 from typing import Dict, Tuple, Optional, Union
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
-from playwright_stealth import stealth_async
+from app.utils.browser_pool import get_browser_pool
+from app.utils.throttling import CircuitBreaker, deferred_result, is_upstream_failure, take_token
 from urllib.parse import urlencode
 
 load_dotenv()
 
 RAINFOREST_API_KEY = os.getenv("RAINFOREST_API_KEY")
+# Point at https://api.sandbox.ebay.com or a local stub server to keep scheduled checks off production quota.
+EBAY_API_BASE_URL = os.getenv("EBAY_API_BASE_URL", "https://api.ebay.com").rstrip('/')
 USER_AGENTS = [
         # Chrome (Windows)
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
@@ -65,41 +70,85 @@ USER_AGENTS = [
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("parser")
 
-redis_client = None
+_redis_clients = weakref.WeakKeyDictionary()
 
-async def init_redis():
-    global redis_client
-    redis_client = await get_redis_connection()
 
-async def get_redis_connection():
+def _redis_url():
     host = current_app.config.get('REDIS_HOST', 'localhost')
     port = current_app.config.get('REDIS_PORT', 6379)
     password = current_app.config.get('REDIS_PASSWORD', None)
     db_num = current_app.config.get('REDIS_DB', 0)
+    return f"redis://:{password}@{host}:{port}/{db_num}" if password else f"redis://{host}:{port}/{db_num}"
+
 
-    url = f"redis://:{password}@{host}:{port}/{db_num}" if password else f"redis://{host}:{port}/{db_num}"
-    return redis.from_url(url)
+async def get_redis_connection():
+    """
+    Returns the process-wide async Redis client for the running event loop.
+    The client is created once per loop on top of a single blocking connection pool
+    (REDIS_MAX_CONNECTIONS), so cache calls borrow an open connection instead of
+    dialing Redis each time, and wait for a free one when the pool is exhausted.
+    """
+    loop = asyncio.get_running_loop()
+    client = _redis_clients.get(loop)
+    if client is None:
+        pool = redis.BlockingConnectionPool.from_url(
+            _redis_url(),
+            max_connections=int(current_app.config.get('REDIS_MAX_CONNECTIONS', 50)),
+            timeout=5,
+        )
+        client = redis.Redis(connection_pool=pool)
+        _redis_clients[loop] = client
+    return client
 
 
 async def get_cached(key):
     try:
         r = await get_redis_connection()
-        async with r.client() as conn:
-            return await conn.get(key)
+        return await r.get(key)
     except Exception as e:
         logging.error(f"Redis cache GET failed: {e}")
         return None
 
 
-async def set_cached(key, value, error=False):
+async def get_cached_many(keys):
+    """Fetches many keys with a single MGET. Returns values aligned with `keys`, None for misses."""
+    if not keys:
+        return []
     try:
         r = await get_redis_connection()
-        if not r: return
-        ttl = 300 if error else 3600
+        return await r.mget(keys)
+    except Exception as e:
+        logging.error(f"Redis cache MGET failed: {e}")
+        return [None] * len(keys)
+
+
+async def set_cached(key, value, error=False, ttl=None):
+    try:
+        r = await get_redis_connection()
+        ttl = ttl or (300 if error else 3600)
         await r.setex(key, ttl, json.dumps(value, ensure_ascii=False))
     except Exception as e:
         logging.error(f"Redis cache SET failed: {e}")
 
+
+async def set_cached_many(items, error=False, ttls=None):
+    """
+    Stores a {key: value} mapping with pipelined SETEX calls in one round trip.
+    `ttls` optionally maps keys to their own expiry, overriding the default.
+    """
+    if not items:
+        return
+    try:
+        r = await get_redis_connection()
+        ttl = 300 if error else 3600
+        ttls = ttls or {}
+        async with r.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.setex(key, ttls.get(key, ttl), json.dumps(value, ensure_ascii=False))
+            await pipe.execute()
+    except Exception as e:
+        logging.error(f"Redis cache pipelined SET failed: {e}")
+
 async def evade_bot_detection(context):
     page = await context.new_page()
     await page.add_init_script("""
@@ -124,11 +173,54 @@ async def evade_bot_detection(context):
     return page
 
 class BaseParser:
+    # Parsers that can look up many items in one upstream request set batch_size
+    # and override parse_batch.
+    batch_size = None
+
     def __init__(self, url):
         self.url = url
 
+    @classmethod
+    async def parse_batch(cls, urls, session: aiohttp.ClientSession):
+        """
+        Parses many URLs of this marketplace. Returns {url: (data, has_error)}.
+        This default parses every URL on its own, each behind the rate limits and circuit
+        breakers exactly like a single check; a URL that could not get through comes back
+        as a deferred result.
+        """
+        results = await asyncio.gather(*(
+            _call_upstream(url, lambda url=url: _run_parser(cls, url, session)) for url in urls))
+        return {
+            url: ({key: value for key, value in result.items() if key != 'success'}, not result.get('success'))
+            for url, result in zip(urls, results)
+        }
+
+
+EBAY_TOKEN_CACHE_KEY = "ebay:oauth:app_token"
+EBAY_TOKEN_LOCK_KEY = "ebay:oauth:app_token:lock"
+EBAY_TOKEN_REFRESH_MARGIN = 300  # seconds before expiry at which a new token is minted
+EBAY_DEFAULT_RETRY_AFTER = 60  # seconds to defer a batch whose getItems call failed without a Retry-After
 
-async def get_ebay_oauth_token():
+_ebay_token = {'access_token': None, 'expires_at': 0.0}
+_ebay_token_locks = weakref.WeakKeyDictionary()
+
+
+def _ebay_token_is_fresh(token, margin=EBAY_TOKEN_REFRESH_MARGIN):
+    return bool(token and token.get('access_token') and token.get('expires_at', 0) - time.time() > margin)
+
+
+async def _read_shared_ebay_token():
+    try:
+        r = await get_redis_connection()
+        raw = await r.get(EBAY_TOKEN_CACHE_KEY)
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        logger.warning(f"Could not read shared eBay token from Redis: {e}")
+        return None
+
+
+async def _mint_ebay_oauth_token(session: aiohttp.ClientSession = None):
+    """Requests a new application token from eBay. Returns (access_token, expires_in)."""
     client_id = os.getenv("EBAY_CLIENT_ID")
     client_secret = os.getenv("EBAY_CLIENT_SECRET")
 
@@ -147,17 +239,96 @@ async def get_ebay_oauth_token():
         "scope": "https://api.ebay.com/oauth/api_scope"
     }
 
-    async with aiohttp.ClientSession() as session:
+    owns_session = session is None
+    if owns_session:
+        session = aiohttp.ClientSession()
+    try:
         async with session.post(
-            "https://api.ebay.com/identity/v1/oauth2/token",
+            f"{EBAY_API_BASE_URL}/identity/v1/oauth2/token",
             headers=headers,
             data=data
         ) as resp:
             body = await resp.json()
             if resp.status != 200:
-                print("FAILED", resp.status, body)
+                logger.error(f"eBay token request failed: {resp.status} {body}")
                 raise Exception(f"eBay token request failed: {body}")
-            return body["access_token"]
+            return body["access_token"], int(body.get("expires_in", 7200))
+    finally:
+        if owns_session:
+            await session.close()
+
+
+async def get_ebay_oauth_token(session: aiohttp.ClientSession = None):
+    """
+    Returns a valid eBay application token.
+
+    Tokens are cached in-process and in Redis (shared by all workers) for as long as eBay's
+    `expires_in` allows, and are refreshed EBAY_TOKEN_REFRESH_MARGIN seconds before they
+    expire. A Redis lock makes sure only one worker mints a new token at a time; the others
+    keep using the still-valid old token or wait briefly for the new one.
+    """
+    if _ebay_token_is_fresh(_ebay_token):
+        return _ebay_token['access_token']
+
+    loop = asyncio.get_running_loop()
+    lock = _ebay_token_locks.setdefault(loop, asyncio.Lock())
+    async with lock:
+        if _ebay_token_is_fresh(_ebay_token):
+            return _ebay_token['access_token']
+
+        shared = await _read_shared_ebay_token()
+        if _ebay_token_is_fresh(shared):
+            _ebay_token.update(shared)
+            return shared['access_token']
+
+        r = None
+        refresh_lock_acquired = False
+        try:
+            r = await get_redis_connection()
+            refresh_lock_acquired = bool(await r.set(EBAY_TOKEN_LOCK_KEY, os.getpid(), nx=True, ex=30))
+        except Exception as e:
+            logger.warning(f"Could not take eBay token refresh lock, refreshing locally: {e}")
+            r = None
+
+        if r is not None and not refresh_lock_acquired:
+            # Another worker is refreshing. An old token that has not expired yet is still usable.
+            if _ebay_token_is_fresh(shared, margin=10):
+                return shared['access_token']
+            for _ in range(40):
+                await asyncio.sleep(0.25)
+                shared = await _read_shared_ebay_token()
+                if _ebay_token_is_fresh(shared):
+                    _ebay_token.update(shared)
+                    return shared['access_token']
+            logger.warning("Timed out waiting for another worker to refresh the eBay token")
+
+        try:
+            access_token, expires_in = await _mint_ebay_oauth_token(session)
+            token = {'access_token': access_token, 'expires_at': time.time() + expires_in}
+            _ebay_token.update(token)
+            if r is not None:
+                try:
+                    await r.setex(EBAY_TOKEN_CACHE_KEY, expires_in, json.dumps(token))
+                except Exception as e:
+                    logger.warning(f"Could not share eBay token through Redis: {e}")
+            logger.info(f"Minted new eBay application token, valid for {expires_in}s")
+            return access_token
+        finally:
+            if refresh_lock_acquired:
+                try:
+                    await r.delete(EBAY_TOKEN_LOCK_KEY)
+                except Exception:
+                    pass
+
+
+async def invalidate_ebay_oauth_token():
+    """Drops the cached token, e.g. after eBay rejected it with 401."""
+    _ebay_token.update({'access_token': None, 'expires_at': 0.0})
+    try:
+        r = await get_redis_connection()
+        await r.delete(EBAY_TOKEN_CACHE_KEY)
+    except Exception as e:
+        logger.warning(f"Could not drop shared eBay token from Redis: {e}")
 
 class AmazonParser(BaseParser):
     async def parse(self, session):
@@ -180,7 +351,21 @@ class AmazonParser(BaseParser):
             return {"error": "amazon_parse_error", "details": str(e)}, True
 
 
+class EbayApiError(Exception):
+    """A failed Browse API call. `retry_after` comes from eBay's Retry-After header, if any."""
+
+    def __init__(self, status, details, retry_after=None):
+        super().__init__(f"eBay API returned {status}: {details}")
+        self.status = status
+        self.retry_after = retry_after
+
+
 class EbayParser(BaseParser):
+    MARKETPLACE_IDS = {'ebay.com': 'EBAY_US', 'ebay.co.uk': 'EBAY_GB', 'ebay.de': 'EBAY_DE',
+                       'ebay.ca': 'EBAY_CA', 'ebay.com.au': 'EBAY_AU'}
+    # The Browse API's getItems call accepts at most 20 item ids.
+    batch_size = 20
+
     async def parse(self, session: aiohttp.ClientSession):
         api_result, has_error = await self._parse_with_api(session)
 
@@ -195,32 +380,120 @@ class EbayParser(BaseParser):
 
         return await self._parse_with_playwright()
 
+    @staticmethod
+    def _extract_item_id(url):
+        match = re.search(r"/itm/(?:[^/?#]+/)?(\d+)", url)
+        return match.group(1) if match else None
+
+    @classmethod
+    def _api_headers(cls, token, url):
+        domain = urlparse(url).netloc.lower().replace('www.', '')
+        return {
+            "Authorization": f"Bearer {token}",
+            "X-EBAY-C-MARKETPLACE-ID": cls.MARKETPLACE_IDS.get(domain, 'EBAY_US'),
+        }
+
+    @classmethod
+    async def parse_batch(cls, urls, session: aiohttp.ClientSession):
+        """
+        Resolves up to `batch_size` items with a single Browse API getItems call.
+        Items the bulk call does not return (item groups, ended or unknown listings) go
+        through parse() one by one, each behind the rate limits like a single check.
+        If the bulk call itself fails, every item is deferred instead: retrying them one by
+        one would only hit a throttled or failing API harder.
+        """
+        urls_by_item_id = {}
+        for url in urls:
+            item_id = cls._extract_item_id(url)
+            if item_id:
+                urls_by_item_id.setdefault(item_id, []).append(url)
+
+        found = {}
+        if urls_by_item_id:
+            try:
+                found = await cls._get_items(list(urls_by_item_id), session, urls[0])
+            except Exception as e:
+                logger.warning(f"eBay bulk item lookup failed, deferring {len(urls)} items: {e}")
+                failure = cls._bulk_failure(e)
+                return {url: (dict(failure), True) for url in urls}
+
+        results = {}
+        for item_id, item in found.items():
+            for url in urls_by_item_id.get(item_id, []):
+                results[url] = item, False
+
+        misses = [url for url in urls if url not in results]
+        if misses:
+            results.update(await super().parse_batch(misses, session))
+
+        logger.info(f"eBay batch: {len(urls) - len(misses)} of {len(urls)} items resolved in one bulk call")
+        return results
+
+    @staticmethod
+    def _bulk_failure(error):
+        """The deferred result every item of a batch gets when its getItems call failed."""
+        status = getattr(error, 'status', None)
+        if status is not None:
+            reason = f"ebay_api_error_{status}"
+        elif isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError)):
+            reason = "ebay_api_network_error"
+        else:
+            reason = "ebay_api_exception"
+        retry_after = getattr(error, 'retry_after', None) or EBAY_DEFAULT_RETRY_AFTER
+        return {**deferred_result(reason, retry_after), 'status': status, 'details': str(error)}
+
+    @classmethod
+    async def _get_items(cls, item_ids, session: aiohttp.ClientSession, sample_url):
+        """
+        Looks up several legacy item ids in one getItems request.
+        Returns {legacy_item_id: {'name': ..., 'price': ...}} for the items eBay returned and
+        raises EbayApiError if the call fails. A token eBay rejects is replaced once.
+        """
+        params = {"item_ids": ",".join(f"v1|{item_id}|0" for item_id in item_ids)}
+        for attempt in range(2):
+            token = await get_ebay_oauth_token(session)
+            if not token:
+                raise Exception("eBay auth failed")
+
+            async with session.get(f"{EBAY_API_BASE_URL}/buy/browse/v1/item/",
+                                   headers=cls._api_headers(token, sample_url), params=params) as resp:
+                response_text = await resp.text()
+                if resp.status == 401:
+                    await invalidate_ebay_oauth_token()
+                    if attempt == 0:
+                        continue
+                if resp.status != 200:
+                    retry_after = resp.headers.get("Retry-After", "")
+                    raise EbayApiError(resp.status, response_text[:200],
+                                       float(retry_after) if retry_after.isdigit() else None)
+                data = json.loads(response_text)
+                break
+
+        items = {}
+        for item in data.get("items") or []:
+            # itemId has the form "v1|<legacy id>|<variation id>"
+            legacy_id = item.get("legacyItemId") or (item.get("itemId") or "").partition("|")[2].partition("|")[0]
+            price = (item.get("price") or {}).get("value")
+            if legacy_id and price is not None:
+                items[str(legacy_id)] = {"name": item.get("title"), "price": float(price)}
+        return items
+
     async def _parse_with_api(self, session: aiohttp.ClientSession):
         try:
-            match = re.search(r"/itm/(\d+)", self.url)
-            if not match:
+            item_id = self._extract_item_id(self.url)
+            if not item_id:
                 return {"error": "ebay_item_id_not_found", "details": "Could not extract item ID from URL"}, True
-            item_id = match.group(1)
 
             try:
-                token = await get_ebay_oauth_token()
+                token = await get_ebay_oauth_token(session)
                 if not token:
                     return {"error": "ebay_auth_failed"}, True
             except Exception as e:
                 return {"error": "ebay_auth_exception", "details": str(e)}, True
 
-            domain = urlparse(self.url).netloc.lower().replace('www.', '')
-            marketplace_map = {'ebay.com': 'EBAY_US', 'ebay.co.uk': 'EBAY_GB', 'ebay.de': 'EBAY_DE',
-                               'ebay.ca': 'EBAY_CA',
-                               'ebay.com.au': 'EBAY_AU'}
-            marketplace_id = marketplace_map.get(domain, 'EBAY_US')
+            headers = self._api_headers(token, self.url)
 
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "X-EBAY-C-MARKETPLACE-ID": marketplace_id,
-            }
-
-            api_url_legacy = "https://api.ebay.com/buy/browse/v1/item/get_item_by_legacy_id"
+            api_url_legacy = f"{EBAY_API_BASE_URL}/buy/browse/v1/item/get_item_by_legacy_id"
             params_legacy = {"legacy_item_id": item_id}
             logger.info(f"Attempting to fetch item {item_id} as a standard item.")
 
@@ -233,7 +506,7 @@ class EbayParser(BaseParser):
 
                 if resp.status == 400 and "get_items_by_item_group" in response_text:
                     logger.warning(f"Item {item_id} is an item group. Switching to group API.")
-                    api_url_group = "https://api.ebay.com/buy/browse/v1/item/get_items_by_item_group"
+                    api_url_group = f"{EBAY_API_BASE_URL}/buy/browse/v1/item/get_items_by_item_group"
                     params_group = {"item_group_id": item_id}
 
                     async with session.get(api_url_group, headers=headers, params=params_group) as group_resp:
@@ -251,6 +524,9 @@ class EbayParser(BaseParser):
                             return {"error": "ebay_group_api_error", "status": group_resp.status,
                                     "details": group_response_text}, True
 
+                if resp.status == 401:
+                    await invalidate_ebay_oauth_token()
+
                 logger.error(f"Ebay API error for item {item_id}: {resp.status} - {response_text}")
                 return {"error": "ebay_api_error", "status": resp.status, "details": response_text}, True
 
@@ -260,93 +536,170 @@ class EbayParser(BaseParser):
 
     async def _parse_with_playwright(self):
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page(user_agent=random.choice(USER_AGENTS))
-                await stealth_async(page)
-                await page.goto(self.url, timeout=60000, wait_until="domcontentloaded")
-
-                name_selectors = ["h1.x-item-title__mainTitle", ".x-item-title-text > .ux-textspans", "h1#itemTitle"]
-                name = ""
-                for selector in name_selectors:
-                    elements = await page.locator(selector).all()
-                    if elements:
-                        name_text = await elements[0].text_content()
-                        if name_text and name_text.strip():
-                            name = name_text.strip()
-                            break
-
-                price_selectors = ["div.x-price-primary span.ux-textspans", "span[itemprop='price']", ".display-price"]
-                price = None
-                for selector in price_selectors:
-                    elements = await page.locator(selector).all()
-                    for element in elements:
-                        price_text = await element.text_content()
-                        if price_text:
-                            cleaned_price = re.sub(r'[^\d.,]', '', price_text).replace(',', '.')
-                            if cleaned_price:
-                                try:
-                                    price = float(cleaned_price)
-                                    break
-                                except ValueError:
-                                    continue
-                    if price is not None:
-                        break
-
-                await browser.close()
-                if name and price is not None:
-                    return {"name": name, "price": price}, False
-
-                details = f"Could not extract name ({'found' if name else 'not found'}) or price ({'found' if price is not None else 'not found'})"
-                return {"error": "ebay_scrape_failure", "details": details}, True
-
+            pool = get_browser_pool()
+            return await pool.run(self._scrape_page, user_agent=random.choice(USER_AGENTS))
+        except asyncio.TimeoutError:
+            return {"error": "ebay_scrape_timeout", "details": f"Page did not load within {pool.page_timeout}s"}, True
         except Exception as e:
             logger.error(f"eBay Playwright scraping failed: {str(e)}", exc_info=True)
             return {"error": "ebay_scrape_exception", "details": str(e)}, True
 
+    async def _scrape_page(self, page):
+        await page.goto(self.url, wait_until="domcontentloaded")
+
+        name_selectors = ["h1.x-item-title__mainTitle", ".x-item-title-text > .ux-textspans", "h1#itemTitle"]
+        name = ""
+        for selector in name_selectors:
+            elements = await page.locator(selector).all()
+            if elements:
+                name_text = await elements[0].text_content()
+                if name_text and name_text.strip():
+                    name = name_text.strip()
+                    break
+
+        price_selectors = ["div.x-price-primary span.ux-textspans", "span[itemprop='price']", ".display-price"]
+        price = None
+        for selector in price_selectors:
+            elements = await page.locator(selector).all()
+            for element in elements:
+                price_text = await element.text_content()
+                if price_text:
+                    cleaned_price = re.sub(r'[^\d.,]', '', price_text).replace(',', '.')
+                    if cleaned_price:
+                        try:
+                            price = float(cleaned_price)
+                            break
+                        except ValueError:
+                            continue
+            if price is not None:
+                break
+
+        if name and price is not None:
+            return {"name": name, "price": price}, False
+
+        details = f"Could not extract name ({'found' if name else 'not found'}) or price ({'found' if price is not None else 'not found'})"
+        return {"error": "ebay_scrape_failure", "details": details}, True
+
 class WildberriesParser(BaseParser):
-    async def parse(self, session: aiohttp.ClientSession):
-        try:
-            product_id = re.search(r"(?:catalog|product)/(\d+)", self.url).group(1)
-            if not product_id:
-                return {"error": "wildberries_invalid_url"}, True
+    API_URL = "https://card.wb.ru/cards/v2/detail"
+    batch_size = 100
+
+    @staticmethod
+    def _extract_product_id(url):
+        match = re.search(r"(?:catalog|product)/(\d+)", url)
+        return int(match.group(1)) if match else None
+
+    @classmethod
+    async def _fetch_cards(cls, product_ids, session: aiohttp.ClientSession):
+        """
+        Fetches the cards of several products in one request (the `nm` parameter takes
+        semicolon-separated ids). Returns ({product_id: card}, error); on a failed request
+        the mapping is empty and error is a parser error dict.
+        """
+        params = {
+            "appType": 1,
+            "curr": "rub",
+            "dest": -1257786,
+            "nm": ";".join(str(product_id) for product_id in product_ids),
+            "spp": 30,
+        }
+        async with session.get(cls.API_URL, params=params, timeout=15) as resp:
+            if resp.status != 200:
+                return {}, {"error": f"wildberries_api_error_{resp.status}"}
+            data = await resp.json(content_type=None)
 
-            api_url = (
-                f"https://card.wb.ru/cards/v2/detail?"
-                f"appType=1&curr=rub&dest=-1257786&nm={product_id}&spp=30"
-            )
+        products = (data or {}).get("data", {}).get("products") or []
+        return {product.get("id"): product for product in products}, None
 
-            async with session.get(api_url, timeout=15) as resp:
-                if resp.status != 200:
-                    return {"error": f"wildberries_api_error_{resp.status}"}, True
+    @staticmethod
+    def _card_result(product):
+        if not product:
+            return {"error": "wildberries_product_not_found"}, True
 
-                data = await resp.json()
-                if not data.get("data", {}).get("products"):
-                    return {"error": "wildberries_product_not_found"}, True
+        price_info = None
+        if "sizes" in product and len(product["sizes"]) > 0:
+            size = product["sizes"][0]
+            if "price" in size:
+                price_info = size["price"]
 
-                product = data["data"]["products"][0]
+        raw_price = (price_info or {}).get("total") or (price_info or {}).get("product")
+        if not raw_price:
+            return {"error": "wildberries_price_not_found"}, True
 
-                price_info = None
-                if "sizes" in product and len(product["sizes"]) > 0:
-                    size = product["sizes"][0]
-                    if "price" in size:
-                        price_info = size["price"]
+        price = raw_price / 100
 
-                if not price_info:
-                    return {"error": "wildberries_price_not_found"}, True
+        return {
+            "name": product.get("name", "Name not specified"),
+            "price": price,
+        }, False
 
-                price = (price_info.get("total") or price_info.get("product")) / 100
+    async def parse(self, session: aiohttp.ClientSession):
+        try:
+            product_id = self._extract_product_id(self.url)
+            if not product_id:
+                return {"error": "wildberries_invalid_url"}, True
 
-                return {
-                    "name": product.get("name", "Name not specified"),
-                    "price": price,
-                }, False
+            cards, error = await self._fetch_cards([product_id], session)
+            if error:
+                return error, True
+            return self._card_result(cards.get(product_id))
 
         except aiohttp.ClientError as e:
             return {"error": "wildberries_network_error", "details": str(e)}, True
         except Exception as e:
             return {"error": "wildberries_parse_error", "details": str(e)}, True
 
+    @classmethod
+    async def parse_batch(cls, urls, session: aiohttp.ClientSession):
+        """
+        Looks up all given products with one request per `batch_size` ids and maps each card
+        back to its URL. A product missing from an otherwise good response fails on its own;
+        a failed request fails only the URLs in its chunk.
+        """
+        results = {}
+        urls_by_id = {}
+        for url in urls:
+            product_id = cls._extract_product_id(url)
+            if product_id:
+                urls_by_id.setdefault(product_id, []).append(url)
+            else:
+                results[url] = ({"error": "wildberries_invalid_url"}, True)
+
+        async def fetch(chunk):
+            try:
+                cards, error = await cls._fetch_cards(chunk, session)
+            except aiohttp.ClientError as e:
+                cards, error = {}, {"error": "wildberries_network_error", "details": str(e)}
+            except Exception as e:
+                cards, error = {}, {"error": "wildberries_parse_error", "details": str(e)}
+            return {**(error or {}), 'success': error is None, 'cards': cards}
+
+        product_ids = list(urls_by_id)
+        for start in range(0, len(product_ids), cls.batch_size):
+            chunk = product_ids[start:start + cls.batch_size]
+            if start == 0:
+                outcome = await fetch(chunk)
+            else:
+                # The caller's rate-limit token covers the first request only.
+                outcome = await _call_upstream(urls_by_id[chunk[0]][0], lambda chunk=chunk: fetch(chunk))
+            cards = outcome.pop('cards', {})
+            error = None if outcome.pop('success') else outcome
+
+            for product_id in chunk:
+                if error:
+                    result = (error, True)
+                else:
+                    try:
+                        result = cls._card_result(cards.get(product_id))
+                    except Exception as e:
+                        result = ({"error": "wildberries_parse_error", "details": str(e)}, True)
+                for url in urls_by_id[product_id]:
+                    results[url] = result
+
+        logger.info(f"Wildberries batch: {len(urls)} URLs in "
+                    f"{-(-len(product_ids) // cls.batch_size)} requests")
+        return results
+
 
 class WalmartParser(BaseParser):
     async def parse(self, session: aiohttp.ClientSession):
@@ -435,9 +788,60 @@ DOMAIN_PARSERS = {
     "ebay.com": EbayParser,
 }
 
+TRACKING_QUERY_PARAMS = {
+    '_trkparms', '_trksid', 'itmmeta', 'itmprp', 'hash', '_skw', 'amdata', 'mkcid', 'mkevt', 'mkrid',
+    'campid', 'toolid', 'customid', 'ref', 'ref_', 'tag', 'linkcode', 'th', 'psc', 'qid', 'sr', 'crid',
+    'sprefix', 'keywords', 'spm', 'scm', 'classtype', 'athbdg', 'from', 'gclid', 'fbclid', 'yclid',
+    'srsltid', 'content-id', 'dib', 'dib_tag', 'social_share', 'targetlang', 'pid', 'pf', 'sid',
+}
+TRACKING_QUERY_PREFIXES = ('utm_', 'pf_rd_', 'pd_rd_', '_branch_')
+
+CANONICAL_PATHS = {
+    'amazon.com': (re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})", re.I), "/dp/{}"),
+    'ebay.com': (re.compile(r"/itm/(?:[^/]+/)?(\d+)"), "/itm/{}"),
+    'wildberries.ru': (re.compile(r"/(?:catalog|product)/(\d+)"), "/catalog/{}/detail.aspx"),
+    'walmart.com': (re.compile(r"/ip/(?:[^/]+/)?(\d+)"), "/ip/{}"),
+}
+
+
+def normalize_domain(netloc: str) -> str:
+    """Lower-cases a host and strips the port and the www./m./smile. prefixes."""
+    domain = netloc.lower().split(':', 1)[0]
+    for prefix in ('www.', 'm.', 'smile.'):
+        if domain.startswith(prefix):
+            domain = domain[len(prefix):]
+    return domain
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduces a product URL to one canonical form so that the same listing always maps to
+    the same key: https scheme, normalised domain, no fragment, no tracking parameters,
+    and for known marketplaces just the item path (e.g. https://ebay.com/itm/256966053660).
+    """
+    parsed = urlparse(url.strip())
+    if parsed.scheme == 'mock':
+        return url
+
+    domain = normalize_domain(parsed.netloc)
+    rule = CANONICAL_PATHS.get(domain)
+    if rule:
+        match = rule[0].search(parsed.path)
+        if match:
+            return f"https://{domain}{rule[1].format(match.group(1))}"
+
+    query = sorted(
+        (key, value)
+        for key, values in parse_qs(parsed.query, keep_blank_values=True).items()
+        if key.lower() not in TRACKING_QUERY_PARAMS and not key.lower().startswith(TRACKING_QUERY_PREFIXES)
+        for value in values
+    )
+    path = parsed.path.rstrip('/') or '/'
+    return f"https://{domain}{path}" + (f"?{urlencode(query)}" if query else "")
+
+
 def get_parser(url):
-    domain = urlparse(url).netloc.lower().replace('www.', '')
-    return DOMAIN_PARSERS.get(domain)
+    return DOMAIN_PARSERS.get(normalize_domain(urlparse(url).netloc))
 
 async def parse_url_with_session(url: str):
     """Helper function that creates a session and calls the main parser."""
@@ -457,24 +861,102 @@ def extract_product_price(url: str) -> float | None:
     return data.get('price') if not data.get('error') and data.get('price') is not None else None
 
 
-async def parse_url(url: str, session: aiohttp.ClientSession) -> dict:
+SCRAPE_CACHE_PREFIX = "scrape:v1:"
+
+_inflight_scrapes = weakref.WeakKeyDictionary()
+
+
+def scrape_cache_key(url: str) -> str:
+    return SCRAPE_CACHE_PREFIX + hashlib.sha1(canonicalize_url(url).encode()).hexdigest()
+
+
+def _scrape_cache_ttl(url: str, result: dict) -> int:
+    config = current_app.config
+    if not result.get('success'):
+        return int(config.get('SCRAPE_ERROR_CACHE_TTL', 300))
+    domain = normalize_domain(urlparse(url).netloc)
+    return int(config.get('SCRAPE_CACHE_TTL_BY_DOMAIN', {}).get(domain, config.get('SCRAPE_CACHE_TTL', 3600)))
+
+
+def _decode_cached_result(raw):
+    if not raw:
+        return None
+    try:
+        return {**json.loads(raw), 'cached': True}
+    except (ValueError, TypeError):
+        return None
+
+
+UPSTREAM_APIS = {
+    'amazon.com': 'rainforest',
+    'walmart.com': 'rapidapi',
+    'ebay.com': 'ebay_browse',
+    'wildberries.ru': 'wildberries_cards',
+}
+
+
+def _throttle_names(url: str):
+    """The rate limit / circuit breaker names a request for `url` counts against."""
+    domain = normalize_domain(urlparse(url).netloc)
+    names = [f"domain:{domain}"]
+    if domain in UPSTREAM_APIS:
+        names.append(f"api:{UPSTREAM_APIS[domain]}")
+    return names
+
+
+async def _call_upstream(url: str, call, batch: bool = False):
     """
-    Parses a URL and returns a standardized dictionary.
-    Success: {'success': True, 'name': '...', 'price': ...}
-    Error:   {'success': False, 'error': '...', 'details': '...'}
+    Runs `call()` (one upstream request for `url`'s marketplace) behind the rate limits and
+    circuit breakers shared by all workers through Redis. If a circuit is open, or no token
+    frees up within SCRAPE_RATE_LIMIT_MAX_WAIT, the upstream is not called at all and a
+    deferred result is returned instead.
+    The outcome feeds the circuit breakers; with batch=True `call` returns {url: result}.
     """
-    parsed_uri = urlparse(url)
-    if parsed_uri.scheme == 'mock':
-        parser_instance = MockParser(url)
-        data, has_error = await parser_instance.parse()
-        return {**data, 'success': not has_error}
+    config = current_app.config
+    names = _throttle_names(url)
+    breaker = None
+    try:
+        r = await get_redis_connection()
+        breaker = CircuitBreaker(
+            r,
+            threshold=int(config.get('CIRCUIT_FAILURE_THRESHOLD', 5)),
+            window=int(config.get('CIRCUIT_FAILURE_WINDOW', 60)),
+            cooldown=int(config.get('CIRCUIT_COOLDOWN', 120)),
+            probe_timeout=int(config.get('CIRCUIT_PROBE_TIMEOUT', 30)),
+        )
+        for name in names:
+            retry_after = await breaker.retry_after(name)
+            if retry_after:
+                return deferred_result('circuit_open', retry_after)
+
+        rate_limits = config.get('SCRAPE_RATE_LIMITS', {})
+        max_wait = float(config.get('SCRAPE_RATE_LIMIT_MAX_WAIT', 10))
+        for name in names:
+            if name in rate_limits:
+                rate, burst = rate_limits[name]
+                wait = await take_token(r, name, rate, burst, max_wait)
+                if wait:
+                    return deferred_result('rate_limited', wait)
+    except Exception as e:
+        logger.warning(f"Throttling unavailable for {url}, calling upstream anyway: {e}")
 
-    domain = parsed_uri.netloc.lower().replace('www.', '')
-    parser_class = DOMAIN_PARSERS.get(domain)
+    result = await call()
+
+    if breaker is not None:
+        outcomes = list(result.values()) if batch else [result]
+        try:
+            if any(is_upstream_failure(outcome) for outcome in outcomes):
+                for name in names:
+                    await breaker.record_failure(name)
+            elif any(outcome.get('success') for outcome in outcomes):
+                for name in names:
+                    await breaker.record_success(name)
+        except Exception as e:
+            logger.warning(f"Could not record upstream outcome for {url}: {e}")
+    return result
 
-    if not parser_class:
-        return {'success': False, 'error': f'No parser found for domain: {domain}'}
 
+async def _run_parser(parser_class, url: str, session: aiohttp.ClientSession) -> dict:
     try:
         parser_instance = parser_class(url)
         data, has_error = await parser_instance.parse(session)
@@ -488,6 +970,209 @@ async def parse_url(url: str, session: aiohttp.ClientSession) -> dict:
         return {'success': False, 'error': f'Parser {parser_class.__name__} failed unexpectedly', 'details': str(e)}
 
 
+async def _run_batch_parser(parser_class, urls, session: aiohttp.ClientSession) -> dict:
+    try:
+        parsed = await parser_class.parse_batch(urls, session)
+    except Exception as e:
+        logger.exception(f"Unhandled exception in {parser_class.__name__}.parse_batch")
+        parsed = {url: ({'error': 'batch_parse_exception', 'details': str(e)}, True) for url in urls}
+    return {url: {**data, 'success': not has_error} for url, (data, has_error) in parsed.items()}
+
+
+async def _scrape_url(url: str, session: aiohttp.ClientSession) -> dict:
+    domain = normalize_domain(urlparse(url).netloc)
+    parser_class = DOMAIN_PARSERS.get(domain)
+
+    if not parser_class:
+        return {'success': False, 'error': f'No parser found for domain: {domain}'}
+
+    return await _call_upstream(url, lambda: _run_parser(parser_class, url, session))
+
+
+async def _scrape_once_across_workers(url: str, key: str, session: aiohttp.ClientSession) -> dict:
+    """
+    Takes a short Redis lock for the cache key before scraping. Workers that lose the race
+    poll the cache for the winner's result instead of paying for a duplicate API call;
+    if the winner dies, they scrape themselves once the lock expires.
+    """
+    lock_ttl = int(current_app.config.get('SCRAPE_LOCK_TIMEOUT', 90))
+    lock_key = f"{key}:lock"
+    token = f"{os.getpid()}:{id(asyncio.current_task())}:{time.time()}"
+    r = None
+    owns_lock = False
+    try:
+        r = await get_redis_connection()
+        deadline = time.monotonic() + lock_ttl
+        while not (owns_lock := bool(await r.set(lock_key, token, nx=True, ex=lock_ttl))):
+            await asyncio.sleep(0.5)
+            cached = _decode_cached_result(await r.get(key))
+            if cached is not None:
+                return cached
+            if time.monotonic() > deadline:
+                logger.warning(f"Gave up waiting for in-flight scrape of {url}, scraping it again")
+                break
+    except Exception as e:
+        logger.warning(f"Scrape single-flight lock unavailable for {url}: {e}")
+
+    try:
+        result = await _scrape_url(url, session)
+        if not result.get('deferred'):
+            await set_cached(key, result, ttl=_scrape_cache_ttl(url, result))
+        return result
+    finally:
+        if owns_lock:
+            try:
+                await r.eval(
+                    "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0",
+                    1, lock_key, token)
+            except Exception:
+                pass
+
+
+async def parse_url(url: str, session: aiohttp.ClientSession, use_cache: bool = True) -> dict:
+    """
+    Parses a URL and returns a standardized dictionary.
+    Success: {'success': True, 'name': '...', 'price': ...}
+    Error:   {'success': False, 'error': '...', 'details': '...'}
+    Deferred (upstream throttled or its circuit is open, nothing was fetched):
+             {'success': False, 'deferred': True, 'error': '...', 'retry_after': seconds}
+
+    Results are cached under the canonical URL (SCRAPE_CACHE_TTL, per-domain overrides in
+    SCRAPE_CACHE_TTL_BY_DOMAIN; failures for SCRAPE_ERROR_CACHE_TTL). Concurrent calls for
+    the same listing, in this process or in other workers, share a single scrape.
+    Pass use_cache=False to force a fresh scrape.
+    """
+    parsed_uri = urlparse(url)
+    if parsed_uri.scheme == 'mock':
+        parser_instance = MockParser(url)
+        data, has_error = await parser_instance.parse()
+        return {**data, 'success': not has_error}
+
+    if not use_cache:
+        return await _scrape_url(url, session)
+
+    key = scrape_cache_key(url)
+    cached = _decode_cached_result(await get_cached(key))
+    if cached is not None:
+        return cached
+
+    loop = asyncio.get_running_loop()
+    inflight = _inflight_scrapes.setdefault(loop, {})
+    if key in inflight:
+        return await asyncio.shield(inflight[key])
+
+    future = loop.create_future()
+    inflight[key] = future
+    try:
+        result = await _scrape_once_across_workers(url, key, session)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        # Waiters get the same error; retrieving it here keeps asyncio from reporting it
+        # as unhandled when nobody else was waiting.
+        future.set_exception(e)
+        future.exception()
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    finally:
+        inflight.pop(key, None)
+
+
+async def parse_urls(urls, concurrency: int = 100, per_domain_limit: int = 8, session: aiohttp.ClientSession = None):
+    """
+    Parses many URLs concurrently on the current event loop and yields (url, result) pairs
+    as soon as each one finishes, fastest first.
+
+    All requests go through one shared aiohttp session, so TCP/TLS connections are reused
+    across products. `concurrency` caps the total number of in-flight parses and
+    `per_domain_limit` caps how many of them may hit the same marketplace at once.
+    Duplicate URLs are parsed only once, and cached results are fetched with one MGET
+    and yielded first. Marketplaces whose parser has a multi-item endpoint (`batch_size`)
+    are looked up a chunk at a time through `parse_batch`.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return
+
+    cacheable_urls = [url for url in unique_urls if urlparse(url).scheme != 'mock']
+    cached_results = await get_cached_many([scrape_cache_key(url) for url in cacheable_urls])
+    cached_by_url = dict(zip(cacheable_urls, cached_results))
+    pending_urls = []
+    for url in unique_urls:
+        cached = _decode_cached_result(cached_by_url.get(url))
+        if cached is not None:
+            yield url, cached
+        else:
+            pending_urls.append(url)
+    if not pending_urls:
+        return
+
+    owns_session = session is None
+    if owns_session:
+        connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector)
+
+    global_limit = asyncio.Semaphore(concurrency)
+    domain_limits = {}
+
+    def domain_limit_for(url):
+        domain = normalize_domain(urlparse(url).netloc)
+        return domain_limits.setdefault(domain, asyncio.Semaphore(per_domain_limit))
+
+    async def parse_one(url):
+        async with global_limit, domain_limit_for(url):
+            try:
+                return [(url, await parse_url(url, session))]
+            except Exception as e:
+                logger.exception(f"Unhandled exception while parsing {url} in batch")
+                return [(url, {'success': False, 'error': 'batch_parse_exception', 'details': str(e)})]
+
+    async def parse_chunk(parser_class, chunk):
+        async with global_limit, domain_limit_for(chunk[0]):
+            parsed = await _call_upstream(chunk[0], lambda: _run_batch_parser(parser_class, chunk, session),
+                                          batch=True)
+        if parsed.get('deferred'):
+            return [(url, parsed) for url in chunk]
+
+        results = list(parsed.items())
+        # Items the parser deferred one by one were never fetched, so they are not cached.
+        fetched = [(url, result) for url, result in results if not result.get('deferred')]
+        await set_cached_many({scrape_cache_key(url): result for url, result in fetched},
+                              ttls={scrape_cache_key(url): _scrape_cache_ttl(url, result) for url, result in fetched})
+        return results
+
+    # Marketplaces with a multi-item endpoint get one task per chunk, everything else one per URL.
+    urls_by_parser = {}
+    single_urls = []
+    for url in pending_urls:
+        parser_class = DOMAIN_PARSERS.get(normalize_domain(urlparse(url).netloc))
+        if parser_class is not None and parser_class.batch_size:
+            urls_by_parser.setdefault(parser_class, []).append(url)
+        else:
+            single_urls.append(url)
+
+    tasks = [asyncio.ensure_future(parse_one(url)) for url in single_urls]
+    for parser_class, batch_urls in urls_by_parser.items():
+        if len(batch_urls) == 1:
+            tasks.append(asyncio.ensure_future(parse_one(batch_urls[0])))
+            continue
+        for start in range(0, len(batch_urls), parser_class.batch_size):
+            tasks.append(asyncio.ensure_future(
+                parse_chunk(parser_class, batch_urls[start:start + parser_class.batch_size])))
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for result in await next_done:
+                yield result
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        if owns_session:
+            await session.close()
+
+
 def extract_product_data(url: str) -> dict:
     """The main synchronous entrypoint for parsing. Always returns a dictionary."""
     try:
@@ -499,14 +1184,49 @@ def extract_product_data(url: str) -> dict:
         logger.error(f"Failed to run async parser for {url}: {e}", exc_info=True)
         return {'success': False, 'error': 'Failed to execute async parser task', 'details': str(e)}
 
-def run_async_in_sync(coro):
+_worker_loop = None
+_worker_loop_pid = None
+_worker_loop_lock = threading.Lock()
+
+
+def get_worker_loop():
+    """
+    Returns this process's long-lived scraper event loop, starting it in a daemon thread
+    on first use (and again after a fork, since threads do not survive one).
+    Everything bound to a loop (the browser pool, pooled clients) stays warm between calls
+    because every sync entrypoint submits its coroutine to this same loop.
+    """
+    global _worker_loop, _worker_loop_pid
+    with _worker_loop_lock:
+        if _worker_loop is None or _worker_loop_pid != os.getpid() or _worker_loop.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='scraper-event-loop', daemon=True).start()
+            _worker_loop, _worker_loop_pid = loop, os.getpid()
+        return _worker_loop
+
+
+def run_async_in_sync(coro, timeout: float = None):
+    """Runs a coroutine on the worker loop and blocks until it finishes. Context variables
+    (e.g. the Flask app context) are carried over to the loop thread.
+    Gives up after `timeout` seconds (WORKER_LOOP_TIMEOUT by default), cancelling the
+    coroutine and raising TimeoutError, so a hung call cannot block the caller forever."""
+    loop = get_worker_loop()
     try:
-        loop = asyncio.get_running_loop()
-        if loop.is_running():
-            return asyncio.run_coroutine_threadsafe(coro, loop).result()
+        running_loop = asyncio.get_running_loop()
     except RuntimeError:
-        pass
-    return asyncio.run(coro)
+        running_loop = None
+    if running_loop is loop:
+        coro.close()
+        raise RuntimeError("run_async_in_sync() cannot block the scraper event loop it runs on")
+
+    if timeout is None:
+        timeout = current_app.config.get('WORKER_LOOP_TIMEOUT', 300) if has_app_context() else 300
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Coroutine on the worker loop did not finish within {timeout}s")
 
 
 
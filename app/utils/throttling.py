@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import re
+import time
+
+logger = logging.getLogger("parser")
+
+# Refills the bucket for the time elapsed since the last call, then takes one token.
+# Returns "0" when a token was taken, otherwise the seconds until one is available.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+UPSTREAM_FAILURE_STATUS = re.compile(r"_(429|5\d\d)$")
+
+
+def is_upstream_failure(result: dict) -> bool:
+    """
+    Tells whether a failed parser result means the upstream is struggling (throttling us,
+    erroring or unreachable) rather than the item itself being bad.
+    """
+    if result.get('success'):
+        return False
+    status = result.get('status')
+    if isinstance(status, int) and (status == 429 or status >= 500):
+        return True
+    error = str(result.get('error', ''))
+    return bool(UPSTREAM_FAILURE_STATUS.search(error)) or error.endswith(('_network_error', '_timeout'))
+
+
+def deferred_result(reason: str, retry_after: float) -> dict:
+    """The cheap result returned instead of calling an upstream that is throttled or down."""
+    return {'success': False, 'deferred': True, 'error': reason, 'retry_after': round(retry_after, 1)}
+
+
+async def take_token(r, name: str, rate: float, burst: int, max_wait: float) -> float:
+    """
+    Takes one token from the shared bucket `name`, waiting up to max_wait seconds for it.
+    Returns 0 once a token is taken, otherwise the seconds until the next one would be free.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        wait = float(await r.eval(TOKEN_BUCKET_SCRIPT, 1, f"throttle:bucket:{name}", rate, burst, time.time()))
+        if wait <= 0:
+            return 0
+        if time.monotonic() + wait > deadline:
+            return wait
+        await asyncio.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker whose state lives in Redis, so every worker trips and recovers together.
+
+    `threshold` upstream failures within `window` seconds open the circuit for `cooldown`
+    seconds. After that the circuit is half-open: one caller at a time holds a probe lease
+    (for up to `probe_timeout` seconds) and goes through, everyone else keeps waiting. The
+    first failure while on probation reopens the circuit, the first success closes it.
+    """
+
+    def __init__(self, r, threshold=5, window=60, cooldown=120, probe_timeout=30):
+        self.r = r
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+
+    async def retry_after(self, name: str) -> float:
+        """
+        Seconds until the circuit `name` lets calls through again; 0 if it is closed, or if
+        it is half-open and this caller just took the probe lease.
+        """
+        async with self.r.pipeline(transaction=False) as pipe:
+            pipe.pttl(f"circuit:{name}:open")
+            pipe.exists(f"circuit:{name}:probation")
+            ttl, on_probation = await pipe.execute()
+        if ttl and ttl > 0:
+            return ttl / 1000
+        if not on_probation:
+            return 0
+
+        probe_key = f"circuit:{name}:probe"
+        if await self.r.set(probe_key, 1, nx=True, ex=self.probe_timeout):
+            return 0
+        ttl = await self.r.pttl(probe_key)
+        return ttl / 1000 if ttl and ttl > 0 else 1
+
+    async def record_success(self, name: str):
+        async with self.r.pipeline(transaction=False) as pipe:
+            pipe.delete(f"circuit:{name}:failures", f"circuit:{name}:probation", f"circuit:{name}:probe")
+            await pipe.execute()
+
+    async def record_failure(self, name: str):
+        failures_key = f"circuit:{name}:failures"
+        async with self.r.pipeline(transaction=False) as pipe:
+            pipe.incr(failures_key)
+            pipe.exists(f"circuit:{name}:probation")
+            failures, on_probation = await pipe.execute()
+        if failures == 1:
+            await self.r.expire(failures_key, self.window)
+
+        if on_probation or failures >= self.threshold:
+            await self.open(name)
+
+    async def open(self, name: str):
+        async with self.r.pipeline(transaction=False) as pipe:
+            pipe.set(f"circuit:{name}:open", 1, ex=self.cooldown)
+            pipe.set(f"circuit:{name}:probation", 1, ex=self.cooldown + self.window)
+            pipe.delete(f"circuit:{name}:failures", f"circuit:{name}:probe")
+            await pipe.execute()
+        logger.warning(f"Circuit '{name}' opened for {self.cooldown}s after repeated upstream failures")
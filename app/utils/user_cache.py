@@ -0,0 +1,261 @@
+"""
+Cache for the user Flask-Login loads on every request.
+
+load_user() serves users from a small in-process TTL LRU backed by Redis instead of querying
+the users table each time. The cached value is a plain snapshot of the user's columns (minus
+secrets and scratch state, see PRIVATE_COLUMNS) plus its role's permissions, handed out as a
+CachedUser. Committed changes to a User, including bulk UPDATE/DELETE statements on users,
+drop that user's entries (bulk statements drop every entry), and committed changes to a Role
+drop every entry. The in-process layer of other processes can lag by up to
+USER_CACHE_LOCAL_TTL seconds.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app, has_app_context
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session, object_session
+from app.extensions import db
+from app.models import Permission, Role, User
+from app.utils.cache_utils import CacheManager
+
+CACHE_KEY = "user_cache:{user_id}"
+PENDING_KEY = 'user_cache_invalidations'
+ALL_USERS = '*'
+
+# Never copied to Redis; reading them loads the User from the database.
+PRIVATE_COLUMNS = frozenset({'password_hash', 'telegram_linking_token', 'temp_data'})
+SNAPSHOT_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key not in PRIVATE_COLUMNS)
+DATETIME_COLUMNS = frozenset(column.key for column in User.__table__.columns
+                             if isinstance(column.type, db.DateTime))
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+class CachedUser:
+    """
+    Detached, read-only view of a User for current_user and templates.
+
+    Columns, can() and is_administrator come from the snapshot. Anything else (relationships,
+    verify_password, token helpers, private columns) is delegated to the real User, which is
+    loaded from the session on first use. From then on columns are read from that User too,
+    so changes made through it (assignments here, or model methods like change_email) are
+    visible straight away and saved by the next commit; pass `model` where an ORM instance
+    is needed.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, data, model=None):
+        self.__dict__.update(data)
+        self.__dict__['_model'] = None
+        if model is not None:
+            self._attach(model)
+
+    @property
+    def model(self) -> User:
+        if self._model is None:
+            self._attach(db.session.get(User, self.__dict__['id']))
+        return self._model
+
+    def _attach(self, model):
+        self.__dict__['_model'] = model
+        for name in SNAPSHOT_COLUMNS:
+            if name != 'id':
+                self.__dict__.pop(name, None)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.model, name, value)
+
+    def __eq__(self, other):
+        return hasattr(other, 'get_id') and self.get_id() == other.get_id()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<CachedUser {self.email}>'
+
+    def get_id(self):
+        return str(self.id)
+
+    def can(self, perm):
+        return self.permissions is not None and self.permissions & perm == perm
+
+    @property
+    def is_administrator(self):
+        return self.can(Permission.ADMIN)
+
+    def ping(self):
+        """
+        Records activity at most once per USER_LAST_SEEN_INTERVAL seconds, with a single
+        UPDATE that neither loads the User nor invalidates the cache.
+        """
+        now = datetime.utcnow()
+        interval = current_app.config.get('USER_LAST_SEEN_INTERVAL', 300)
+        if self.last_seen is not None and (now - self.last_seen).total_seconds() < interval:
+            return
+        db.session.execute(update(User).where(User.id == self.id).values(last_seen=now),
+                           execution_options={'invalidate_user_cache': False})
+        db.session.commit()
+        if self._model is None:
+            self.__dict__['last_seen'] = now
+        _store(self.id, {name: getattr(self, name) for name in SNAPSHOT_COLUMNS + ('permissions',)})
+
+
+def load_cached_user(user_id):
+    """Returns the CachedUser for an id from the in-process cache, Redis, or the database (None if missing)."""
+    user_id = int(user_id)
+    data = _local_get(user_id)
+    if data is not None:
+        return CachedUser(data)
+
+    client = CacheManager.get_client()
+    raw = None
+    if client is not None:
+        try:
+            raw = client.get(CACHE_KEY.format(user_id=user_id))
+        except Exception as e:
+            current_app.logger.warning(f"User cache GET failed for user {user_id}: {e}")
+    if raw:
+        data = _decode(json.loads(raw))
+        _local_put(user_id, data)
+        return CachedUser(data)
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    data = snapshot(user)
+    _store(user_id, data, client)
+    return CachedUser(data, model=user)
+
+
+def snapshot(user):
+    data = {name: getattr(user, name) for name in SNAPSHOT_COLUMNS}
+    data['permissions'] = user.role.permissions if user.role is not None else None
+    return data
+
+
+def invalidate_users(user_ids):
+    """Drops users from this process's cache and from Redis."""
+    if ALL_USERS in user_ids:
+        return invalidate_all_users()
+    with _local_lock:
+        for user_id in user_ids:
+            _local.pop(user_id, None)
+    client = CacheManager.get_client()
+    if client is not None and user_ids:
+        try:
+            client.delete(*(CACHE_KEY.format(user_id=user_id) for user_id in user_ids))
+        except Exception as e:
+            current_app.logger.error(f"User cache invalidation failed for users {sorted(user_ids)}: {e}")
+
+
+def invalidate_all_users():
+    with _local_lock:
+        _local.clear()
+    client = CacheManager.get_client()
+    if client is not None:
+        try:
+            keys = list(client.scan_iter(match=CACHE_KEY.format(user_id='*'), count=1000))
+            if keys:
+                client.delete(*keys)
+        except Exception as e:
+            current_app.logger.error(f"User cache invalidation failed: {e}")
+
+
+def _store(user_id, data, client=None):
+    _local_put(user_id, data)
+    client = client or CacheManager.get_client()
+    if client is None:
+        return
+    try:
+        client.setex(CACHE_KEY.format(user_id=user_id), current_app.config.get('USER_CACHE_TTL', 300),
+                     json.dumps(_encode(data)))
+    except Exception as e:
+        current_app.logger.warning(f"User cache SET failed for user {user_id}: {e}")
+
+
+def _encode(data):
+    return {name: value.isoformat() if name in DATETIME_COLUMNS and value is not None else value
+            for name, value in data.items()}
+
+
+def _decode(data):
+    return {name: datetime.fromisoformat(value) if name in DATETIME_COLUMNS and value is not None else value
+            for name, value in data.items()}
+
+
+def _local_get(user_id):
+    with _local_lock:
+        entry = _local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _local[user_id]
+            return None
+        _local.move_to_end(user_id)
+        return data
+
+
+def _local_put(user_id, data):
+    ttl = current_app.config.get('USER_CACHE_LOCAL_TTL', 10)
+    size = current_app.config.get('USER_CACHE_LOCAL_SIZE', 1024)
+    with _local_lock:
+        _local[user_id] = (time.monotonic() + ttl, data)
+        _local.move_to_end(user_id)
+        while len(_local) > size:
+            _local.popitem(last=False)
+
+
+def _mark_for_invalidation(target, user_id):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, set()).add(user_id)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    _mark_for_invalidation(target, target.id)
+
+
+@event.listens_for(Role, 'after_update')
+@event.listens_for(Role, 'after_delete')
+def _role_changed(mapper, connection, target):
+    _mark_for_invalidation(target, ALL_USERS)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_statement(state):
+    # Bulk UPDATE/DELETE statements skip the mapper events above and do not say which rows
+    # they touched. Pass execution_options={'invalidate_user_cache': False} to opt out.
+    if ((state.is_update or state.is_delete) and state.bind_mapper is User.__mapper__
+            and state.execution_options.get('invalidate_user_cache', True)):
+        state.session.info.setdefault(PENDING_KEY, set()).add(ALL_USERS)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    # Only after the commit, so a concurrent request cannot re-cache the old row in between.
+    user_ids = session.info.pop(PENDING_KEY, None)
+    if user_ids and has_app_context():
+        invalidate_users(user_ids)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
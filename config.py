@@ -10,6 +10,12 @@ class Config:
     SERVER_NAME = os.environ.get('SERVER_NAME')
     POSTHOG_API_KEY = os.environ.get('POSTHOG_API_KEY')
     POSTHOG_HOST = os.environ.get('POSTHOG_HOST', 'https://eu.posthog.com')
+    # 'posthog', 'file' or 'noop'; defaults to 'posthog' when POSTHOG_API_KEY is set, else 'noop'.
+    ANALYTICS_MODE = os.environ.get('ANALYTICS_MODE')
+    ANALYTICS_BUFFER_SIZE = int(os.environ.get('ANALYTICS_BUFFER_SIZE', 10000))
+    ANALYTICS_BATCH_SIZE = int(os.environ.get('ANALYTICS_BATCH_SIZE', 100))
+    ANALYTICS_FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 5))
+    ANALYTICS_FILE_PATH = os.environ.get('ANALYTICS_FILE_PATH', 'logs/analytics.jsonl')
     PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME') or 'http'
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() in ['true', '1', 't']
     SESSION_COOKIE_SAMESITE = 'Lax'
@@ -26,6 +32,12 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     TELEGRAM_BOT_USERNAME = os.environ.get('TELEGRAM_BOT_USERNAME')
     TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
+    TELEGRAM_API_BASE_URL = os.environ.get('TELEGRAM_API_BASE_URL', 'https://api.telegram.org')
+    # Bot API limits: ~30 messages/s overall and 1 message/s per chat, shared by all workers.
+    TELEGRAM_GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', 30))
+    TELEGRAM_CHAT_RATE = float(os.environ.get('TELEGRAM_CHAT_RATE', 1))
+    TELEGRAM_RATE_LIMIT_MAX_WAIT = float(os.environ.get('TELEGRAM_RATE_LIMIT_MAX_WAIT', 5))
+    TELEGRAM_POOL_SIZE = int(os.environ.get('TELEGRAM_POOL_SIZE', 20))
     MAIL_SENDER = os.environ.get('MAIL_SENDER_NAME', 'SmartPrice <smartprice68@gmail.com>')
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL')
     LANGUAGES = ['en', 'ru', 'es', 'zh']
@@ -36,6 +48,91 @@ class Config:
     REDIS_PASSWORD = os.environ.get('REDIS_PASSWORD')
     REDIS_URL = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}/0"
     RATELIMIT_STORAGE_URI = REDIS_URL
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+    SCRAPE_BATCH_SIZE = int(os.environ.get('SCRAPE_BATCH_SIZE', 200))
+    # Due products dispatched per minute at most, and how long a dispatched product is
+    # leased (kept out of later dispatches) before it is considered lost and re-dispatched.
+    SCRAPE_DISPATCH_MAX_PER_RUN = int(os.environ.get('SCRAPE_DISPATCH_MAX_PER_RUN', 5000))
+    SCRAPE_DISPATCH_LEASE = int(os.environ.get('SCRAPE_DISPATCH_LEASE', 900))
+    SCRAPE_FAILURE_RETRY_DELAY = int(os.environ.get('SCRAPE_FAILURE_RETRY_DELAY', 3600))
+    # Store a price history row only when the price changes; unchanged checks extend its last_confirmed_at.
+    PRICE_HISTORY_CHANGE_ONLY = os.environ.get('PRICE_HISTORY_CHANGE_ONLY', 'true').lower() in ['true', '1', 't']
+    PRICE_HISTORY_PARTITIONS_AHEAD = int(os.environ.get('PRICE_HISTORY_PARTITIONS_AHEAD', 3))
+    # Users loaded for current_user are cached in Redis and, briefly, in-process (seconds).
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+    USER_CACHE_LOCAL_TTL = int(os.environ.get('USER_CACHE_LOCAL_TTL', 10))
+    USER_CACHE_LOCAL_SIZE = int(os.environ.get('USER_CACHE_LOCAL_SIZE', 1024))
+    # last_seen is written at most this often (seconds) per user.
+    USER_LAST_SEEN_INTERVAL = int(os.environ.get('USER_LAST_SEEN_INTERVAL', 300))
+    # The logs table is partitioned by month; partitions older than this many full months are dropped.
+    LOG_RETENTION_MONTHS = int(os.environ.get('LOG_RETENTION_MONTHS', 1))
+    LOG_PARTITIONS_AHEAD = int(os.environ.get('LOG_PARTITIONS_AHEAD', 2))
+    # Database log sink: records are buffered in-process and inserted in batches by a background thread.
+    DB_LOG_LEVEL = os.environ.get('DB_LOG_LEVEL', 'INFO')
+    # Per-logger overrides, {logger name: (level, sample rate below WARNING)}; the longest prefix wins.
+    DB_LOG_LOGGERS = {}
+    DB_LOG_BUFFER_SIZE = int(os.environ.get('DB_LOG_BUFFER_SIZE', 10000))
+    DB_LOG_BATCH_SIZE = int(os.environ.get('DB_LOG_BATCH_SIZE', 500))
+    DB_LOG_FLUSH_INTERVAL = float(os.environ.get('DB_LOG_FLUSH_INTERVAL', 2))
+    # Raw price_history is kept this many months, older periods only as daily rollups.
+    PRICE_HISTORY_RAW_RETENTION_MONTHS = int(os.environ.get('PRICE_HISTORY_RAW_RETENTION_MONTHS', 12))
+    # Products tracked longer than this are charted from the daily rollups instead of raw history.
+    PRICE_CHART_ROLLUP_AFTER_DAYS = int(os.environ.get('PRICE_CHART_ROLLUP_AFTER_DAYS', 28))
+    # The price chart is downsampled to at most this many points; the history table is paged.
+    PRICE_CHART_MAX_POINTS = int(os.environ.get('PRICE_CHART_MAX_POINTS', 300))
+    PRICE_HISTORY_PAGE_SIZE = int(os.environ.get('PRICE_HISTORY_PAGE_SIZE', 50))
+    # Alerts are queued per channel in Redis and delivered by workers on the 'notifications' queue.
+    NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 100))
+    NOTIFICATION_DRAIN_MAX_BATCHES = int(os.environ.get('NOTIFICATION_DRAIN_MAX_BATCHES', 50))
+    NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS', 3))
+    NOTIFICATION_IDEMPOTENCY_TTL = int(os.environ.get('NOTIFICATION_IDEMPOTENCY_TTL', 86400))
+    NOTIFICATION_DRAIN_PENDING_TTL = int(os.environ.get('NOTIFICATION_DRAIN_PENDING_TTL', 300))
+    # Digest mode: how long alerts are collected by default, and how many due digests one flush sends.
+    ALERT_DIGEST_WINDOW_MINUTES = int(os.environ.get('ALERT_DIGEST_WINDOW_MINUTES', 60))
+    ALERT_DIGEST_FLUSH_LIMIT = int(os.environ.get('ALERT_DIGEST_FLUSH_LIMIT', 500))
+    # The mail worker sends up to MAIL_BATCH_SIZE queued emails per SMTP connection.
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+    # A throttled batch is requeued for MAIL_THROTTLE_BACKOFF seconds, doubling per throttled batch in a row.
+    MAIL_THROTTLE_BACKOFF = int(os.environ.get('MAIL_THROTTLE_BACKOFF', 5))
+    MAIL_THROTTLE_MAX_BACKOFF = int(os.environ.get('MAIL_THROTTLE_MAX_BACKOFF', 120))
+    # Render alert emails from per-(template, locale) shells instead of running Jinja per message.
+    EMAIL_RENDER_CACHE = os.environ.get('EMAIL_RENDER_CACHE', 'true').lower() in ['true', '1', 't']
+    EMAIL_RENDER_CACHE_SIZE = int(os.environ.get('EMAIL_RENDER_CACHE_SIZE', 512))
+    # Checks per hour across all products (0 = unlimited); adaptive products are slowed down to fit.
+    SCRAPE_HOURLY_BUDGET = int(os.environ.get('SCRAPE_HOURLY_BUDGET', 0))
+    ADAPTIVE_MIN_CHECK_HOURS = int(os.environ.get('ADAPTIVE_MIN_CHECK_HOURS', 1))
+    ADAPTIVE_MAX_CHECK_HOURS = int(os.environ.get('ADAPTIVE_MAX_CHECK_HOURS', 336))
+    SCRAPE_CONCURRENCY = int(os.environ.get('SCRAPE_CONCURRENCY', 100))
+    SCRAPE_PER_DOMAIN_CONCURRENCY = int(os.environ.get('SCRAPE_PER_DOMAIN_CONCURRENCY', 8))
+    SCRAPE_CACHE_TTL = int(os.environ.get('SCRAPE_CACHE_TTL', 3600))
+    SCRAPE_CACHE_TTL_BY_DOMAIN = {
+        'wildberries.ru': int(os.environ.get('SCRAPE_CACHE_TTL_WILDBERRIES', 1800)),
+        'amazon.com': int(os.environ.get('SCRAPE_CACHE_TTL_AMAZON', 3600)),
+        'walmart.com': int(os.environ.get('SCRAPE_CACHE_TTL_WALMART', 3600)),
+        'ebay.com': int(os.environ.get('SCRAPE_CACHE_TTL_EBAY', 3600)),
+    }
+    SCRAPE_ERROR_CACHE_TTL = int(os.environ.get('SCRAPE_ERROR_CACHE_TTL', 300))
+    SCRAPE_LOCK_TIMEOUT = int(os.environ.get('SCRAPE_LOCK_TIMEOUT', 90))
+    # (requests per second, burst), shared by all workers, per marketplace domain or upstream API
+    SCRAPE_RATE_LIMITS = {
+        'domain:wildberries.ru': (float(os.environ.get('RATE_LIMIT_WILDBERRIES', 10)), 20),
+        'api:rainforest': (float(os.environ.get('RATE_LIMIT_RAINFOREST', 5)), 10),
+        'api:rapidapi': (float(os.environ.get('RATE_LIMIT_RAPIDAPI', 5)), 10),
+        'api:ebay_browse': (float(os.environ.get('RATE_LIMIT_EBAY_API', 5)), 10),
+    }
+    SCRAPE_RATE_LIMIT_MAX_WAIT = float(os.environ.get('SCRAPE_RATE_LIMIT_MAX_WAIT', 10))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+    CIRCUIT_FAILURE_WINDOW = int(os.environ.get('CIRCUIT_FAILURE_WINDOW', 60))
+    CIRCUIT_COOLDOWN = int(os.environ.get('CIRCUIT_COOLDOWN', 120))
+    CIRCUIT_PROBE_TIMEOUT = int(os.environ.get('CIRCUIT_PROBE_TIMEOUT', 30))
+    BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', 2))
+    BROWSER_POOL_MAX_PAGES = int(os.environ.get('BROWSER_POOL_MAX_PAGES', 4))
+    BROWSER_MAX_PAGES_PER_BROWSER = int(os.environ.get('BROWSER_MAX_PAGES_PER_BROWSER', 50))
+    BROWSER_MAX_RSS_MB = int(os.environ.get('BROWSER_MAX_RSS_MB', 1500))
+    BROWSER_PAGE_TIMEOUT = int(os.environ.get('BROWSER_PAGE_TIMEOUT', 60))
+    BROWSER_RSS_CHECK_INTERVAL = int(os.environ.get('BROWSER_RSS_CHECK_INTERVAL', 30))
+    # Longest a sync caller (Celery task, bot handler) waits on the worker event loop.
+    WORKER_LOOP_TIMEOUT = int(os.environ.get('WORKER_LOOP_TIMEOUT', 300))
 
 
     @staticmethod
@@ -56,10 +153,31 @@ class DevelopmentConfig(Config):
         'task_serializer': 'json',
         'accept_content': ['json'],
         'result_serializer': 'json',
+        'task_routes': {
+            'app.tasks.drain_notifications': {'queue': 'notifications'},
+            'app.tasks.drain_email_queue': {'queue': 'notifications'},
+            'app.tasks.flush_alert_digests': {'queue': 'notifications'},
+        },
         'beat_schedule': {
-            'schedule-price-checks': {
-                'task': 'app.tasks.schedule_price_checks',
-                'schedule': 3600.0,
+            'dispatch-due-price-checks': {
+                'task': 'app.tasks.dispatch_due_price_checks',
+                'schedule': 60.0,
+            },
+            'maintain-price-history-partitions-daily': {
+                'task': 'app.tasks.maintain_price_history_partitions',
+                'schedule': 86400.0,
+            },
+            'maintain-log-partitions-daily': {
+                'task': 'app.tasks.maintain_log_partitions',
+                'schedule': 86400.0,
+            },
+            'drain-notification-queues': {
+                'task': 'app.tasks.drain_notification_queues',
+                'schedule': 60.0,
+            },
+            'flush-alert-digests': {
+                'task': 'app.tasks.flush_alert_digests',
+                'schedule': 60.0,
             }
         },
     }
@@ -79,10 +197,31 @@ class ProductionConfig(DevelopmentConfig):
         'task_serializer': 'json',
         'accept_content': ['json'],
         'result_serializer': 'json',
+        'task_routes': {
+            'app.tasks.drain_notifications': {'queue': 'notifications'},
+            'app.tasks.drain_email_queue': {'queue': 'notifications'},
+            'app.tasks.flush_alert_digests': {'queue': 'notifications'},
+        },
         'beat_schedule': {
-            'schedule-price-checks': {
-                'task': 'app.tasks.schedule_price_checks',
-                'schedule': 3600.0,
+            'dispatch-due-price-checks': {
+                'task': 'app.tasks.dispatch_due_price_checks',
+                'schedule': 60.0,
+            },
+            'maintain-price-history-partitions-daily': {
+                'task': 'app.tasks.maintain_price_history_partitions',
+                'schedule': 86400.0,
+            },
+            'maintain-log-partitions-daily': {
+                'task': 'app.tasks.maintain_log_partitions',
+                'schedule': 86400.0,
+            },
+            'drain-notification-queues': {
+                'task': 'app.tasks.drain_notification_queues',
+                'schedule': 60.0,
+            },
+            'flush-alert-digests': {
+                'task': 'app.tasks.flush_alert_digests',
+                'schedule': 60.0,
             },
             'cleanup-unconfirmed-users-daily': {
                 'task': 'app.tasks.cleanup_unconfirmed_users',
@@ -102,10 +241,31 @@ class DockerConfig(Config):
         'task_serializer': 'json',
         'accept_content': ['json'],
         'result_serializer': 'json',
+        'task_routes': {
+            'app.tasks.drain_notifications': {'queue': 'notifications'},
+            'app.tasks.drain_email_queue': {'queue': 'notifications'},
+            'app.tasks.flush_alert_digests': {'queue': 'notifications'},
+        },
         'beat_schedule': {
-            'schedule-price-checks': {
-                'task': 'app.tasks.schedule_price_checks',
-                'schedule': 3600.0,
+            'dispatch-due-price-checks': {
+                'task': 'app.tasks.dispatch_due_price_checks',
+                'schedule': 60.0,
+            },
+            'maintain-price-history-partitions-daily': {
+                'task': 'app.tasks.maintain_price_history_partitions',
+                'schedule': 86400.0,
+            },
+            'maintain-log-partitions-daily': {
+                'task': 'app.tasks.maintain_log_partitions',
+                'schedule': 86400.0,
+            },
+            'drain-notification-queues': {
+                'task': 'app.tasks.drain_notification_queues',
+                'schedule': 60.0,
+            },
+            'flush-alert-digests': {
+                'task': 'app.tasks.flush_alert_digests',
+                'schedule': 60.0,
             }
         },
     }
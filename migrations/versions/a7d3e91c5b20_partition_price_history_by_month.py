@@ -0,0 +1,122 @@
+"""Partition price_history by month and add price_history_daily
+
+Revision ID: a7d3e91c5b20
+Revises: f5b07e3d9a41
+Create Date: 2026-10-18 13:20:44.913852
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e91c5b20'
+down_revision = 'f5b07e3d9a41'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    op.execute("UPDATE price_history SET timestamp = now() AT TIME ZONE 'utc' WHERE timestamp IS NULL")
+
+    # Keep the old table (and its id sequence) around until its rows have been copied.
+    op.execute("ALTER TABLE price_history RENAME TO price_history_unpartitioned")
+    op.execute("ALTER INDEX price_history_pkey RENAME TO price_history_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_price_history_product_id RENAME TO ix_price_history_unpartitioned_product_id")
+    op.execute("ALTER INDEX ix_price_history_listing_id RENAME TO ix_price_history_unpartitioned_listing_id")
+    op.execute("ALTER INDEX ix_price_history_timestamp RENAME TO ix_price_history_unpartitioned_timestamp")
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE price_history (
+            id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq'),
+            product_id INTEGER REFERENCES products (id),
+            listing_id INTEGER REFERENCES listings (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            price NUMERIC(10, 2) NOT NULL,
+            last_confirmed_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("CREATE INDEX ix_price_history_product_id ON price_history (product_id)")
+    op.execute("CREATE INDEX ix_price_history_listing_id ON price_history (listing_id)")
+    op.execute("CREATE INDEX ix_price_history_timestamp ON price_history (timestamp)")
+
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM price_history_unpartitioned")).scalar()
+    now = datetime.utcnow()
+    month = date((oldest or now).year, (oldest or now).month, 1)
+    last_month = _add_months(date(now.year, now.month, 1), PARTITIONS_AHEAD)
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE price_history_p{month:%Y_%m} PARTITION OF price_history "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    # Catches rows outside every monthly range (clock skew, maintenance not running) instead of
+    # failing the insert; maintain_price_history_partitions moves them into their own partition.
+    op.execute("CREATE TABLE price_history_default PARTITION OF price_history DEFAULT")
+
+    op.execute("""
+        INSERT INTO price_history (id, product_id, listing_id, timestamp, price, last_confirmed_at)
+        SELECT id, product_id, listing_id, timestamp, price, last_confirmed_at FROM price_history_unpartitioned
+    """)
+    op.execute("DROP TABLE price_history_unpartitioned")
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id")
+
+    op.create_table('price_history_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=True),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('open_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('close_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('min_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('max_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('listing_id', 'day', name='uq_price_history_daily_listing_day'),
+    sa.UniqueConstraint('product_id', 'day', name='uq_price_history_daily_product_day')
+    )
+    with op.batch_alter_table('price_history_daily', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_price_history_daily_day'), ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('price_history_daily', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_price_history_daily_day'))
+    op.drop_table('price_history_daily')
+
+    op.execute("ALTER TABLE price_history RENAME TO price_history_partitioned")
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE price_history_plain (
+            id INTEGER NOT NULL DEFAULT nextval('price_history_id_seq') PRIMARY KEY,
+            product_id INTEGER REFERENCES products (id),
+            listing_id INTEGER REFERENCES listings (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            price NUMERIC(10, 2) NOT NULL,
+            last_confirmed_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+    op.execute("""
+        INSERT INTO price_history_plain (id, product_id, listing_id, timestamp, price, last_confirmed_at)
+        SELECT id, product_id, listing_id, timestamp, price, last_confirmed_at FROM price_history_partitioned
+    """)
+    op.execute("DROP TABLE price_history_partitioned")
+    op.execute("ALTER TABLE price_history_plain RENAME TO price_history")
+    op.execute("ALTER INDEX price_history_plain_pkey RENAME TO price_history_pkey")
+    op.execute("ALTER SEQUENCE price_history_id_seq OWNED BY price_history.id")
+    op.execute("CREATE INDEX ix_price_history_product_id ON price_history (product_id)")
+    op.execute("CREATE INDEX ix_price_history_listing_id ON price_history (listing_id)")
+    op.execute("CREATE INDEX ix_price_history_timestamp ON price_history (timestamp)")
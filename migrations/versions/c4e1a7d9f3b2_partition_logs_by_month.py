@@ -0,0 +1,98 @@
+"""Partition logs by month
+
+Revision ID: c4e1a7d9f3b2
+Revises: b6c2d8e4f1a9
+Create Date: 2026-10-18 17:42:31.506218
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1a7d9f3b2'
+down_revision = 'b6c2d8e4f1a9'
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 2
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade():
+    op.execute("ALTER TABLE logs RENAME TO logs_unpartitioned")
+    op.execute("ALTER INDEX logs_pkey RENAME TO logs_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_logs_level RENAME TO ix_logs_unpartitioned_level")
+    op.execute("ALTER INDEX ix_logs_timestamp RENAME TO ix_logs_unpartitioned_timestamp")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE logs (
+            id INTEGER NOT NULL DEFAULT nextval('logs_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            level VARCHAR(50),
+            message TEXT,
+            module VARCHAR(100),
+            func_name VARCHAR(100),
+            ip_address VARCHAR(45),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("CREATE INDEX ix_logs_level ON logs (level)")
+    op.execute("CREATE INDEX ix_logs_timestamp ON logs (timestamp)")
+
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM logs_unpartitioned")).scalar()
+    now = datetime.utcnow()
+    month = date((oldest or now).year, (oldest or now).month, 1)
+    last_month = _add_months(date(now.year, now.month, 1), PARTITIONS_AHEAD)
+    while month <= last_month:
+        op.execute(
+            f"CREATE TABLE logs_p{month:%Y_%m} PARTITION OF logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    # Catches rows outside every monthly range instead of failing the insert;
+    # maintain_log_partitions moves them into their own partition.
+    op.execute("CREATE TABLE logs_default PARTITION OF logs DEFAULT")
+
+    # Every row is copied (rows without a timestamp are stamped now); maintain_log_partitions
+    # applies LOG_RETENTION_MONTHS afterwards by dropping whole partitions.
+    op.execute("""
+        INSERT INTO logs (id, timestamp, level, message, module, func_name, ip_address)
+        SELECT id, coalesce(timestamp, now() AT TIME ZONE 'utc'), level, message, module, func_name, ip_address
+        FROM logs_unpartitioned
+    """)
+    op.execute("DROP TABLE logs_unpartitioned")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+
+
+def downgrade():
+    op.execute("ALTER TABLE logs RENAME TO logs_partitioned")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE logs_plain (
+            id INTEGER NOT NULL DEFAULT nextval('logs_id_seq') PRIMARY KEY,
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            level VARCHAR(50),
+            message TEXT,
+            module VARCHAR(100),
+            func_name VARCHAR(100),
+            ip_address VARCHAR(45)
+        )
+    """)
+    op.execute("""
+        INSERT INTO logs_plain (id, timestamp, level, message, module, func_name, ip_address)
+        SELECT id, timestamp, level, message, module, func_name, ip_address FROM logs_partitioned
+    """)
+    op.execute("DROP TABLE logs_partitioned")
+    op.execute("ALTER TABLE logs_plain RENAME TO logs")
+    op.execute("ALTER INDEX logs_plain_pkey RENAME TO logs_pkey")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute("CREATE INDEX ix_logs_level ON logs (level)")
+    op.execute("CREATE INDEX ix_logs_timestamp ON logs (timestamp)")
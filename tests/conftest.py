@@ -0,0 +1,44 @@
+import os
+
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ.setdefault('SECURITY_PASSWORD_SALT', 'test-salt')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('DB_LOG_LEVEL', 'CRITICAL')
+
+import fakeredis
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app('development')
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def scraper_redis(monkeypatch):
+    """Points the scraper's async Redis client (cache, locks, limits, breakers) at one fake server."""
+    from fakeredis import aioredis
+    from app.utils import scrapers
+
+    server = fakeredis.FakeServer()
+
+    async def get_redis_connection():
+        return aioredis.FakeRedis(server=server)
+
+    monkeypatch.setattr(scrapers, 'get_redis_connection', get_redis_connection)
+    return server
@@ -0,0 +1,71 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.tasks import collect_alert_types, evaluate_alerts
+
+
+def make_product(notified=False, drop_threshold=None, increase_threshold=None):
+    return SimpleNamespace(target_price_notified=notified, price_drop_alert_threshold=drop_threshold,
+                           price_increase_alert_threshold=increase_threshold)
+
+
+def make_user(target=True, drop=True):
+    return SimpleNamespace(enable_target_price_reached_notifications=target, enable_price_drop_notifications=drop)
+
+
+def test_reaching_the_target_alerts_and_marks_the_product_notified():
+    product = make_product()
+
+    alert_types = collect_alert_types(product, make_user(), Decimal('120'), Decimal('95'), Decimal('100'))
+
+    assert alert_types == ['target_reached']
+    assert product.target_price_notified is True
+
+
+def test_alerts_can_be_collected_without_marking_the_product_notified():
+    product = make_product()
+
+    alert_types = collect_alert_types(product, make_user(), Decimal('120'), Decimal('95'), Decimal('100'),
+                                      mark_notified=False)
+
+    assert alert_types == ['target_reached']
+    assert product.target_price_notified is False
+
+
+@pytest.mark.parametrize('mark_notified', [True, False])
+def test_rising_back_above_the_target_always_resets_the_notified_flag(mark_notified):
+    product = make_product(notified=True)
+
+    alert_types = collect_alert_types(product, make_user(), Decimal('95'), Decimal('105'), Decimal('100'),
+                                      mark_notified=mark_notified)
+
+    assert alert_types == []
+    assert product.target_price_notified is False
+
+
+@pytest.mark.parametrize('old_price, new_price, product, user, expected', [
+    (Decimal('120'), Decimal('110'), make_product(), make_user(), ['price_drop']),
+    (Decimal('120'), Decimal('115'), make_product(drop_threshold=Decimal('10')), make_user(), []),
+    (Decimal('120'), Decimal('110'), make_product(drop_threshold=Decimal('10')), make_user(), ['price_drop']),
+    (Decimal('120'), Decimal('110'), make_product(), make_user(drop=False), []),
+    (None, Decimal('110'), make_product(), make_user(), []),
+    (Decimal('110'), Decimal('125'), make_product(increase_threshold=Decimal('10')), make_user(), ['price_increase']),
+    (Decimal('110'), Decimal('115'), make_product(increase_threshold=Decimal('10')), make_user(), []),
+    (Decimal('110'), Decimal('125'), make_product(), make_user(), []),
+    (Decimal('120'), Decimal('90'), make_product(), make_user(target=False), ['price_drop']),
+])
+def test_evaluate_alerts(old_price, new_price, product, user, expected):
+    alert_types, notified = evaluate_alerts(product, user, old_price, new_price, Decimal('100'))
+
+    assert alert_types == expected
+    assert notified is False
+
+
+def test_evaluate_alerts_leaves_the_product_untouched():
+    product = make_product(notified=True)
+
+    assert evaluate_alerts(product, make_user(), Decimal('90'), Decimal('95'), Decimal('100')) == (['target_reached'], True)
+    assert evaluate_alerts(product, make_user(), Decimal('95'), Decimal('130'), Decimal('100')) == ([], False)
+    assert product.target_price_notified is True
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.utils.analytics import AnalyticsSink
+
+
+@pytest.fixture
+def posthog():
+    """A local stand-in for PostHog's /batch/ endpoint; set `status` to make it fail."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            received.append((self.path, body))
+            self.send_response(server.status)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.status = 200
+    server.received = received
+    server.url = f'http://127.0.0.1:{server.server_address[1]}'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_events_are_sent_to_posthog_in_batches(posthog):
+    sink = AnalyticsSink(mode='posthog', api_key='key', host=posthog.url + '/', batch_size=2, flush_interval=60)
+
+    for n in range(5):
+        sink.capture(n, 'price_alert_triggered', {'product_id': n})
+    sink.flush()
+    wait_for(lambda: sink.stats['written'] == 5)
+
+    assert {path for path, body in posthog.received} == {'/batch/'}
+    assert all(body['api_key'] == 'key' and len(body['batch']) <= 2 for path, body in posthog.received)
+    events = sorted((event for path, body in posthog.received for event in body['batch']),
+                    key=lambda event: event['distinct_id'])
+    assert [(event['distinct_id'], event['event'], event['properties']) for event in events] == [
+        (str(n), 'price_alert_triggered', {'product_id': n}) for n in range(5)]
+
+
+def test_full_buffer_and_failed_batches_are_dropped_and_counted(posthog):
+    posthog.status = 503
+    sink = AnalyticsSink(mode='posthog', api_key='key', host=posthog.url, capacity=3, batch_size=100,
+                         flush_interval=60)
+
+    for n in range(5):
+        sink.capture(n, 'login')
+    sink.flush()
+
+    assert sink.stats == {'buffered': 3, 'written': 0, 'dropped_overflow': 2, 'dropped_failed': 3}
+
+
+def test_file_mode_writes_json_lines(tmp_path):
+    path = tmp_path / 'analytics.jsonl'
+    sink = AnalyticsSink(mode='file', file_path=str(path), flush_interval=60)
+
+    sink.capture(1, 'signup')
+    sink.capture(2, 'login', {'method': 'password'})
+    sink.flush()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line['distinct_id'], line['event'], line['properties']) for line in lines] == [
+        ('1', 'signup', {}), ('2', 'login', {'method': 'password'})]
+
+
+def test_noop_mode_buffers_nothing():
+    sink = AnalyticsSink(mode='noop')
+
+    sink.capture(1, 'signup')
+
+    assert sink.stats['buffered'] == 0
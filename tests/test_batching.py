@@ -0,0 +1,106 @@
+import logging
+import sqlite3
+import threading
+
+import pytest
+
+from app.logging_config import BufferedDbLogHandler
+from app.utils.batching import BackgroundBatcher
+
+
+def test_flush_writes_in_batches_of_batch_size():
+    written = []
+    batcher = BackgroundBatcher(written.append, batch_size=2, flush_interval=60)
+    batcher._ensure_thread = lambda: None  # keep the flush on this thread
+
+    for n in range(5):
+        assert batcher.put(n)
+    batcher.flush()
+
+    assert written == [[0, 1], [2, 3], [4]]
+    assert batcher.stats == {'buffered': 5, 'written': 5, 'dropped_overflow': 0, 'dropped_failed': 0}
+
+
+def test_full_buffer_drops_and_counts_new_items():
+    written = []
+    batcher = BackgroundBatcher(written.append, capacity=3, batch_size=10, flush_interval=60)
+    batcher._ensure_thread = lambda: None
+
+    assert [batcher.put(n) for n in range(5)] == [True, True, True, False, False]
+    batcher.flush()
+
+    assert written == [[0, 1, 2]]
+    assert batcher.stats['dropped_overflow'] == 2
+
+
+def test_failed_batch_is_dropped_counted_and_reported():
+    failures = []
+
+    def write(batch):
+        if 'bad' in batch:
+            raise IOError('disk full')
+
+    batcher = BackgroundBatcher(write, batch_size=2, flush_interval=60,
+                                on_failure=lambda batch, error: failures.append((batch, str(error))))
+    batcher._ensure_thread = lambda: None
+
+    for item in ('a', 'bad', 'c'):
+        batcher.put(item)
+    batcher.flush()
+
+    assert failures == [(['a', 'bad'], 'disk full')]
+    assert batcher.stats['written'] == 1 and batcher.stats['dropped_failed'] == 2
+
+
+def test_a_full_batch_wakes_the_writer_thread():
+    done = threading.Event()
+    written = []
+    starts = []
+
+    def write(batch):
+        written.append(batch)
+        done.set()
+
+    batcher = BackgroundBatcher(write, batch_size=3, flush_interval=60, on_start=lambda: starts.append(1))
+
+    for n in range(3):
+        batcher.put(n)
+
+    assert done.wait(5)
+    assert written == [[0, 1, 2]]
+    assert starts == [1]
+
+
+@pytest.fixture
+def log_database(tmp_path):
+    path = tmp_path / 'logs.db'
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE logs (id INTEGER, timestamp DATETIME, level VARCHAR(50), message TEXT, "
+                           "module VARCHAR(100), func_name VARCHAR(100), ip_address VARCHAR(45))")
+    return path
+
+
+def log_rows(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT level, message, ip_address FROM logs ORDER BY rowid").fetchall()
+
+
+def test_db_log_handler_applies_logger_levels_and_writes_on_flush(log_database):
+    handler = BufferedDbLogHandler(f'sqlite:///{log_database}', level=logging.INFO, flush_interval=60,
+                                   logger_levels={'parser': ('WARNING', 1.0), 'app.tasks': ('DEBUG', 0.0)})
+    handler._batcher._ensure_thread = lambda: None
+
+    def log(name, level, message):
+        handler.handle(logging.LogRecord(name, level, __file__, 1, message, None, None))
+
+    log('app.routes', logging.DEBUG, 'below the default level')
+    log('app.routes', logging.INFO, 'kept')
+    log('parser.ebay', logging.INFO, 'below the parser level')
+    log('parser.ebay', logging.ERROR, 'parser error')
+    log('app.tasks.digest', logging.INFO, 'sampled out')
+    log('app.tasks.digest', logging.WARNING, 'warnings are never sampled')
+    handler.flush()
+
+    assert log_rows(log_database) == [('INFO', 'kept', 'no-request'), ('ERROR', 'parser error', 'no-request'),
+                                      ('WARNING', 'warnings are never sampled', 'no-request')]
+    assert handler.stats['sampled_out'] == 1 and handler.stats['written'] == 3
@@ -0,0 +1,22 @@
+import asyncio
+
+from app.utils import browser_pool
+from app.utils.browser_pool import BrowserPool, _PooledBrowser
+
+
+def test_memory_is_sampled_at_most_once_per_interval(monkeypatch):
+    sampled = []
+    monkeypatch.setattr(browser_pool, '_process_tree_rss_mb', lambda pid: sampled.append(pid) or 0.0)
+    pool = BrowserPool(rss_check_interval=30)
+    entry = _PooledBrowser(browser=None)
+    entry.active_pages = 3
+    pool._browsers = [entry]
+
+    async def release_pages():
+        for _ in range(3):
+            await pool._release(entry)
+
+    asyncio.run(release_pages())
+
+    assert len(sampled) == 1
+    assert entry.pages_served == 3 and not entry.retired
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import tasks
+from app.extensions import db
+from app.models import Product
+
+
+@pytest.fixture
+def products(app_context, monkeypatch):
+    # Only the columns the dispatcher reads and writes; the full table needs Postgres ARRAY types.
+    db.session.execute(text("CREATE TABLE products (id INTEGER PRIMARY KEY, next_check_at DATETIME NOT NULL, "
+                            "dispatched_at DATETIME)"))
+    db.session.commit()
+    dispatched = []
+    monkeypatch.setattr(tasks.check_prices_batch, 'delay', dispatched.append)
+    monkeypatch.setitem(app_context.config, 'SCRAPE_HOURLY_BUDGET', 0)
+    yield dispatched
+    db.session.rollback()
+    db.session.execute(text("DROP TABLE products"))
+    db.session.commit()
+
+
+def add_products(next_checks):
+    db.session.execute(text("INSERT INTO products (id, next_check_at) VALUES (:id, :next_check_at)"),
+                       [{'id': product_id, 'next_check_at': at} for product_id, at in next_checks.items()])
+    db.session.commit()
+
+
+def test_due_products_are_dispatched_in_chunks_and_leased(products, app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'SCRAPE_BATCH_SIZE', 2)
+    monkeypatch.setitem(app_context.config, 'SCRAPE_DISPATCH_LEASE', 600)
+    now = datetime.utcnow()
+    add_products({1: now - timedelta(hours=2), 2: now - timedelta(minutes=5), 3: now - timedelta(hours=1),
+                  4: now + timedelta(hours=1)})
+
+    tasks.dispatch_due_price_checks()
+
+    assert products == [[1, 3], [2]]
+    leased = dict(db.session.query(Product.id, Product.next_check_at))
+    assert all(now + timedelta(seconds=590) < leased[product_id] < now + timedelta(seconds=610)
+               for product_id in (1, 2, 3))
+    assert leased[4] < now + timedelta(hours=1, seconds=1)
+    assert db.session.query(Product.dispatched_at).filter(Product.id == 4).scalar() is None
+
+    products.clear()
+    tasks.dispatch_due_price_checks()
+    assert products == []
+
+
+def test_dispatch_stops_at_the_per_run_cap(products, app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'SCRAPE_BATCH_SIZE', 2)
+    monkeypatch.setitem(app_context.config, 'SCRAPE_DISPATCH_MAX_PER_RUN', 3)
+    now = datetime.utcnow()
+    add_products({product_id: now - timedelta(minutes=product_id) for product_id in range(1, 6)})
+
+    tasks.dispatch_due_price_checks()
+
+    assert products == [[5, 4], [3]]
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from app.utils import scrapers
+from app.utils.scrapers import EbayParser
+
+
+class EbayStub:
+    """A local stand-in for the token, getItems and single-item Browse API endpoints."""
+
+    def __init__(self, items, get_items_responses=()):
+        self.items = items
+        self.get_items_responses = list(get_items_responses)
+        self.requests = []
+        self.minted = 0
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/identity/v1/oauth2/token', self.token)
+        app.router.add_get('/buy/browse/v1/item/', self.get_items)
+        app.router.add_get('/buy/browse/v1/item/get_item_by_legacy_id', self.get_item)
+        return app
+
+    async def token(self, request):
+        self.minted += 1
+        return web.json_response({'access_token': f'token-{self.minted}', 'expires_in': 7200})
+
+    async def get_items(self, request):
+        self.requests.append(('getItems', request.query['item_ids'], request.headers['Authorization']))
+        if self.get_items_responses:
+            status, headers = self.get_items_responses.pop(0)
+            return web.json_response({'errors': []}, status=status, headers=headers)
+        wanted = [item_id.split('|')[1] for item_id in request.query['item_ids'].split(',')]
+        return web.json_response({'items': [
+            {'itemId': f'v1|{item_id}|0', 'title': f'Item {item_id}', 'price': {'value': str(self.items[item_id])}}
+            for item_id in wanted if item_id in self.items
+        ]})
+
+    async def get_item(self, request):
+        item_id = request.query['legacy_item_id']
+        self.requests.append(('getItem', item_id, request.headers['Authorization']))
+        return web.json_response({'title': f'Single {item_id}', 'price': {'value': '9.99'}})
+
+
+@pytest.fixture
+def ebay_env(app_context, scraper_redis, monkeypatch):
+    monkeypatch.setenv('EBAY_CLIENT_ID', 'client')
+    monkeypatch.setenv('EBAY_CLIENT_SECRET', 'secret')
+    monkeypatch.setitem(scrapers._ebay_token, 'access_token', None)
+    monkeypatch.setitem(scrapers._ebay_token, 'expires_at', 0.0)
+    monkeypatch.setitem(app_context.config, 'SCRAPE_RATE_LIMITS', {})
+    return monkeypatch
+
+
+def run_against(stub, monkeypatch, urls):
+    async def main():
+        runner = web.AppRunner(stub.app())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        monkeypatch.setattr(scrapers, 'EBAY_API_BASE_URL', f'http://127.0.0.1:{port}')
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await EbayParser.parse_batch(urls, session)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def item_url(item_id):
+    return f'https://www.ebay.com/itm/{item_id}'
+
+
+def test_get_items_hit_resolves_batch_in_one_call(ebay_env):
+    stub = EbayStub({'101': 10.5, '102': 20.0, '103': 30.25})
+
+    results = run_against(stub, ebay_env, [item_url(i) for i in ('101', '102', '103')])
+
+    assert results == {
+        item_url('101'): ({'name': 'Item 101', 'price': 10.5}, False),
+        item_url('102'): ({'name': 'Item 102', 'price': 20.0}, False),
+        item_url('103'): ({'name': 'Item 103', 'price': 30.25}, False),
+    }
+    assert [request[0] for request in stub.requests] == ['getItems']
+    assert stub.requests[0][1] == 'v1|101|0,v1|102|0,v1|103|0'
+
+
+def test_partial_misses_are_looked_up_one_by_one_behind_the_limiter(ebay_env, app_context):
+    ebay_env.setitem(app_context.config, 'SCRAPE_RATE_LIMITS', {'api:ebay_browse': (0.01, 1)})
+    ebay_env.setitem(app_context.config, 'SCRAPE_RATE_LIMIT_MAX_WAIT', 0)
+    stub = EbayStub({'101': 10.5})
+
+    results = run_against(stub, ebay_env, [item_url(i) for i in ('101', '102', '103')])
+
+    assert results[item_url('101')] == ({'name': 'Item 101', 'price': 10.5}, False)
+    single = [request for request in stub.requests if request[0] == 'getItem']
+    assert len(single) == 1
+    looked_up = item_url(single[0][1])
+    assert results[looked_up] == ({'name': f'Single {single[0][1]}', 'price': 9.99}, False)
+    (deferred, has_error), = [results[url] for url in (item_url('102'), item_url('103')) if url != looked_up]
+    assert has_error and deferred['deferred'] and deferred['error'] == 'rate_limited'
+
+
+@pytest.mark.parametrize('status, headers, retry_after', [
+    (429, {'Retry-After': '30'}, 30),
+    (503, {}, scrapers.EBAY_DEFAULT_RETRY_AFTER),
+])
+def test_failed_bulk_call_defers_the_whole_batch(ebay_env, status, headers, retry_after):
+    stub = EbayStub({'101': 10.5, '102': 20.0}, get_items_responses=[(status, headers)])
+
+    results = run_against(stub, ebay_env, [item_url('101'), item_url('102')])
+
+    assert [request[0] for request in stub.requests] == ['getItems']
+    for data, has_error in results.values():
+        assert has_error
+        assert data['deferred'] and data['error'] == f'ebay_api_error_{status}'
+        assert data['status'] == status and data['retry_after'] == retry_after
+        assert scrapers.is_upstream_failure({**data, 'success': False})
+
+
+def test_rejected_token_is_refreshed_and_the_call_retried(ebay_env):
+    ebay_env.setitem(scrapers._ebay_token, 'access_token', 'revoked')
+    ebay_env.setitem(scrapers._ebay_token, 'expires_at', time.time() + 3600)
+    stub = EbayStub({'101': 10.5}, get_items_responses=[(401, {})])
+
+    results = run_against(stub, ebay_env, [item_url('101'), item_url('101') + '?hash=x'])
+
+    assert results[item_url('101')] == ({'name': 'Item 101', 'price': 10.5}, False)
+    assert results[item_url('101') + '?hash=x'] == ({'name': 'Item 101', 'price': 10.5}, False)
+    assert stub.minted == 1
+    assert [request[2] for request in stub.requests] == ['Bearer revoked', 'Bearer token-1']
+
+
+def test_expiring_token_is_replaced_before_the_call(ebay_env):
+    ebay_env.setitem(scrapers._ebay_token, 'access_token', 'about-to-expire')
+    ebay_env.setitem(scrapers._ebay_token, 'expires_at', time.time() + 60)
+    stub = EbayStub({'101': 10.5})
+
+    run_against(stub, ebay_env, [item_url('101')])
+
+    assert stub.minted == 1
+    assert [request[2] for request in stub.requests] == ['Bearer token-1']
+
+
+@pytest.fixture
+def minted(ebay_env):
+    calls = []
+
+    async def mint(session=None):
+        calls.append(session)
+        await asyncio.sleep(0.01)
+        return f'minted-{len(calls)}', 7200
+
+    ebay_env.setattr(scrapers, '_mint_ebay_oauth_token', mint)
+    return calls
+
+
+def test_concurrent_callers_share_one_minted_token(minted):
+    async def main():
+        return await asyncio.gather(*(scrapers.get_ebay_oauth_token() for _ in range(5)))
+
+    assert asyncio.run(main()) == ['minted-1'] * 5
+    assert len(minted) == 1
+
+
+def test_token_minted_by_another_worker_is_read_from_redis(minted, ebay_env):
+    asyncio.run(scrapers.get_ebay_oauth_token())
+    # A fresh process starts with an empty in-process cache.
+    ebay_env.setitem(scrapers._ebay_token, 'access_token', None)
+    ebay_env.setitem(scrapers._ebay_token, 'expires_at', 0.0)
+
+    assert asyncio.run(scrapers.get_ebay_oauth_token()) == 'minted-1'
+    assert len(minted) == 1
+
+
+def test_old_token_is_used_while_another_worker_refreshes(minted):
+    async def main():
+        r = await scrapers.get_redis_connection()
+        await r.setex(scrapers.EBAY_TOKEN_CACHE_KEY, 120, json.dumps(
+            {'access_token': 'old', 'expires_at': time.time() + 120}))
+        await r.set(scrapers.EBAY_TOKEN_LOCK_KEY, 'other-worker')
+        return await scrapers.get_ebay_oauth_token()
+
+    assert asyncio.run(main()) == 'old'
+    assert minted == []
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+import pytest
+
+from app.utils.helpers import keyset_cursor, lttb, parse_keyset_cursor
+
+
+def test_lttb_carries_extra_fields_above_threshold():
+    points = [(x, float(x % 7), f"t{x}") for x in range(1000)]
+
+    sampled = lttb(points, 200)
+
+    assert len(sampled) == 200
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert all(len(point) == 3 and point in points for point in sampled)
+    assert [point[0] for point in sampled] == sorted(point[0] for point in sampled)
+
+
+def test_lttb_returns_short_series_unchanged():
+    points = [(x, float(x), x) for x in range(50)]
+
+    assert lttb(points, 200) == points
+
+
+@pytest.mark.parametrize('timestamp', [datetime(2026, 3, 1, 12, 5, 9), datetime(2026, 3, 1, 12, 5, 9, 123456)])
+def test_keyset_cursor_round_trips(timestamp):
+    assert parse_keyset_cursor(keyset_cursor(timestamp, 9876)) == (timestamp, 9876)
+
+
+@pytest.mark.parametrize('value', [None, '', 'garbage', '2026-03-01T12:05:09', '2026-03-01T12:05:09_x', 'nope_12'])
+def test_malformed_keyset_cursor_is_ignored(value):
+    assert parse_keyset_cursor(value) is None
@@ -0,0 +1,42 @@
+import pytest
+
+from app.extensions import db
+from app.models import Listing
+from app.utils.scrapers import canonicalize_url
+
+
+@pytest.mark.parametrize('url, canonical', [
+    ('https://www.ebay.com/itm/Some-Title/256966053660?_trksid=p123&hash=abc', 'https://ebay.com/itm/256966053660'),
+    ('http://m.ebay.com/itm/256966053660#photos', 'https://ebay.com/itm/256966053660'),
+    ('https://smile.amazon.com/Widget/dp/B00TEST123/ref=sr_1_1?qid=1', 'https://amazon.com/dp/B00TEST123'),
+    ('https://www.wildberries.ru/catalog/12345678/detail.aspx?targetUrl=GP', 'https://wildberries.ru/catalog/12345678/detail.aspx'),
+    ('https://www.walmart.com/ip/Cool-Thing/55512?from=/search', 'https://walmart.com/ip/55512'),
+    ('https://Shop.Example:8443/p/42/?utm_source=x&color=red&size=m&fbclid=y', 'https://shop.example/p/42?color=red&size=m'),
+    ('https://shop.example/p/42?size=m&color=red', 'https://shop.example/p/42?color=red&size=m'),
+    ('mock://price_drop', 'mock://price_drop'),
+])
+def test_canonicalize_url(url, canonical):
+    assert canonicalize_url(url) == canonical
+
+
+@pytest.fixture
+def listings(app_context):
+    Listing.__table__.create(db.engine)
+    yield
+    db.session.rollback()
+    Listing.__table__.drop(db.engine)
+
+
+def test_urls_of_the_same_item_share_one_listing(listings):
+    listing = Listing.get_or_create('https://www.ebay.com/itm/Title/256966053660?hash=1', name='Lamp')
+    db.session.commit()
+
+    same = Listing.get_or_create('https://ebay.com/itm/256966053660?_trksid=2')
+    other = Listing.get_or_create('https://ebay.com/itm/256966053661')
+    db.session.commit()
+
+    assert same.id == listing.id
+    assert other.id != listing.id
+    assert listing.canonical_url == 'https://ebay.com/itm/256966053660'
+    assert listing.domain == 'ebay.com' and listing.name == 'Lamp'
+    assert Listing.query.count() == 2
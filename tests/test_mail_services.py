@@ -0,0 +1,78 @@
+import json
+import smtplib
+
+import pytest
+from flask_mail import Message
+
+from app import mail_services, tasks
+from app.mail_services import MAIL_QUEUE_KEY, MailThrottled, send_messages, serialize_message
+from app.utils.cache_utils import CacheManager
+
+
+class FakeConnection:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.sent = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def send(self, msg):
+        outcome = self.outcomes.pop(0) if self.outcomes else None
+        if outcome is not None:
+            raise outcome
+        self.sent.append(msg.recipients[0])
+
+
+@pytest.fixture
+def mail_env(app_context, redis_client, monkeypatch):
+    monkeypatch.setattr(CacheManager, '_redis_client', redis_client)
+    monkeypatch.setitem(app_context.config, 'MAIL_THROTTLE_BACKOFF', 5)
+    monkeypatch.setitem(app_context.config, 'MAIL_THROTTLE_MAX_BACKOFF', 12)
+    monkeypatch.setattr(mail_services.time, 'sleep', lambda seconds: pytest.fail('send_messages slept'))
+
+    def connect_with(*outcomes):
+        connection = FakeConnection(list(outcomes))
+        monkeypatch.setattr(mail_services.mail, 'connect', lambda: connection)
+        return connection
+
+    return connect_with
+
+
+def message(n):
+    return Message(subject='Alert', sender='shop@example.com', recipients=[f'user{n}@example.com'], body='b')
+
+
+def test_throttling_hands_back_the_rest_of_the_batch_with_a_growing_delay(mail_env):
+    connection = mail_env(None, smtplib.SMTPResponseException(421, b'Too many connections'))
+
+    results = send_messages([message(n) for n in range(4)])
+
+    assert connection.sent == ['user0@example.com']
+    assert results[0][1] is None
+    errors = [error for msg, error in results[1:]]
+    assert len(errors) == 3 and all(isinstance(error, MailThrottled) for error in errors)
+    assert errors[0].smtp_code == 421 and errors[0].retry_after == 5
+
+    mail_env(smtplib.SMTPResponseException(451, b'Slow down'))
+    assert send_messages([message(9)])[0][1].retry_after == 10
+    mail_env(smtplib.SMTPResponseException(451, b'Slow down'))
+    assert send_messages([message(9)])[0][1].retry_after == 12
+
+
+def test_drain_puts_throttled_mail_back_in_order_without_using_an_attempt(mail_env, redis_client, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(tasks, 'schedule_email_drain', lambda client, countdown=0: scheduled.append(countdown))
+    for n in range(3):
+        redis_client.rpush(MAIL_QUEUE_KEY, json.dumps(serialize_message(message(n), attempts=1)))
+    mail_env(None, smtplib.SMTPResponseException(421, b'Too many connections'))
+
+    tasks.drain_email_queue()
+
+    queued = [json.loads(item) for item in redis_client.lrange(MAIL_QUEUE_KEY, 0, -1)]
+    assert [(item['recipients'], item['attempts']) for item in queued] == [
+        (['user1@example.com'], 1), (['user2@example.com'], 1)]
+    assert scheduled == [5]
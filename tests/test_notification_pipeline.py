@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app import tasks
+from app.notifications import pipeline
+from app.utils.cache_utils import CacheManager
+
+CHECKED_AT = datetime(2026, 2, 1, 12, 30)
+
+
+@pytest.fixture
+def queues(app_context, redis_client, monkeypatch):
+    monkeypatch.setattr(CacheManager, '_redis_client', redis_client)
+    drains = []
+    monkeypatch.setattr(tasks.drain_notifications, 'apply_async',
+                        lambda args, countdown=0: drains.append((args[0], countdown)))
+    return drains
+
+
+def make_user(**settings):
+    return SimpleNamespace(**{'id': 5, 'enable_target_price_reached_notifications': True,
+                              'enable_price_drop_notifications': True, 'enable_email_notifications': True,
+                              'telegram_chat_id': '42', **settings})
+
+
+def test_alert_events_go_out_on_the_enabled_channels(app_context):
+    product = SimpleNamespace(id=9, notification_methods=['account', 'email', 'telegram'])
+
+    events = pipeline.build_alert_events(product, make_user(), 'price_drop', Decimal('20'), Decimal('15'), CHECKED_AT)
+
+    assert [event['channel'] for event in events] == ['account', 'email', 'telegram']
+    assert events[1] == {'key': 'email:9:price_drop:2026-02-01T12:30:00', 'channel': 'email', 'user_id': 5,
+                         'product_id': 9, 'alert_type': 'price_drop', 'old_price': '20', 'new_price': '15',
+                         'attempts': 0}
+    assert pipeline.event_prices(events[1]) == (Decimal('20'), Decimal('15'))
+
+
+@pytest.mark.parametrize('user, methods, old_price, channels', [
+    (make_user(telegram_chat_id=None), ['email', 'telegram'], Decimal('20'), ['email']),
+    (make_user(enable_email_notifications=False), ['email'], Decimal('20'), []),
+    (make_user(), ['email'], None, []),
+    (make_user(), None, Decimal('20'), ['account']),
+    (make_user(enable_price_drop_notifications=False), ['account'], Decimal('20'), []),
+])
+def test_alert_channels_respect_user_settings(app_context, user, methods, old_price, channels):
+    product = SimpleNamespace(id=9, notification_methods=methods)
+
+    assert pipeline.notification_channels(product, user, 'price_drop', old_price) == channels
+
+
+def test_published_events_are_queued_per_channel_with_one_pending_drain(queues, redis_client):
+    product = SimpleNamespace(id=9, notification_methods=['account', 'email'])
+    events = (pipeline.build_alert_events(product, make_user(), 'price_drop', Decimal('20'), Decimal('15'), CHECKED_AT)
+              + pipeline.build_alert_events(product, make_user(), 'target_reached', Decimal('15'), Decimal('9'),
+                                            CHECKED_AT))
+
+    assert pipeline.publish_events(events)
+    assert pipeline.publish_events(events[:1])
+
+    assert queues == [('account', 0), ('email', 0)]
+    assert [event['alert_type'] for event in pipeline.pop_events('account', 10)] == [
+        'price_drop', 'target_reached', 'price_drop']
+    assert redis_client.llen(pipeline.QUEUE_KEY.format(channel='email')) == 2
+
+    redis_client.delete(pipeline.QUEUE_KEY.format(channel='email'))
+    assert not pipeline.finish_drain('email')
+    pipeline.schedule_drain('email')
+    assert queues[-1] == ('email', 0)
+
+
+def test_events_are_claimed_once_and_requeued_until_out_of_attempts(queues, redis_client, app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'NOTIFICATION_MAX_ATTEMPTS', 2)
+    event = {'key': 'email:9:price_drop:x', 'channel': 'email', 'attempts': 0}
+
+    assert pipeline.claim_event(event)
+    assert not pipeline.claim_event(event)
+    pipeline.release_event(event)
+    assert pipeline.claim_event(event)
+
+    assert pipeline.requeue_event(event)
+    assert pipeline.requeue_event(event, count_attempt=False)
+    assert pipeline.requeue_event(event)
+    assert not pipeline.requeue_event(event)
+    queued = [json.loads(item) for item in redis_client.lrange(pipeline.QUEUE_KEY.format(channel='email'), 0, -1)]
+    assert [item['attempts'] for item in queued] == [1, 1, 2]
+
+
+def test_digest_alerts_are_taken_once_their_window_has_ended(queues, redis_client, app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'ALERT_DIGEST_WINDOW_MINUTES', 60)
+    now = [1_000_000.0]
+    monkeypatch.setattr(pipeline.time, 'time', lambda: now[0])
+    product = SimpleNamespace(id=9)
+    hourly, quick = make_user(alert_digest_window=None), make_user(id=6, alert_digest_window=10)
+
+    assert pipeline.buffer_digest_alerts([
+        (product, hourly, Decimal('20'), Decimal('15'), ['price_drop', 'target_reached'], CHECKED_AT),
+        (product, quick, None, Decimal('15'), ['target_reached'], CHECKED_AT),
+    ])
+    now[0] += 30 * 60
+    # A later alert does not push the end of the running window back.
+    assert pipeline.buffer_digest_alerts([(product, quick, Decimal('15'), Decimal('14'), ['price_drop'], CHECKED_AT)])
+
+    assert pipeline.take_due_digests(10) == {6: [
+        {'product_id': 9, 'alert_type': 'target_reached', 'old_price': None, 'new_price': '15',
+         'checked_at': '2026-02-01T12:30:00'},
+        {'product_id': 9, 'alert_type': 'price_drop', 'old_price': '15', 'new_price': '14',
+         'checked_at': '2026-02-01T12:30:00'},
+    ]}
+    assert pipeline.take_due_digests(10) == {}
+
+    now[0] += 31 * 60
+    digests = pipeline.take_due_digests(10)
+    assert list(digests) == [5]
+    assert [item['alert_type'] for item in digests[5]] == ['price_drop', 'target_reached']
+    assert redis_client.zcard(pipeline.DIGEST_DUE_KEY) == 0
+
+
+def test_take_due_digests_stops_at_the_limit(queues, monkeypatch):
+    monkeypatch.setattr(pipeline.time, 'time', lambda: 1_000_000.0)
+    product = SimpleNamespace(id=9)
+    users = [make_user(id=user_id, alert_digest_window=1) for user_id in (1, 2, 3)]
+    pipeline.buffer_digest_alerts([(product, user, None, Decimal('5'), ['target_reached'], CHECKED_AT)
+                                   for user in users])
+    monkeypatch.setattr(pipeline.time, 'time', lambda: 1_000_000.0 + 120)
+
+    assert sorted(pipeline.take_due_digests(2)) == [1, 2]
+    assert sorted(pipeline.take_due_digests(2)) == [3]
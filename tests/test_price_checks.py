@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models import PriceHistory, Product
+from app.tasks import PriceCheckWrites, apply_listing_price_result, listing_price_series
+
+
+@pytest.fixture
+def price_history(app_context):
+    # SQLite cannot create the partitioned table's composite key with autoincrement.
+    db.session.execute(text("""
+        CREATE TABLE price_history (id INTEGER, product_id INTEGER, listing_id INTEGER, timestamp DATETIME,
+                                    price NUMERIC(10, 2), last_confirmed_at DATETIME, PRIMARY KEY (id, timestamp))
+    """))
+    db.session.commit()
+    yield
+    db.session.rollback()
+    db.session.execute(text("DROP TABLE price_history"))
+    db.session.commit()
+
+
+def add_history(listing_id, prices, start):
+    db.session.execute(PriceHistory.__table__.insert(), [
+        {'id': listing_id * 100 + n, 'listing_id': listing_id, 'timestamp': start + timedelta(days=n), 'price': price}
+        for n, price in enumerate(prices)
+    ])
+
+
+def test_listing_price_series_returns_recent_records_per_listing(price_history):
+    start = datetime(2026, 1, 1)
+    add_history(1, [10, 11, 12, 13], start)
+    add_history(2, [20], start)
+    add_history(3, [30, 31], start)
+
+    series = listing_price_series([1, 2, 4], limit=3)
+
+    assert series == {
+        1: [(start + timedelta(days=1), Decimal('11')), (start + timedelta(days=2), Decimal('12')),
+            (start + timedelta(days=3), Decimal('13'))],
+        2: [(start, Decimal('20'))],
+    }
+    assert listing_price_series([]) == {}
+
+
+@pytest.mark.parametrize('last_checked, dispatched_at, expected', [
+    (datetime(2026, 1, 1, 10), None, datetime(2026, 1, 1, 16)),
+    (datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 9), datetime(2026, 1, 1, 16)),
+    (datetime(2026, 1, 1, 10), datetime(2026, 1, 1, 15, 45), None),
+    (None, datetime(2026, 1, 1, 15, 45), None),
+])
+def test_scheduled_check_hides_the_dispatch_lease(last_checked, dispatched_at, expected):
+    product = Product(last_checked=last_checked, dispatched_at=dispatched_at, next_check_at=datetime(2026, 1, 1, 16))
+
+    assert product.scheduled_check_at == expected
+
+
+def tracked_listing(current_price=Decimal('100')):
+    user = SimpleNamespace(enable_target_price_reached_notifications=True, enable_price_drop_notifications=True)
+    product = SimpleNamespace(id=7, user=user, check_frequency=24, adaptive_frequency=False, current_price=current_price,
+                              target_price=Decimal('50'), target_price_notified=False,
+                              price_drop_alert_threshold=None, price_increase_alert_threshold=None)
+    return SimpleNamespace(id=3, name='Lamp'), [product]
+
+
+@pytest.mark.parametrize('change_only, new_price, confirmed', [
+    (True, '100.00', True),
+    (True, '99.00', False),
+    (False, '100.00', False),
+])
+def test_unchanged_price_only_confirms_the_latest_record(app_context, monkeypatch, change_only, new_price, confirmed):
+    monkeypatch.setitem(app_context.config, 'PRICE_HISTORY_CHANGE_ONLY', change_only)
+    listing, products = tracked_listing()
+    latest = SimpleNamespace(id=41, timestamp=datetime(2026, 1, 1), price=Decimal('100.00'))
+    now = datetime(2026, 1, 2)
+    writes = PriceCheckWrites()
+
+    updated = apply_listing_price_result(listing, products, {'success': True, 'price': new_price}, writes,
+                                         now=now, latest_record=latest)
+
+    assert updated == 1
+    if confirmed:
+        assert writes.confirmations == [{'id': 41, 'timestamp': datetime(2026, 1, 1), 'last_confirmed_at': now}]
+        assert writes.history == []
+    else:
+        assert writes.confirmations == []
+        assert writes.history == [{'listing_id': 3, 'price': Decimal(new_price), 'timestamp': now}]
+    assert writes.observations == [{'listing_id': 3, 'day': now.date(), 'price': Decimal(new_price)}]
+    assert writes.products[0]['last_checked'] == now
+
+
+def test_timeline_adds_the_last_confirmation_of_each_run():
+    records = [
+        SimpleNamespace(timestamp=datetime(2026, 1, 1), price=Decimal('10'), last_confirmed_at=datetime(2026, 1, 5)),
+        SimpleNamespace(timestamp=datetime(2026, 1, 6), price=Decimal('12'), last_confirmed_at=None),
+        SimpleNamespace(timestamp=datetime(2026, 1, 7), price=Decimal('11'), last_confirmed_at=datetime(2026, 1, 7)),
+    ]
+
+    assert PriceHistory.timeline(records) == [
+        (datetime(2026, 1, 1), Decimal('10')), (datetime(2026, 1, 5), Decimal('10')),
+        (datetime(2026, 1, 6), Decimal('12')), (datetime(2026, 1, 7), Decimal('11')),
+    ]
@@ -0,0 +1,44 @@
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.extensions import db
+from app.models import PriceHistoryDaily
+
+
+@pytest.fixture
+def daily(app_context):
+    PriceHistoryDaily.__table__.create(db.engine)
+    yield
+    db.session.rollback()
+    PriceHistoryDaily.__table__.drop(db.engine)
+
+
+def add(day, price, listing_id=None, product_id=None):
+    db.session.add(PriceHistoryDaily(listing_id=listing_id, product_id=product_id, day=day, open_price=price,
+                                     close_price=price, min_price=price, max_price=price, samples=1))
+
+
+def test_product_sees_its_listing_days_since_tracking_began_and_its_own_legacy_days(daily):
+    add(date(2026, 1, 1), Decimal('9'), product_id=7)
+    add(date(2026, 1, 2), Decimal('10'), listing_id=1)
+    add(date(2026, 1, 3), Decimal('11'), listing_id=1)
+    add(date(2026, 1, 3), Decimal('99'), listing_id=2)
+    db.session.commit()
+    product = SimpleNamespace(id=7, listing_id=1, created_at=datetime(2026, 1, 3, 8))
+
+    days = PriceHistoryDaily.for_product(product).order_by(PriceHistoryDaily.day)
+
+    assert [(row.day, row.close_price) for row in days] == [
+        (date(2026, 1, 1), Decimal('9')), (date(2026, 1, 3), Decimal('11'))]
+
+
+def test_product_without_a_listing_sees_only_its_own_days(daily):
+    add(date(2026, 1, 1), Decimal('9'), product_id=7)
+    add(date(2026, 1, 1), Decimal('10'), listing_id=1)
+    db.session.commit()
+    product = SimpleNamespace(id=7, listing_id=None, created_at=None)
+
+    assert [row.close_price for row in PriceHistoryDaily.for_product(product)] == [Decimal('9')]
@@ -0,0 +1,77 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from flask import render_template
+from flask_babel import force_locale
+
+from app.mail_services import render_cache
+from app.mail_services.render_cache import clear_render_cache, render_cached
+from app.notifications.email_notifier import ALERT_TEMPLATES
+
+STATIC = {'base_url': 'https://smartprice.test', 'locale': 'en'}
+
+
+def alert_context(target_price=Decimal('9.50'), old_price=19.999, new_price=12.345):
+    return {
+        'target_price': float(target_price) if target_price else None,
+        'user': SimpleNamespace(username='<Ann & "Bob">'),
+        'product': SimpleNamespace(name='Mug <b>&</b> "cup"', url='https://shop.test/item?a=1&b=2',
+                                   target_price=target_price),
+        'old_price': old_price,
+        'new_price': new_price,
+        'product_url': 'https://shop.test/item?a=1&b=2',
+        'tracking_dashboard_url': "https://smartprice.test/profile/tracked-products?highlight=1&x='y'",
+    }
+
+
+@pytest.fixture
+def render_env(app_context):
+    clear_render_cache()
+    # The base email template builds links with url_for.
+    with app_context.test_request_context():
+        yield app_context
+    clear_render_cache()
+
+
+@pytest.mark.parametrize('extension', ['.html', '.txt'])
+@pytest.mark.parametrize('template', sorted(ALERT_TEMPLATES.values()))
+@pytest.mark.parametrize('context', [
+    alert_context(),
+    alert_context(target_price=None),
+    alert_context(old_price=None),
+], ids=['values', 'no-target', 'no-old-price'])
+@pytest.mark.parametrize('locale', ['en', 'ru'])
+def test_cached_render_matches_render_template(render_env, template, extension, context, locale):
+    static = {**STATIC, 'locale': locale}
+    try:
+        with force_locale(locale):
+            expected = render_template(template + extension, **static, **context)
+    except TypeError:
+        # Templates that round a missing price fail the same way either way.
+        with pytest.raises(TypeError):
+            render_cached(template + extension, locale, static, **context)
+        return
+
+    assert render_cached(template + extension, locale, static, **context) == expected
+    # The second message comes from the cached shell.
+    assert render_cached(template + extension, locale, static, **context) == expected
+
+
+def test_html_values_are_escaped_and_rounded(render_env):
+    html = render_cached(ALERT_TEMPLATES['price_drop'] + '.html', 'en', STATIC, **alert_context())
+
+    assert 'Mug &lt;b&gt;&amp;&lt;/b&gt; &#34;cup&#34;' in html
+    assert '<b>&</b>' not in html
+    assert '12.35' in html and '12.345' not in html
+
+
+def test_shells_are_bounded(render_env, monkeypatch):
+    monkeypatch.setitem(render_env.config, 'EMAIL_RENDER_CACHE_SIZE', 2)
+    templates = sorted(ALERT_TEMPLATES.values())
+
+    for template in templates:
+        render_cached(template + '.txt', 'en', STATIC, **alert_context())
+    render_cached(templates[1] + '.txt', 'en', STATIC, **alert_context())
+
+    assert [key[0] for key in render_cache._shells] == [templates[2] + '.txt', templates[1] + '.txt']
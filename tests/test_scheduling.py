@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.utils.scheduling import adaptive_check_interval, price_volatility
+
+NOW = datetime(2026, 3, 1)
+
+
+def series(*prices, step=timedelta(days=1)):
+    start = NOW - step * (len(prices) - 1)
+    return [(start + step * n, Decimal(price)) for n, price in enumerate(prices)]
+
+
+def test_volatility_counts_changes_per_day_and_days_since_the_last_change():
+    changes_per_day, stable_days = price_volatility(series('10', '10', '12', '11', '11'), NOW)
+
+    assert changes_per_day == pytest.approx(2 / 4)
+    assert stable_days == pytest.approx(1)
+
+
+def test_volatility_of_a_short_or_empty_history():
+    assert price_volatility([], NOW) == (0.0, 0.0)
+    # Spans under a day count as one day, so a few quick changes do not look extreme.
+    changes_per_day, stable_days = price_volatility(series('10', '11', '12', step=timedelta(hours=1)), NOW)
+    assert changes_per_day == 2.0 and stable_days == 0.0
+
+
+@pytest.mark.parametrize('changes_per_day, stable_days, hours', [
+    (2.0, 0, 6),
+    (0.5, 0, 12),
+    (0.1, 3, 24),
+    (0.0, 14, 48),
+    (0.0, 30, 96),
+])
+def test_interval_follows_price_behavior(changes_per_day, stable_days, hours):
+    assert adaptive_check_interval(24, 1, 336, changes_per_day, stable_days) == hours
+
+
+@pytest.mark.parametrize('price, hours', [
+    (Decimal('101'), 6),
+    (Decimal('104'), 12),
+    (Decimal('120'), 96),
+    (Decimal('95'), 96),
+])
+def test_prices_close_to_the_target_are_checked_more_often(price, hours):
+    assert adaptive_check_interval(24, 1, 336, 0.0, 30, price=price, target_price=Decimal('100')) == hours
+
+
+def test_interval_is_stretched_by_the_budget_and_kept_within_bounds():
+    assert adaptive_check_interval(24, 1, 336, 0.0, 3, budget_factor=1.5) == 36
+    assert adaptive_check_interval(24, 8, 336, 2.0, 0) == 8
+    assert adaptive_check_interval(24, 1, 72, 0.0, 30) == 72
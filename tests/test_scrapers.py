@@ -0,0 +1,154 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.utils import scrapers
+from app.utils.scrapers import BaseParser, WildberriesParser, run_async_in_sync
+
+
+class CountingParser(BaseParser):
+    calls = []
+
+    async def parse(self, session):
+        self.calls.append(self.url)
+        return {'name': self.url, 'price': 1.0}, False
+
+
+def test_default_parse_batch_takes_a_token_per_url(app_context, scraper_redis, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'SCRAPE_RATE_LIMITS', {'domain:shop.test': (0.01, 2)})
+    monkeypatch.setitem(app_context.config, 'SCRAPE_RATE_LIMIT_MAX_WAIT', 0)
+    CountingParser.calls = []
+    urls = [f'https://shop.test/item/{n}' for n in range(3)]
+
+    results = asyncio.run(CountingParser.parse_batch(urls, session=None))
+
+    assert len(CountingParser.calls) == 2
+    parsed = [url for url, (data, has_error) in results.items() if not has_error]
+    deferred = [data for data, has_error in results.values() if data.get('deferred')]
+    assert len(parsed) == 2 and parsed[0] == results[parsed[0]][0]['name']
+    assert len(deferred) == 1 and deferred[0]['error'] == 'rate_limited'
+
+
+def test_wildberries_requests_beyond_the_first_take_their_own_token(app_context, scraper_redis, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'SCRAPE_RATE_LIMITS', {'domain:wildberries.ru': (0.01, 1)})
+    monkeypatch.setitem(app_context.config, 'SCRAPE_RATE_LIMIT_MAX_WAIT', 0)
+    monkeypatch.setattr(WildberriesParser, 'batch_size', 2)
+    requested = []
+
+    async def fetch_cards(chunk, session):
+        requested.append(chunk)
+        return {product_id: {'id': product_id, 'name': f'Card {product_id}',
+                             'sizes': [{'price': {'total': 12300}}]} for product_id in chunk}, None
+
+    monkeypatch.setattr(WildberriesParser, '_fetch_cards', fetch_cards)
+    urls = [f'https://www.wildberries.ru/catalog/{n}/detail.aspx' for n in (1, 2, 3, 4, 5)]
+
+    results = asyncio.run(WildberriesParser.parse_batch(urls, session=None))
+
+    # The first chunk runs under the caller's token, the second takes the only one left,
+    # the third is deferred without a request.
+    assert requested == [[1, 2], [3, 4]]
+    assert results[urls[0]] == ({'name': 'Card 1', 'price': 123.0}, False)
+    assert results[urls[3]] == ({'name': 'Card 4', 'price': 123.0}, False)
+    data, has_error = results[urls[4]]
+    assert has_error and data['deferred'] and data['error'] == 'rate_limited'
+
+
+def test_run_async_in_sync_cancels_the_coroutine_on_timeout():
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        run_async_in_sync(hang(), timeout=0.1)
+    assert cancelled.wait(2)
+
+
+def test_parse_url_waiters_get_the_scrape_error_not_a_cancellation(app_context, scraper_redis, monkeypatch):
+    scrapes = []
+
+    async def failing_scrape(url, key, session):
+        scrapes.append(url)
+        await asyncio.sleep(0.05)
+        raise ValueError('upstream exploded')
+
+    monkeypatch.setattr(scrapers, '_scrape_once_across_workers', failing_scrape)
+
+    async def main():
+        return await asyncio.gather(*(scrapers.parse_url('https://shop.test/item/1', session=None)
+                                      for _ in range(3)), return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+
+    assert scrapes == ['https://shop.test/item/1']
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+
+def test_parse_urls_shares_the_session_dedupes_and_caps_each_domain(app_context, scraper_redis, monkeypatch):
+    in_flight = {}
+    peak = {}
+    sessions = set()
+
+    async def parse_url(url, session):
+        domain = url.split('/')[2]
+        sessions.add(session)
+        in_flight[domain] = in_flight.get(domain, 0) + 1
+        peak[domain] = max(peak.get(domain, 0), in_flight[domain])
+        await asyncio.sleep(0.01)
+        in_flight[domain] -= 1
+        return {'success': True, 'name': url, 'price': 1.0}
+
+    monkeypatch.setattr(scrapers, 'parse_url', parse_url)
+    urls = [f'https://a.test/item/{n}' for n in range(6)] + [f'https://b.test/item/{n}' for n in range(3)]
+    session = object()
+
+    async def collect():
+        return [result async for result in scrapers.parse_urls(urls + urls[:2], per_domain_limit=2, session=session)]
+
+    results = asyncio.run(collect())
+
+    assert sorted(url for url, result in results) == sorted(urls)
+    assert sessions == {session}
+    assert peak == {'a.test': 2, 'b.test': 2}
+
+
+def test_redis_client_is_pooled_per_event_loop(app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'REDIS_MAX_CONNECTIONS', 7)
+
+    async def two_calls():
+        return await scrapers.get_redis_connection(), await scrapers.get_redis_connection()
+
+    first, again = asyncio.run(two_calls())
+    other_loop, _ = asyncio.run(two_calls())
+
+    assert first is again
+    assert other_loop is not first
+    assert first.connection_pool.max_connections == 7
+
+
+def test_cached_many_round_trips_and_reports_misses(app_context, scraper_redis):
+    async def main():
+        await scrapers.set_cached_many({'a': {'price': 1}, 'b': {'price': 2}}, ttls={'b': 30})
+        r = await scrapers.get_redis_connection()
+        return await scrapers.get_cached_many(['a', 'missing', 'b']), await r.ttl('a'), await r.ttl('b')
+
+    values, ttl_a, ttl_b = asyncio.run(main())
+
+    assert [value and json.loads(value) for value in values] == [{'price': 1}, None, {'price': 2}]
+    assert 3590 < ttl_a <= 3600 and 20 < ttl_b <= 30
+
+
+def test_cached_many_treats_redis_errors_as_misses(app_context, monkeypatch):
+    async def get_redis_connection():
+        raise ConnectionError('redis is down')
+
+    monkeypatch.setattr(scrapers, 'get_redis_connection', get_redis_connection)
+
+    assert asyncio.run(scrapers.get_cached_many(['a', 'b'])) == [None, None]
@@ -0,0 +1,44 @@
+import asyncio
+
+from aiohttp import web
+from fakeredis import aioredis
+
+from app.notifications import telegram_client
+from app.notifications.telegram_client import PAUSE_KEY, TelegramClient
+
+
+def test_flood_limit_pauses_sends_without_counting_an_attempt(monkeypatch):
+    redis_client = aioredis.FakeRedis()
+
+    async def get_redis_connection():
+        return redis_client
+
+    monkeypatch.setattr(telegram_client, 'get_redis_connection', get_redis_connection)
+    requests = []
+
+    async def send_message(request):
+        requests.append(await request.json())
+        return web.json_response({'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 7',
+                                  'parameters': {'retry_after': 7}}, status=429)
+
+    async def main():
+        app = web.Application()
+        app.router.add_post('/bottoken/sendMessage', send_message)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        client = TelegramClient('token', api_base_url=f'http://127.0.0.1:{port}')
+        try:
+            return await client.send(1, 'first'), await client.send(2, 'second'), await redis_client.pttl(PAUSE_KEY)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    limited, paused, pause_ms = asyncio.run(main())
+
+    assert limited == {'ok': False, 'error': 'paused', 'details': 'Too Many Requests: retry after 7', 'retry_after': 7}
+    assert paused['error'] == 'paused' and 0 < paused['retry_after'] <= 7
+    assert 0 < pause_ms <= 7000
+    assert [request['chat_id'] for request in requests] == [1]
@@ -0,0 +1,26 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.notifications.telegram_notifier import format_telegram_digest
+
+
+def alert(n, alert_type='price_drop', old_price=Decimal('20.50')):
+    product = SimpleNamespace(name=f'Lamp (v{n}).', url=f'https://shop.example/p/{n}')
+    return {'product': product, 'alert_type': alert_type, 'old_price': old_price, 'new_price': Decimal('15.25')}
+
+
+def test_digest_lists_every_alert_escaped_for_markdown_v2():
+    text = format_telegram_digest([alert(1), alert(2, 'target_reached', old_price=None)])
+
+    assert text == ("📬 *Price Alerts* \\(2\\)\n\n"
+                    "📉 [Lamp \\(v1\\)\\.](https://shop.example/p/1): 20\\.50$ → *15\\.25$*\n"
+                    "🎯 [Lamp \\(v2\\)\\.](https://shop.example/p/2): ? → *15\\.25$*")
+
+
+def test_long_digest_is_cut_off_with_a_count_of_the_rest():
+    text = format_telegram_digest([alert(n) for n in range(200)], max_length=1000)
+
+    assert len(text) <= 1000
+    shown = text.count('📉')
+    assert 0 < shown < 200
+    assert text.endswith(f"…and {200 - shown} more")
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from fakeredis import aioredis
+
+from app.utils.throttling import CircuitBreaker, deferred_result, is_upstream_failure
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    async def main():
+        breaker = CircuitBreaker(aioredis.FakeRedis(), threshold=1, window=60, cooldown=120, probe_timeout=30)
+        await breaker.record_failure('api:test')
+        assert await breaker.retry_after('api:test') > 100
+
+        await breaker.r.delete('circuit:api:test:open')  # the cooldown is over
+        waits = await asyncio.gather(*(breaker.retry_after('api:test') for _ in range(5)))
+        assert waits.count(0) == 1
+        assert all(wait > 25 for wait in waits if wait)
+
+        await breaker.record_success('api:test')
+        assert await breaker.retry_after('api:test') == 0
+        assert await breaker.retry_after('api:test') == 0
+
+    asyncio.run(main())
+
+
+def test_failed_probe_reopens_the_circuit():
+    async def main():
+        breaker = CircuitBreaker(aioredis.FakeRedis(), threshold=1, window=60, cooldown=120)
+        await breaker.record_failure('api:test')
+        await breaker.r.delete('circuit:api:test:open')
+        assert await breaker.retry_after('api:test') == 0
+
+        await breaker.record_failure('api:test')
+        assert await breaker.retry_after('api:test') > 100
+        assert not await breaker.r.exists('circuit:api:test:probe')
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize('result, expected', [
+    ({'success': False, 'status': 429}, True),
+    ({'success': False, 'status': 503}, True),
+    ({'success': False, 'error': 'ebay_api_error_502'}, True),
+    ({'success': False, 'error': 'wildberries_api_error_429'}, True),
+    ({'success': False, 'error': 'ebay_api_network_error'}, True),
+    ({'success': False, 'error': 'amazon_timeout'}, True),
+    ({'success': False, 'status': 404, 'error': 'ebay_api_error_404'}, False),
+    ({'success': False, 'error': 'price_not_found'}, False),
+    ({'success': True, 'status': 503}, False),
+])
+def test_is_upstream_failure(result, expected):
+    assert is_upstream_failure(result) is expected
+
+
+def test_deferred_result_is_a_failure_that_does_not_trip_the_breaker():
+    result = deferred_result('rate_limited', 12.345)
+
+    assert result == {'success': False, 'deferred': True, 'error': 'rate_limited', 'retry_after': 12.3}
+    assert not is_upstream_failure(result)
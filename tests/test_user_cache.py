@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.extensions import db
+from app.models import Role, User
+from app.utils import user_cache
+from app.utils.cache_utils import CacheManager
+
+
+@pytest.fixture
+def users(app_context, redis_client, monkeypatch):
+    monkeypatch.setattr(CacheManager, '_redis_client', redis_client)
+    user_cache._local.clear()
+    Role.__table__.create(db.engine)
+    User.__table__.create(db.engine)
+    role = Role(name='User', permissions=1)
+    db.session.add(role)
+    db.session.add(User(username='ann', email='ann@example.com', role=role, temp_data={'step': 1}))
+    db.session.commit()
+    yield redis_client
+    db.session.rollback()
+    User.__table__.drop(db.engine)
+    Role.__table__.drop(db.engine)
+    user_cache._local.clear()
+
+
+def cached_snapshot(redis_client, user_id):
+    raw = redis_client.get(user_cache.CACHE_KEY.format(user_id=user_id))
+    return json.loads(raw) if raw else None
+
+
+def test_snapshot_leaves_out_secret_and_scratch_columns(users):
+    user = user_cache.load_cached_user(1)
+
+    stored = cached_snapshot(users, 1)
+    assert stored['email'] == 'ann@example.com' and stored['permissions'] == 1
+    assert not {'password_hash', 'telegram_linking_token', 'temp_data'} & set(stored)
+    assert user.temp_data == {'step': 1}
+
+
+def test_model_side_changes_are_visible_and_invalidate_on_commit(users):
+    user_cache.load_cached_user(1)
+    user = user_cache.load_cached_user(1)
+    assert user._model is None
+
+    user.model.email = 'ann@new.example.com'
+    assert user.email == 'ann@new.example.com'
+    db.session.commit()
+
+    assert cached_snapshot(users, 1) is None
+    assert user_cache.load_cached_user(1).email == 'ann@new.example.com'
+
+
+def test_bulk_update_invalidates_every_user(users):
+    user_cache.load_cached_user(1)
+
+    User.query.filter_by(id=1).update({'language': 'ru'})
+    db.session.commit()
+
+    assert cached_snapshot(users, 1) is None
+    assert user_cache.load_cached_user(1).language == 'ru'
+
+
+def test_ping_refreshes_the_snapshot_instead_of_invalidating_it(users, app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, 'USER_LAST_SEEN_INTERVAL', 0)
+    user_cache.load_cached_user(1)
+    user = user_cache.load_cached_user(1)
+    before = user.last_seen
+
+    user.ping()
+
+    stored = cached_snapshot(users, 1)
+    assert stored is not None and stored['last_seen'] > before.isoformat()
+    assert user.last_seen > before